@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+
+# ==============================================================================
+# ARMAZÉM DE PRODUTOS (SQLite)
+# Um registro por produto, no lugar do mapa_global.json monolítico.
+# Cada etapa (Organizador, Processador, Cadastrador) lê em streaming e grava
+# só o produto que mudou, numa transação própria.
+# ==============================================================================
+
+ARQUIVO_ARMAZEM = "data/produtos.db"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    colecao       TEXT NOT NULL,
+    nome          TEXT NOT NULL,
+    dados         TEXT NOT NULL,
+    atualizado_em REAL NOT NULL,
+    UNIQUE (colecao, nome)
+)
+"""
+
+def conectar(caminho=ARQUIVO_ARMAZEM):
+    """Abre o banco (criando se preciso). WAL permite leitores em paralelo com um escritor."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    conexao = sqlite3.connect(caminho, timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute(_ESQUEMA)
+    return conexao
+
+CAMPOS_DO_PROCESSADOR = ("processed_path", "rendition_paths")   # Gravados pelo Processador, não pelo Organizador
+
+def _chave(produto):
+    return produto.get('collection_name', 'Geral'), produto['product_name']
+
+def _mesclar_caminhos(produto, anterior):
+    """
+    Copia para 'produto' os caminhos processados que só a versão guardada tem (a
+    versão vinda do mapa JSON não os conhece). Casa as imagens por variação + arquivo.
+    """
+    guardados = {(variacao['variation_name'], imagem['filename']): imagem
+                 for variacao in anterior.get('variations', []) for imagem in variacao.get('images', [])}
+    for variacao in produto.get('variations', []):
+        for imagem in variacao.get('images', []):
+            guardada = guardados.get((variacao['variation_name'], imagem['filename']), {})
+            for campo in CAMPOS_DO_PROCESSADOR:
+                if campo in guardada and campo not in imagem:
+                    imagem[campo] = guardada[campo]
+    return produto
+
+def _gravar(conexao, produtos, agora):
+    """Upsert por coleção + nome, preservando os caminhos processados já guardados (ver _mesclar_caminhos)."""
+    linhas = []
+    for produto in produtos:
+        anterior = conexao.execute("SELECT dados FROM produtos WHERE colecao = ? AND nome = ?",
+                                   _chave(produto)).fetchone()
+        if anterior:
+            produto = _mesclar_caminhos(produto, json.loads(anterior[0]))
+        linhas.append((*_chave(produto), json.dumps(produto, ensure_ascii=False), agora))
+    conexao.executemany(
+        """INSERT INTO produtos (colecao, nome, dados, atualizado_em) VALUES (?, ?, ?, ?)
+           ON CONFLICT (colecao, nome) DO UPDATE SET dados = excluded.dados,
+                                                    atualizado_em = excluded.atualizado_em""",
+        linhas
+    )
+
+def salvar_produtos(produtos, caminho=ARQUIVO_ARMAZEM):
+    """
+    Insere ou atualiza (por coleção + nome) uma lista de produtos numa única transação.
+    O 'processed_path'/'rendition_paths' já guardado de cada imagem é mantido se a versão
+    nova não trouxer o campo (ex: produto reclassificado pelo Organizador).
+    """
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            _gravar(conexao, produtos, time.time())
+    finally:
+        conexao.close()
+
+def atualizar_produto(id_produto, produto, caminho=ARQUIVO_ARMAZEM):
+    """Regrava um único produto (atômico: ou grava tudo, ou nada)."""
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            conexao.execute(
+                "UPDATE produtos SET dados = ?, atualizado_em = ? WHERE id = ?",
+                (json.dumps(produto, ensure_ascii=False), time.time(), id_produto)
+            )
+    finally:
+        conexao.close()
+
+def iterar_produtos(caminho=ARQUIVO_ARMAZEM, tamanho_lote=200):
+    """
+    Gera (id, produto) em ordem de inserção, sem carregar o catálogo inteiro na memória.
+    Lê em páginas por id, então gravações feitas durante a iteração não quebram o cursor.
+    """
+    ultimo_id = 0
+    while True:
+        conexao = conectar(caminho)
+        try:
+            linhas = conexao.execute(
+                "SELECT id, dados FROM produtos WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, tamanho_lote)
+            ).fetchall()
+        finally:
+            conexao.close()
+
+        if not linhas:
+            return
+        for id_produto, dados in linhas:
+            yield id_produto, json.loads(dados)
+        ultimo_id = linhas[-1][0]
+
+def contar_produtos(caminho=ARQUIVO_ARMAZEM):
+    conexao = conectar(caminho)
+    try:
+        return conexao.execute("SELECT COUNT(*) FROM produtos").fetchone()[0]
+    finally:
+        conexao.close()
+
+def converter_json_para_armazem(arquivo_json, caminho=ARQUIVO_ARMAZEM):
+    """
+    Importa um mapa_global.json para o armazém. O JSON é o mapa inteiro: produtos que
+    não estão mais nele saem do armazém; os demais são atualizados mantendo os caminhos
+    processados. Retorna a quantidade importada.
+    """
+    with open(arquivo_json, "r", encoding="utf-8") as f:
+        produtos = json.load(f)
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            _gravar(conexao, produtos, time.time())
+            chaves = {_chave(p) for p in produtos}
+            sumidos = [(colecao, nome) for colecao, nome in conexao.execute("SELECT colecao, nome FROM produtos")
+                       if (colecao, nome) not in chaves]
+            conexao.executemany("DELETE FROM produtos WHERE colecao = ? AND nome = ?", sumidos)
+    finally:
+        conexao.close()
+    print(f"📥 {len(produtos)} produtos importados de {arquivo_json} para {caminho}.")
+    return len(produtos)
+
+def exportar_para_json(arquivo_json, caminho=ARQUIVO_ARMAZEM):
+    """Gera um mapa_global.json a partir do armazém, escrevendo produto a produto."""
+    temporario = arquivo_json + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, (_, produto) in enumerate(iterar_produtos(caminho)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(produto, indent=2, ensure_ascii=False))
+        f.write("\n]\n")
+    os.replace(temporario, arquivo_json)
+
+def _modificado_em(caminho):
+    """Última gravação no banco: em WAL, as escritas recentes ficam no '-wal' até o checkpoint."""
+    return max(os.path.getmtime(arquivo) for arquivo in (caminho, caminho + "-wal") if os.path.exists(arquivo))
+
+def garantir_armazem(arquivo_json, caminho=ARQUIVO_ARMAZEM):
+    """
+    Converte o JSON se o armazém não existe, ou se o JSON é mais novo que ele (o mapa
+    foi regerado depois da última gravação no armazém). Retorna True se o armazém existe ao final.
+    """
+    if os.path.exists(arquivo_json) and (not os.path.exists(caminho)
+                                         or os.path.getmtime(arquivo_json) > _modificado_em(caminho)):
+        converter_json_para_armazem(arquivo_json, caminho)
+    return os.path.exists(caminho)
@@ -5,22 +5,48 @@ import keyboard
 import sys
 import re
 import pyperclip
+from collections import deque
 import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 
+from app import armazem
+from app import historico
+from app import sessao
+from app import localizadores
+from app import formulario_js
+from app import metricas
+
 
 # ==============================================================================
 # CONFIGURAÇÕES (CONSTANTES)
 # ==============================================================================
 DELAY_PADRAO = 0.5
+PACING_MINIMO = 0.15      # Pausa mínima entre ações (piso de ritmo, mesmo quando a página responde na hora)
+TEMPO_REDE_OCIOSA = 0.5   # Sem requisições por esse tempo = página "assentou"
 CAMINHO_PROJETO = os.getcwd()
 CAMINHO_PERFIL = os.path.join(CAMINHO_PROJETO, "Perfil_Bot_Shopee")
 ARQUIVO_MAPA = "mapa_global.json"
+URL_NOVO_PRODUTO = "https://seller.shopee.com.br/portal/product/new"
+
+ARQUIVO_HISTORICO = historico.ARQUIVO_HISTORICO_DB
+
+REUTILIZAR_NAVEGADOR = True    # Conecta no Chrome quente da porta de depuração (sessao.PORTA_DEPURACAO)
+TEMPO_LOGIN_MANUAL = 600       # Segundos esperando o login quando a sessão caiu
+TEMPO_CONFERIR_LOGIN = 5       # Segundos esperando o cabeçalho do vendedor aparecer antes de dar a sessão como caída
+PREENCHIMENTO_EM_LOTE = True   # Inputs simples num único execute_script (app/formulario_js.py)
+TENTATIVAS_UPLOAD = 3          # Envios da galeria (a partir do 2º, só os arquivos que faltaram)
+TEMPO_CONFIRMAR_SALVAMENTO = 20   # Segundos esperando o aviso de sucesso (ou a saída da tela) depois do "Salvar"
+TEMPO_POR_IMAGEM = 3           # Segundos de timeout do upload por arquivo enviado (+10 fixos)
 
-ARQUIVO_HISTORICO = "logs/history.json"
+# Checkpoint por etapa (diário no histórico) e nova tentativa no fim da fila
+TENTATIVAS_POR_ETAPA = 2       # Tentativas de uma etapa na mesma página (o que já foi feito fica)
+TENTATIVAS_POR_PRODUTO = 3     # Passadas pela fila antes de desistir do produto
+ESPERA_BASE_REFILA = 5.0       # Segundos antes da 2ª passada (dobra a cada nova passada)
+ETAPAS_SEM_REPETICAO = {"salvo"}   # Repetir o "Salvar" na mesma página pode duplicar o anúncio
+
+class LeasePerdido(RuntimeError):
+    """O lease do produto expirou e ele voltou para a fila (cadastro paralelo): outro worker pode estar com ele."""
 
 # ==============================================================================
 # FUNÇÕES DE CONTROLE
@@ -39,10 +65,10 @@ def dormir(segundos):
         verificar_parada()
         time.sleep(0.1)
 
-def espera_click(driver, xpath, timeout=10, scroll=True):
-    el = WebDriverWait(driver, timeout).until(
-        EC.element_to_be_clickable((By.XPATH, xpath))
-    )
+@metricas.medido(metricas.ACAO, com_alvo=True)
+def espera_click(driver, nome, timeout=10, scroll=True, **parametros):
+    """Espera o localizador 'nome' (ver app/localizadores.py) ficar clicável e clica."""
+    el = localizadores.localizar(driver, nome, timeout, localizadores.CLICAVEL, **parametros)
     if scroll:
         driver.execute_script(
             "arguments[0].scrollIntoView({block:'center'});", el
@@ -53,10 +79,10 @@ def espera_click(driver, xpath, timeout=10, scroll=True):
     el.click()
     return el
 
-def espera_input(driver, xpath, timeout=10):
-    el = WebDriverWait(driver, timeout).until(
-        EC.presence_of_element_located((By.XPATH, xpath))
-    )
+@metricas.medido(metricas.ACAO, com_alvo=True)
+def espera_input(driver, nome, timeout=10, **parametros):
+    """Espera o campo do localizador 'nome', foca e limpa o conteúdo."""
+    el = localizadores.localizar(driver, nome, timeout, localizadores.PRESENTE, **parametros)
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", el)
     driver.execute_script("arguments[0].click();", el)
     
@@ -65,94 +91,241 @@ def espera_input(driver, xpath, timeout=10):
     el.send_keys(Keys.CONTROL + "a")
     el.send_keys(Keys.BACK_SPACE)
     return el
+
+# ==============================================================================
+# ESPERAS POR CONDIÇÃO (no lugar de dormir fixo)
+# ==============================================================================
+
+# Conta as requisições XHR/fetch em andamento na página (instalado uma vez por página)
+_JS_MONITOR_REDE = """
+if (!window.__botRede) {
+    window.__botRede = {pendentes: 0, ultima: Date.now()};
+    const marcar = (delta) => { window.__botRede.pendentes += delta; window.__botRede.ultima = Date.now(); };
+    const envioOriginal = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        marcar(1);
+        this.addEventListener('loadend', () => marcar(-1));
+        return envioOriginal.apply(this, arguments);
+    };
+    if (window.fetch) {
+        const fetchOriginal = window.fetch;
+        window.fetch = function() {
+            marcar(1);
+            return fetchOriginal.apply(this, arguments).finally(() => marcar(-1));
+        };
+    }
+}
+return [window.__botRede.pendentes, Date.now() - window.__botRede.ultima];
+"""
+
+# Estado de cada miniatura da galeria, na ordem da tela: 'ok' (imagem carregada e sem
+# barra de progresso), 'carregando' ou 'erro'. Caixas sem imagem nem marca (ex: o botão
+# de adicionar) não contam.
+_JS_ESTADO_GALERIA = """
+const [seletorGaleria, seletorProgresso, seletorErro] = arguments;
+const galeria = document.querySelector(seletorGaleria);
+if (!galeria) return [];
+const tem = (caixa, seletor) => caixa.matches(seletor) || caixa.querySelector(seletor) !== null;
+const estados = [];
+for (const caixa of galeria.children) {
+    if (tem(caixa, seletorErro)) { estados.push('erro'); continue; }
+    if (tem(caixa, seletorProgresso)) { estados.push('carregando'); continue; }
+    const img = caixa.tagName === 'IMG' ? caixa : caixa.querySelector('img');
+    if (img) estados.push(img.complete && img.naturalWidth > 0 ? 'ok' : 'carregando');
+}
+return estados;
+"""
+
+def pausa_minima():
+    """Piso de ritmo entre ações (PACING_MINIMO), para não atropelar a interface."""
+    dormir(PACING_MINIMO)
+
+def esperar_ate(condicao, timeout=10, intervalo=0.1, descricao="condição"):
+    """
+    Repete 'condicao()' até ela devolver algo verdadeiro (e retorna esse valor).
+    Checa o ESC a cada volta. Exceções dentro da condição contam como 'ainda não'.
+    """
+    fim = time.time() + timeout
+    while True:
+        verificar_parada()
+        try:
+            resultado = condicao()
+            if resultado:
+                return resultado
+        except Exception:
+            pass
+        if time.time() >= fim:
+            raise TimeoutError(f"Tempo esgotado ({timeout}s) esperando {descricao}.")
+        time.sleep(intervalo)
+
+@metricas.medido(metricas.ACAO)
+def esperar_dom_pronto(driver, timeout=15):
+    """Espera o document.readyState == 'complete' e instala o monitor de rede."""
+    esperar_ate(lambda: driver.execute_script("return document.readyState") == "complete",
+                timeout, descricao="DOM pronto")
+    driver.execute_script(_JS_MONITOR_REDE)
+
+@metricas.medido(metricas.ACAO)
+def esperar_rede_ociosa(driver, ociosa_por=TEMPO_REDE_OCIOSA, timeout=10):
+    """
+    Espera não haver XHR/fetch pendente há pelo menos 'ociosa_por' segundos.
+    Não lança erro no timeout (uma página com polling nunca fica 100% ociosa).
+    """
+    def _ociosa():
+        pendentes, ms_desde_ultima = driver.execute_script(_JS_MONITOR_REDE)
+        return pendentes <= 0 and ms_desde_ultima >= ociosa_por * 1000
+    try:
+        esperar_ate(_ociosa, timeout, descricao="rede ociosa")
+        return True
+    except TimeoutError:
+        return False
+
+@metricas.medido(metricas.ACAO, com_alvo=True)
+def esperar_elemento_estavel(driver, nome, timeout=10, intervalo=0.1, **parametros):
+    """
+    Espera o elemento existir, estar visível e parar de se mexer (mesma posição/tamanho
+    em duas leituras seguidas - ex: fim de scroll suave ou de animação de abertura).
+    """
+    ultimo = {"retangulo": None}
+
+    def _estavel():
+        el = localizadores.buscar(driver, nome, localizadores.VISIVEL, **parametros)
+        if el is None:
+            return None
+        retangulo = driver.execute_script(
+            "const r = arguments[0].getBoundingClientRect(); return [r.x, r.y, r.width, r.height];", el)
+        parado = retangulo == ultimo["retangulo"]
+        ultimo["retangulo"] = retangulo
+        return el if parado else None
+
+    return esperar_ate(_estavel, timeout, intervalo, descricao=f"elemento estável '{nome}'")
+
+def estado_galeria(driver):
+    """Lista com o estado de cada miniatura da galeria ('ok' | 'carregando' | 'erro'), em ordem."""
+    return driver.execute_script(_JS_ESTADO_GALERIA, localizadores.css("galeria"),
+                                 localizadores.css("progresso_upload"), localizadores.css("erro_upload"))
+
+@metricas.medido(metricas.ACAO)
+def esperar_galeria_assentar(driver, esperadas, caixas_esperadas=0, timeout=30):
+    """
+    Espera a galeria terminar de subir: nenhuma miniatura carregando e, ou 'esperadas'
+    prontas (retorna na hora em que a última chega), ou a rede parada (o que falhou já
+    falhou). A rede parada só vale depois que o envio apareceu na tela ('caixas_esperadas'
+    miniaturas ou alguma carregando): logo após o send_keys ainda não há caixa nem XHR.
+    Retorna a lista de estados; no timeout, a leitura do momento, sem lançar erro.
+    """
+    comecou = {"envio": False}
+
+    def _assentou():
+        estados = estado_galeria(driver)
+        if "carregando" in estados or len(estados) >= caixas_esperadas:
+            comecou["envio"] = True
+        if "carregando" in estados:
+            return None
+        if estados.count("ok") >= esperadas:
+            return estados
+        if not comecou["envio"]:
+            return None
+        pendentes, ms_desde_ultima = driver.execute_script(_JS_MONITOR_REDE)
+        return estados if pendentes <= 0 and ms_desde_ultima >= TEMPO_REDE_OCIOSA * 1000 else None
+
+    try:
+        return esperar_ate(_assentou, timeout, descricao=f"{esperadas} imagens na galeria")
+    except TimeoutError as e:
+        print(f"⚠️ {e}")
+        return estado_galeria(driver)
  
 def carregar_historico():
-    if not os.path.exists(ARQUIVO_HISTORICO):
-        return []
-    try:
-        with open(ARQUIVO_HISTORICO, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return []
+    """Conjunto com os nomes já cadastrados (busca O(1))."""
+    return historico.carregar_enviados()
 
 def salvar_no_historico(nome_produto):
-    historico = carregar_historico()
-    if nome_produto not in historico:
-        historico.append(nome_produto)
-        # Garante que a pasta logs existe
-        os.makedirs(os.path.dirname(ARQUIVO_HISTORICO), exist_ok=True)
-        with open(ARQUIVO_HISTORICO, "w", encoding="utf-8") as f:
-            json.dump(historico, f, indent=4, ensure_ascii=False)
+    historico.registrar(nome_produto, historico.SUCESSO)
+
+def registrar_falha(nome_produto, motivo):
+    historico.registrar(nome_produto, historico.FALHA, str(motivo))
+
+@metricas.medido(metricas.ACAO)
+def preencher_campos(driver, campos):
+    """
+    Preenche inputs de texto simples: {chave: (localizador, valor[, {parametros}])}.
+    Espera só o primeiro campo aparecer e manda todos num único execute_script; o que
+    o lote não resolver cai na digitação normal (espera_input + send_keys), campo a campo,
+    e o valor digitado é relido do campo antes de contar como OK.
+    Retorna {chave: status} (ver formulario_js).
+    """
+    resultado = {}
+    if PREENCHIMENTO_EM_LOTE:
+        nome, _, *resto = next(iter(campos.values()))
+        try:
+            localizadores.localizar(driver, nome, **(resto[0] if resto else {}))
+            resultado = formulario_js.preencher_em_lote(driver, campos)
+        except Exception as e:
+            print(f"⚠️ Preenchimento em lote falhou ({e}). Digitando campo a campo.")
+
+    for chave, (nome, valor, *resto) in campos.items():
+        if resultado.get(chave) == formulario_js.OK:
+            continue
+        try:
+            el = espera_input(driver, nome, **(resto[0] if resto else {}))
+            el.send_keys(str(valor))
+            lido = el.get_attribute("value")
+            resultado[chave] = (formulario_js.OK if formulario_js.valor_equivalente(lido, valor)
+                                else formulario_js.DIVERGENTE)
+        except Exception as e:
+            resultado[chave] = f"erro: {e}"
+    return resultado
 
 # ==============================================================================
 # FUNÇÕES ESPECIALIZADAS (PRIVADAS)
 # ==============================================================================
 
 def _preencher_input_quantidade(driver, valor):
-    try:
-        xpath_qtd = "//div[contains(@class, 'attribute-select-item')][.//div[contains(., 'Quantidade')]]//input"
-        input_qtd = espera_input(driver, xpath_qtd)
-        input_qtd.send_keys(str(valor))
-
-        print(f"✅ Quantidade definida: {valor}")
-        
-    except Exception as e:
-        print(f"⚠️ Erro no input normal, tentando JS para Quantidade: {e}")
-        try:
-            input_qtd = driver.find_element(By.XPATH, xpath_qtd)
-            driver.execute_script(
-                "arguments[0].value = arguments[1]; arguments[0].dispatchEvent(new Event('input'));", 
-                input_qtd, str(valor)
-            )
-        except:
-            pass
+    resultado = preencher_campos(driver, {"quantidade": ("input_atributo", valor, {"titulo": "Quantidade"})})
+    if resultado["quantidade"] != formulario_js.OK:
+        raise RuntimeError(f"Quantidade não definida: {resultado['quantidade']}")
+    print(f"✅ Quantidade definida: {valor}")
 
 def _abrir_dropdown(driver, titulo_campo):
     if titulo_campo == "Marca":
-        xpath = f"//*[contains(text(), '{titulo_campo}')]/following::div[contains(@class, 'attribute-select-item')][1]"
-    else:
-        xpath = f"//div[contains(@class, 'attribute-select-item')][.//div[contains(., '{titulo_campo}')]]//div[contains(@class, 'edit-row-right-medium')]"
-    
-    return espera_click(driver, xpath)
+        return espera_click(driver, "dropdown_marca", titulo=titulo_campo)
+    return espera_click(driver, "dropdown_atributo", titulo=titulo_campo)
 
 def _selecionar_ou_criar_customizado(driver, valor):
     """
     Para Material/Estilo
     """
     try:
-        xpath_add = "//div[contains(text(), 'Adicionar um novo item')] | //span[contains(., 'Adicionar um novo item')]"
-        espera_click(driver, xpath_add)
+        espera_click(driver, "adicionar_item")
         
-        xpath_novo_input = "//ul//div[contains(@class, 'eds-option-add__input')]//input"
-        input_novo = espera_input(driver, xpath_novo_input)
+        input_novo = espera_input(driver, "novo_item_input")
         input_novo.send_keys(valor)
-        dormir(0.5)
+        pausa_minima()
         
-        xpath_confirmar = "//ul//div[contains(@class, 'eds-option-add__input')]//button[contains(@class, 'eds-option-add__add-confirm-icon')]"
-        dormir(0.2)
-        espera_click(driver, xpath_confirmar)
+        espera_click(driver, "novo_item_confirmar")
         print(f"✅ Novo item criado e selecionado: {valor}")
         
     except Exception as e:
         print(f"❌ Erro ao criar item customizado '{valor}': {e}")
+        raise
 
 def _selecionar_padrao(driver, valor):
     """Para Marca, Peso, etc."""
     try:
         try:
-            xpath_busca = "//input[contains(@placeholder, 'Insira ao menos') or @type='search']"
-            input_busca = espera_input(driver, xpath_busca, timeout=3)
+            input_busca = espera_input(driver, "busca_lista", timeout=3)
             input_busca.send_keys(valor)
-            dormir(1)
         except:
             pass
         
-        xpath_opcao = f"//div[contains(@class, 'eds-option')][contains(., '{valor}')]"
-        espera_click(driver, xpath_opcao)
+        # A lista filtra enquanto digita: espera a opção parar de se mover antes de clicar
+        esperar_elemento_estavel(driver, "opcao_lista", valor=valor)
+        espera_click(driver, "opcao_lista", valor=valor)
         print(f"✅ Selecionado: {valor}")    
     
     except Exception as e:
         print(f"❌ Não foi possível selecionar '{valor}'.")
+        raise
 
 # ==============================================================================
 # FUNÇÕES AUXILIARES
@@ -195,26 +368,11 @@ def encontrar_imagem_no_disco(produto, variacao, imagem_obj):
         
     return None
 
-def espera_upload(driver, timeout=10): 
+def preencher_atributo_dinamico(driver, titulo_campo, valor_para_selecionar):
     """
-    Espera o preview da imagem aparecer.
-    Se não aparecer, lança um erro para o Main tratar (pular produto).
+    Controlador principal que decide qual estratégia usar baseada no campo.
+    Erros sobem (a etapa de atributos é repetida pelo executar_etapa).
     """
-    imagem_na_tela = False
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located(
-                (By.XPATH, "//div[contains(@class, 'shopee-image-manager__content')]//img")
-            )
-        )
-        print("✅ Upload confirmado.")
-        imagem_na_tela = True
-        return imagem_na_tela
-        
-    except Exception:
-        print("❌ Upload demorou demais (Timeout).")
-
-def preencher_atributo_dinamico(driver, titulo_campo, valor_para_selecionar):
     print(f"\n--- Preenchendo: {titulo_campo} -> {valor_para_selecionar} ---")
 
     try:
@@ -223,38 +381,18 @@ def preencher_atributo_dinamico(driver, titulo_campo, valor_para_selecionar):
             return
         
         _abrir_dropdown(driver, titulo_campo)
-        dormir(0.5)
-
-        if titulo_campo in ["Material", "Estilo"]:
-            _selecionar_ou_criar_customizado(driver, valor_para_selecionar)
-        else:
-            _selecionar_padrao(driver, valor_para_selecionar)
-
-    except Exception as e:
-        print(f"🔥 Erro crítico em '{titulo_campo}': {e}")
-    """
-    Controlador principal que decide qual estratégia usar baseada no campo.
-    """
-    wait = WebDriverWait(driver, 10)
-    print(f"\n--- Preenchendo: {titulo_campo} -> {valor_para_selecionar} ---")
-
-    try:
-        if titulo_campo == "Quantidade":
-            _preencher_input_quantidade(driver, wait, valor_para_selecionar)
-            return
-
-        _abrir_dropdown(driver, wait, titulo_campo)
-        dormir(0.5)
+        pausa_minima()
 
         if titulo_campo in ["Material", "Estilo"]:
             # Estes permitem criar itens novos
-            _selecionar_ou_criar_customizado(driver, wait, valor_para_selecionar)
+            _selecionar_ou_criar_customizado(driver, valor_para_selecionar)
         else:
             # Estes exigem seleção de lista existente (Marca, Peso)
-            _selecionar_padrao(driver, wait, valor_para_selecionar)
+            _selecionar_padrao(driver, valor_para_selecionar)
 
     except Exception as e:
         print(f"🔥 Erro crítico em '{titulo_campo}': {e}")
+        raise
 
 def carregar_texto_descricao():
     try:
@@ -304,13 +442,33 @@ def ordenar_por_prioridade_visual(lista_caminhos):
 # LÓGICA DE PREENCHIMENTO DO BOT
 # ==============================================================================
 
-def iniciar_driver(headless=False):
-    """Configura o driver com otimizações de performance SEGURAS."""
+# Flags de desempenho/estabilidade (usadas tanto no driver normal quanto no navegador persistente)
+ARGUMENTOS_CHROME = [
+    "--no-first-run", "--no-service-autorun", "--password-store=basic",
+    "--window-size=1080,720",
+    # --- Otimização do Processo ---
+    "--disable-smooth-scrolling",
+    "--mute-audio",
+    "--disable-extensions",
+    "--no-default-browser-check",
+    # Para evitar crash no upload
+    "--no-sandbox",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+]
+
+def iniciar_driver(headless=False, caminho_perfil=CAMINHO_PERFIL, multi_processos=False):
+    """
+    Configura o driver com otimizações de performance SEGURAS.
+    Args:
+        caminho_perfil: Pasta do perfil do Chrome (cada navegador paralelo usa a sua).
+        multi_processos: True quando vários drivers sobem ao mesmo tempo (evita corrida no patch do chromedriver).
+    """
     print("Iniciando Driver...")
     options = uc.ChromeOptions()
-    options.add_argument(f"--user-data-dir={CAMINHO_PERFIL}")
-    options.add_argument("--no-first-run --no-service-autorun --password-store=basic")
-    options.add_argument("--window-size=1080,720") 
+    options.add_argument(f"--user-data-dir={caminho_perfil}")
+    for argumento in ARGUMENTOS_CHROME:
+        options.add_argument(argumento)
     
     # --- OTIMIZAÇÃO POR PREFS ---
     prefs = {
@@ -330,80 +488,82 @@ def iniciar_driver(headless=False):
     }
     options.add_experimental_option("prefs", prefs)
 
-    # --- Otimização do Processo ---
-    options.add_argument("--disable-smooth-scrolling")
-    options.add_argument("--mute-audio")
-    options.add_argument("--disable-extensions")
-    options.add_argument("--no-default-browser-check")
-    
-    # Para evitar crash no upload
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--disable-dev-shm-usage")
-
     if headless:
         print("👻 Modo Invisível (Headless) Ativado!")
         options.add_argument("--headless=new") 
    
-    driver = uc.Chrome(options=options, version_main=144)
+    # Versão detectada (não fixa) e chromedriver já corrigido em cache: sem download a cada execução
+    versao = sessao.detectar_versao_chrome()
+    driver = uc.Chrome(options=options, version_main=versao, user_multi_procs=multi_processos,
+                       driver_executable_path=sessao.obter_chromedriver(versao))
     driver.set_window_size(1080, 720)
         
     return driver
 
+@metricas.medido(metricas.ETAPA)
 def preencher_dados_basicos(driver, lista_caminhos, nome_produto):
     print("\n--- PASSO 1: IMAGENS (GALERIA) ---")
-    wait = WebDriverWait(driver, 10)
     
     # Preenchendo imagens
     imagens_validas = [p for p in lista_caminhos if os.path.exists(p)][:9]
     if not imagens_validas:
         raise Exception("Nenhuma imagem válida encontrada!")
 
-    string_caminhos = "\n".join(imagens_validas)
-    
-    max_tentativas = 3
-    sucesso_upload = False
+    pendentes = imagens_validas
+    prontas = 0
 
-    for tentativa in range(1, max_tentativas + 1):
+    for tentativa in range(1, TENTATIVAS_UPLOAD + 1):
         try:
-            print(f"Tentativa de Upload {tentativa}/{max_tentativas}...")
-            campo_upload = wait.until(EC.presence_of_element_located((By.XPATH, "//input[@type='file']")))
-            
+            print(f"Tentativa de Upload {tentativa}/{TENTATIVAS_UPLOAD} ({len(pendentes)} arquivo(s))...")
+            if tentativa > 1:
+                metricas.registrar(metricas.REPETICAO, "upload_galeria", arquivos=len(pendentes))
+            campo_upload = localizadores.localizar(driver, "upload_galeria")
             driver.execute_script("arguments[0].value = '';", campo_upload)
-            dormir(1)
-            
-            campo_upload.send_keys(string_caminhos)
-            
-            dormir(2 + len(imagens_validas))
-            
-            if espera_upload(driver, timeout=5):
-                print("✅ Galeria preenchida.")
-                sucesso_upload = True
-                break
-            else:
-                print("⚠️ Falha na verificação visual. Tentando novamente...")
-        
+
+            # Caixas que já existiam antes deste envio (as novas entram depois delas, na ordem dos arquivos)
+            caixas_antes = len(estado_galeria(driver))
+            campo_upload.send_keys("\n".join(pendentes))
+
+            estados = esperar_galeria_assentar(driver, prontas + len(pendentes), caixas_antes + len(pendentes),
+                                               timeout=10 + TEMPO_POR_IMAGEM * len(pendentes))
         except Exception as e:
             print(f"❌ Erro na tentativa {tentativa}: {e}")
-            dormir(2)
-
-    if not sucesso_upload:
-        raise Exception("Falha crítica no upload da galeria após tentativas.")
+            esperar_rede_ociosa(driver)
+            continue
+
+        novas = estados[caixas_antes:]
+        prontas = estados.count("ok")
+        if prontas >= len(imagens_validas):
+            print(f"✅ Galeria preenchida ({prontas} imagens).")
+            break
+
+        # Reenvia só o que falhou, pela posição da caixa (uma por arquivo, na ordem do envio).
+        # Se a tela não tem uma caixa por arquivo, não dá para saber quais falharam: em vez de
+        # reenviar no escuro (e duplicar), a etapa falha e recomeça de um formulário limpo.
+        falhas = [caminho for caminho, estado in zip(pendentes, novas) if estado != "ok"]
+        if len(novas) != len(pendentes) or not falhas:
+            raise RuntimeError(f"Galeria com {len(novas)} miniatura(s) nova(s) para {len(pendentes)} arquivo(s) "
+                               f"enviado(s): não dá para saber quais falharam.")
+        pendentes = falhas
+        print(f"⚠️ {prontas}/{len(imagens_validas)} imagens na galeria. Reenviando {len(pendentes)}...")
+    else:
+        raise Exception(f"Falha crítica no upload da galeria: {prontas}/{len(imagens_validas)} imagens após tentativas.")
 
     # Preenche Nome
-    xpath_nome = "//input[@placeholder='Nome da Marca + Tipo do Produto + Atributos-chave (Materiais, Cores, Tamanho, Modelo)']"
     try:
-        espera_input(driver, xpath_nome).send_keys(nome_produto[:120])
+        espera_input(driver, "nome_produto").send_keys(nome_produto[:120])
         print("✅ Nome preenchido.")
     except Exception as e:
         print(f"❌ Erro no nome: {e}")
+        raise
 
     print("Avançando...")
     try:
-        espera_click(driver, "//button[contains(., 'Next Step') or contains(., 'Próximo')]")
+        espera_click(driver, "botao_proximo")
     except:
         print("Botão próximo não encontrado, tentando JS...")
 
+@metricas.medido(metricas.ETAPA)
 def selecionar_categoria(driver):
     """
     Pesquisa a categoria e clica na hierarquia.
@@ -411,10 +571,9 @@ def selecionar_categoria(driver):
     print("\n--- CATEGORIA ---")
     sugestao1_encontrada = False
     termo_alvo1 = "Hobbies e Coleções > Itens Colecionáveis > Figuras de Ação"
-    xpath_sugestao1 =  f"//div[contains(@class, 'category-select-radio') and contains(., '{termo_alvo1}')]"
     try:
         print(f"Verificando se '{termo_alvo1}' já apareceu como sugestão...")
-        espera_click(driver, xpath_sugestao1, timeout=5)
+        espera_click(driver, "sugestao_categoria", timeout=5, termo=termo_alvo1)
         print("SUGESTÃO DA SHOPEE ENCONTRADA E CLICADA!")
         sugestao1_encontrada = True
     except:
@@ -423,18 +582,16 @@ def selecionar_categoria(driver):
     if not sugestao1_encontrada:
         termo_alvo2 = "Figuras de Ação"
         hierarquia_para_clicar = ["Hobbies e Coleções", "Itens Colecionáveis", "Figuras de Ação"]
-        xpath_categoria = "//div[contains(@class, 'product-category-box') or contains(@class, 'shopee-product-category-input')]"
         try:
             # Abrir seletor
             print("Abrindo seletor...")
-            espera_click(driver, xpath_categoria, timeout=1)
+            espera_click(driver, "seletor_categoria", timeout=1)
     
             # Verificar sugestão
             print(f"Verificando se '{termo_alvo2}' já apareceu como sugestão...")
             sugestao2_encontrada = False
             try:
-                xpath_sugestao2 = f"//li[contains(., '{termo_alvo2}')]"
-                espera_click(driver, xpath_sugestao2)
+                espera_click(driver, "item_lista", texto=termo_alvo2)
                 print("SUGESTÃO DA SHOPEE ENCONTRADA E CLICADA!")
                 sugestao2_encontrada = True
             except:
@@ -443,32 +600,29 @@ def selecionar_categoria(driver):
     
             # Busca Manual se não achou sugestão
             if not sugestao2_encontrada:
-                xpath_input_busca = "//input[contains(@placeholder, 'Insira ao menos')]"
-    
                 print(f"Digitando '{termo_alvo2}' no input...")
-                input_busca = espera_click(driver, xpath_input_busca)
+                input_busca = espera_click(driver, "busca_categoria")
                 input_busca.send_keys(termo_alvo2)
     
                 # Loop na Hierarquia
                 print("Navegando pelas colunas filtradas...")
                 for item_nome in hierarquia_para_clicar:
                     print(f"   -> Procurando: {item_nome}")
-                    xpath_item = f"//li[contains(., '{item_nome}')]"    
-                    espera_click(driver, xpath_item)
+                    espera_click(driver, "item_lista", texto=item_nome)
                     print(f"   -> '{item_nome}' clicado.")
     
             # Confirmando Categoria
             print("Finalizando Categoria...")
             try:
-                xpath_btn_confirmar = "//button[contains(., 'Confirmar')]"
-                espera_click(driver, xpath_btn_confirmar)
+                espera_click(driver, "botao_confirmar")
             except:
                 pass 
             print("Categoria definida!")    
         except Exception as e:
             print(f"Erro na Categoria: {e}")
-            input("Pressione ENTER para continuar manualmente...")
+            raise
 
+@metricas.medido(metricas.ETAPA)
 def preencher_atributos(driver, marca, material, peso, estilo, quantidade):
     """
     PASSO 3: Preenche atributos técnicos (Marca, Peso, etc).
@@ -480,6 +634,7 @@ def preencher_atributos(driver, marca, material, peso, estilo, quantidade):
         print(f"Preparando para preencher: {campo}")
         preencher_atributo_dinamico(driver, campo, valor)
 
+@metricas.medido(metricas.ETAPA)
 def colar_descricao(driver):
     """
     Insere a descrição usando a Área de Transferência (Ctrl+V).
@@ -493,19 +648,16 @@ def colar_descricao(driver):
         return
 
     try:
-        wait = WebDriverWait(driver, 10)
-        xpath_editor = "//div[@contenteditable='true']"
-        
         # 1. Encontra e clica para dar foco
-        campo_descricao = wait.until(EC.element_to_be_clickable((By.XPATH, xpath_editor)))
+        campo_descricao = localizadores.localizar(driver, "editor_descricao", condicao=localizadores.CLICAVEL)
         campo_descricao.click()
-        dormir(0.5)
+        pausa_minima()
 
         # 2. Limpa o conteúdo atual (Ctrl + A -> Delete)
         # Garante que não vai duplicar se a Shopee tiver carregado algo
         campo_descricao.send_keys(Keys.CONTROL, "a")
         campo_descricao.send_keys(Keys.BACK_SPACE)
-        dormir(0.5)
+        pausa_minima()
 
         # 3. Copia o texto para a memória do computador
         pyperclip.copy(texto_descricao)
@@ -514,7 +666,7 @@ def colar_descricao(driver):
         campo_descricao.send_keys(Keys.CONTROL, "v")
         
         print("✅ Descrição colada instantaneamente!")
-        dormir(1) # Tempo para o site processar a colagem
+        esperar_rede_ociosa(driver) # Tempo para o site processar a colagem
 
     except Exception as e:
         print(f"❌ Erro no método Clipboard: {e}")
@@ -530,7 +682,9 @@ def colar_descricao(driver):
             print("   -> Fallback JS funcionou.")
         except Exception as e_js:
             print(f"   ❌ Falha total na descrição: {e_js}")
+            raise
 
+@metricas.medido(metricas.ETAPA)
 def preencher_variacoes(driver, produto, variacoes_json):
     """
     Preenche variações dinamicamente baseado no JSON.
@@ -542,27 +696,23 @@ def preencher_variacoes(driver, produto, variacoes_json):
     print("\n--- CONFIGURANDO VARIAÇÕES (DINÂMICO) ---")
     try:
         # ATIVAR VARIAÇÕES
-        xpath_btn_ativar = "//div[contains(@class, 'variation-add-button')]//button"
         try:
-            espera_click(driver, xpath_btn_ativar, timeout=3)
+            espera_click(driver, "ativar_variacoes", timeout=3)
             print(" -> Botão 'Ativar Variações' clicado.")
         except:
             print(" -> Variações já parecem estar ativas (ou botão não encontrado).")
         # --------- Grupo 1 de variacoes - Modelo
         try:
-            xpath_grupo1 = "//div[contains(@data-product-edit-field-unique-id, 'tierVariation_0')]"
             try:
-                xpath_nome_grupo = f"{xpath_grupo1}//input"
-                espera_input(driver, xpath_nome_grupo).send_keys("Modelo")
-                dormir(0.5)
+                espera_input(driver, "nome_grupo_variacao", grupo=0).send_keys("Modelo")
+                pausa_minima()
             except Exception as e:
                 print(f"⚠️ Erro ao nomear grupo: {e}")
             print(f" -> Cadastrando {len(variacoes_json)} opções...")
             for i, variacao in enumerate(variacoes_json):
                 nome_opcao = variacao['variation_name']
-                xpath_input_opt = f"({xpath_grupo1}//div[contains(@class,'option-container')]//input[@placeholder='Inserir' or @placeholder='Enter'])[{i+1}]"
                 try:
-                    campo = espera_input(driver, xpath_input_opt)
+                    campo = espera_input(driver, "opcao_variacao", grupo=0, indice=i)
                     campo.send_keys(nome_opcao)
                     print(f"    Option [{i+1}]: {nome_opcao}")
                 except Exception as e:
@@ -572,24 +722,20 @@ def preencher_variacoes(driver, produto, variacoes_json):
             print(f"⚠️ Erro ao criar grupo 1 de variações: {e}")
         # --------- Grupo 2 de variacoes - Prime
         try:
-            xpath_btn_ativar2 = "//div[contains(@class, 'variation-add-2')]//button"
             try:
-                espera_click(driver, xpath_btn_ativar2, timeout=3)
+                espera_click(driver, "ativar_variacoes_2", timeout=3)
                 print(" -> Botão 'Ativar Variações' clicado.")
             except Exception as e:
                 print(f" -> Variações já parecem estar ativas (ou botão não encontrado): {e}")
             try:
-                xpath_grupo2 = "//div[contains(@data-product-edit-field-unique-id, 'tierVariation_1')]"
-                xpath_nome_grupo = f"{xpath_grupo2}//input"
-                espera_input(driver, xpath_nome_grupo).send_keys("Prime?")
-                dormir(0.5)
+                espera_input(driver, "nome_grupo_variacao", grupo=1).send_keys("Prime?")
+                pausa_minima()
             except Exception as e:
                 print(f"⚠️ Erro ao nomear grupo: {e}")
             try:
                 for i, valor in enumerate(['Sim','Não']):
-                    xpath_input_opt2 = f"({xpath_grupo2}//div[contains(@class,'option-container')]//input[@placeholder='Inserir' or @placeholder='Enter'])[{i+1}]"
-                    espera_input(driver, xpath_input_opt2).send_keys(valor)
-                dormir(0.5)
+                    espera_input(driver, "opcao_variacao", grupo=1, indice=i).send_keys(valor)
+                pausa_minima()
             except Exception as e:
                 print(f"⚠️ Erro ao nomear grupo: {e}")
         except Exception as e:
@@ -597,22 +743,20 @@ def preencher_variacoes(driver, produto, variacoes_json):
         
         # --------- Preenchimento de Preço/Estoque/Imagens -------------
         print(" -> Aplicando Preço/Estoque em Massa...")
-        dormir(1) 
         try:
             # Inputs que ficam no cabeçalho da tabela (Batch Edit)
-            xpath_batch_price = "//div[contains(@class, 'batch-edit')]//input[@placeholder='Preço']"
-            xpath_batch_stock = "//div[contains(@class, 'batch-edit')]//input[@placeholder='Estoque']"
-            xpath_btn_apply = "//div[contains(@class, 'batch-edit')]//button[contains(., 'Aplicar')]" # Pode ser 'Apply to all'
+            # (os três ficam no mesmo container, achado uma vez só)
+            esperar_elemento_estavel(driver, "lote_preco")
 
-            # Preenche
-            driver.find_element(By.XPATH, xpath_batch_price).send_keys("99,90") # Preço Base
-            driver.find_element(By.XPATH, xpath_batch_stock).send_keys("500")   # Estoque Base
+            # Preenche (Preço e Estoque Base numa ida só)
+            preencher_campos(driver, {"preco": ("lote_preco", "99,90"), "estoque": ("lote_estoque", "500")})
             
             # Aplica
-            driver.find_element(By.XPATH, xpath_btn_apply).click()
+            localizadores.localizar(driver, "lote_aplicar", timeout=0).click()
             print("✅ Preços aplicados a todas as variações!")
         except Exception as e:
-            print(f"❌ Falha no Batch Edit ({e}). Tentando fallback manual para 1º item...")
+            print(f"❌ Falha no Batch Edit ({e}).")
+            raise
         
         print(" -> Vinculando imagens (ordenadas) às variações...")
         for i, variacao in enumerate(variacoes_json):
@@ -629,8 +773,7 @@ def preencher_variacoes(driver, produto, variacoes_json):
                     caminhos_ordenados = ordenar_por_prioridade_visual(caminhos_candidatos)
                     melhor_foto = caminhos_ordenados[0] # Pega a campeã (Front/Main)
                     try:
-                        xpath_file = f"(//div[contains(@class, 'variation-model-table-body')]//input[@type='file'])[{i+1}]"
-                        driver.find_element(By.XPATH, xpath_file).send_keys(melhor_foto)
+                        localizadores.localizar(driver, "foto_variacao", timeout=0, indice=i).send_keys(melhor_foto)
                         print(f"    📸 Foto Variação [{i+1}]: {os.path.basename(melhor_foto)}")
                     except Exception as e:
                         print(f"    ⚠️ Falha upload foto variação {i+1}: {e}")
@@ -639,164 +782,367 @@ def preencher_variacoes(driver, produto, variacoes_json):
         print("✅ Variações concluídas.")
     except Exception as e:
         print(f"❌ Erro CRÍTICO na sessão de variações: {e}")
+        raise
     
+@metricas.medido(metricas.ETAPA)
 def preencher_finalizacoes(driver):
     """
     Sessoes: Informações de Vendas, Envio e finalização do produto.
     """
     print("\n--- INFORMAÇÕES FINAIS ---")
-    wait = WebDriverWait(driver, 10)
     try:
         # Sessão Envio
-        dormir(1)
-        xpath_agrupavel = "//div[contains(@class,'editor-row') and contains(.,'Produto é um item agrupável')]//label[normalize-space()='Sim']"
-        xpath_agrupavel = espera_click(driver, xpath_agrupavel)
-        dormir(1)
+        esperar_rede_ociosa(driver)
+        espera_click(driver, "agrupavel_sim")
+        pausa_minima()
         print(" Preenchendo Frete, peso e dimensões")
         
-        # Peso
-        xpath_peso = "//div[contains(@data-product-edit-field-unique-id, 'weight')]//input[contains(@placeholder, 'Inserir')]"
-        input_peso = espera_input(driver, xpath_peso)
-        input_peso.send_keys("0,1")
-
-        # Dimensões
+        # Peso + Dimensões (procuradas pelo placeholder), todos num único preenchimento em lote
         dimensoes = ["dimension.width", "dimension.length", "dimension.height"]
         dimensoesPlaceholder = ["Largura", "Comprimento", "Altura"]
-        for dim in dimensoes:
-            # Procura input pelo placeholder exato
-            xpath_dim = f"//div[@data-product-edit-field-unique-id='{dim}']//input[contains(@placeholder, '{dimensoesPlaceholder[dimensoes.index(dim)]}')]"
-            input_dim = espera_input(driver, xpath_dim)
-            input_dim.send_keys("10")
-            dormir(0.3)
-        dormir(1.5)
+        campos = {"peso": ("peso_envio", "0,1")}
+        for dim, rotulo in zip(dimensoes, dimensoesPlaceholder):
+            campos[dim] = ("dimensao_envio", "10", {"campo": dim, "rotulo": rotulo})
+        resultado = preencher_campos(driver, campos)
+        falhas = {chave: status for chave, status in resultado.items() if status != formulario_js.OK}
+        if falhas:
+            raise RuntimeError(f"Campos de envio não preenchidos: {falhas}")
+        esperar_rede_ociosa(driver)
         try:
-            xpath_switch_base = "//div[contains(@class,'logistics-item-ui-t1')][.//div[contains(normalize-space(.), 'Retirada')]]//div[contains(@class,'eds-switch')]"
-            switch_el = wait.until(EC.visibility_of_element_located((By.XPATH, xpath_switch_base)))
+            switch_el = localizadores.localizar(driver, "switch_retirada", condicao=localizadores.VISIVEL)
             classes_do_elemento = switch_el.get_attribute("class")
             
             if "eds-switch--open" in classes_do_elemento:
                 print(" -> Switch Retirada estava ATIVADO. Desativando...")
                 switch_el.click()
-                dormir(0.5)  
+                pausa_minima()
         except Exception as e:
             print(f"Não foi possível verificar o switch de Retirada: {e}")
 
         print("Configurando Pré-Encomenda")
         # Encontrando o botão "Sim" para Pré-encomenda
         try:
-            xpath_sim = "//div[@data-product-edit-field-unique-id='preOrder']//label[.//span[normalize-space()='Sim']]"
-            btn_sim = wait.until(EC.element_to_be_clickable((By.XPATH, xpath_sim    )))
+            btn_sim = localizadores.localizar(driver, "pre_encomenda_sim", condicao=localizadores.CLICAVEL)
             driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block : 'center'});", btn_sim)
-            dormir(DELAY_PADRAO)
+            btn_sim = esperar_elemento_estavel(driver, "pre_encomenda_sim")  # Fim do scroll suave
             btn_sim.click()
             print("Pré-encomenda ativada.")
         except Exception as e:
             print(f"Erro ao clicar em Sim: {e}")
         print(" -> Definindo 7 dias...")
-        dormir(DELAY_PADRAO + 1)
-        xpath_dias = "//div[contains(@class, 'pre-order-input')]//input[contains(@placeholder, '0')]"
-        input_dias = espera_input(driver, xpath_dias)
-        input_dias.send_keys("7")
+        resultado = preencher_campos(driver, {"dias": ("dias_pre_encomenda", "7")})
+        if resultado["dias"] != formulario_js.OK:
+            print(f"⚠️ Dias de pré-encomenda não definidos: {resultado['dias']}")
 
-        dormir(DELAY_PADRAO)
+        pausa_minima()
     except Exception as e:
         print(f"❌ Erro na sessão de envio: {e}")
+        raise
 
+def salvamento_confirmado(driver):
+    """True quando a Shopee confirmou o "Salvar": aviso de sucesso na tela ou saída da tela de novo produto."""
+    if not driver.current_url.startswith(URL_NOVO_PRODUTO):
+        return True
+    return localizadores.buscar(driver, "aviso_salvo", localizadores.VISIVEL) is not None
+
+@metricas.medido(metricas.ETAPA)
 def preencher_envio_e_salvar(driver):
+    """Clica em "Salvar" e só retorna quando o salvamento foi confirmado (senão, lança exceção)."""
     print("\n--- ENVIO E SALVAMENTO ---")
     try:
         # SALVAR
         print(" -> Salvando Rascunho...")
-        xpath_salvar = "//button[.//span[contains(normalize-space(.), 'Salvar e Não Publicar')]]"
-        espera_click(driver, xpath_salvar)
+        espera_click(driver, "botao_salvar")
         try:
-            xpath_confirm_modal = "//div[contains(@class,'eds-modal')]//button[contains(., 'Salvar e Não Publicar')]"
-            espera_click(driver, xpath_confirm_modal, timeout=3)
+            espera_click(driver, "confirmar_salvar_modal", timeout=3)
         except:
             pass
+        esperar_ate(lambda: salvamento_confirmado(driver), TEMPO_CONFIRMAR_SALVAMENTO,
+                    descricao="confirmação do salvamento")
         print("✅ Produto salvo!")
     except Exception as e:
         print(f"❌ Erro ao salvar: {e}")
+        raise
 
 # ==============================================================================
 # FUNÇÃO PRINCIPAL (WRAPPER)
 # ==============================================================================
-def executar_bot(headless=False):
+def carregar_produtos():
+    """
+    Retorna (total, iterável de produtos). Usa o armazém SQLite em streaming quando existe
+    (convertendo o mapa_global.json antigo na primeira vez); senão, cai no JSON.
+    """
+    if armazem.garantir_armazem(ARQUIVO_MAPA):
+        return armazem.contar_produtos(), (produto for _, produto in armazem.iterar_produtos())
+
     if not os.path.exists(ARQUIVO_MAPA):
-        print("❌ JSON do mapa não encontrado.")
-        return
+        return 0, None
 
     with open(ARQUIVO_MAPA, "r", encoding="utf-8") as f:
         lista_produtos = json.load(f)
+    return len(lista_produtos), lista_produtos
+
+def sessao_logada(driver):
+    """
+    True se a tela atual é do painel do vendedor: URL fora do login E o cabeçalho com a conta
+    na página (a URL sozinha não basta: o login pode aparecer sem mudar de endereço).
+    """
+    url = driver.current_url.lower()
+    if not url.startswith("http") or any(termo in url for termo in ("login", "signin", "/account/")):
+        return False
+    return localizadores.buscar(driver, "painel_vendedor") is not None
 
-    driver = iniciar_driver(headless=headless)
-    driver.get("https://seller.shopee.com.br/portal/product/new")
-    print("\n🔑 FAÇA O LOGIN MANUALMENTE SE NECESSÁRIO.")
-    input("Pressione ENTER quando estiver logado na Home da Shopee...")
+def aguardar_sessao_logada(driver, timeout=TEMPO_CONFERIR_LOGIN):
+    """Dá 'timeout' segundos para o cabeçalho do vendedor renderizar. True se a sessão está logada."""
+    try:
+        esperar_ate(lambda: sessao_logada(driver), timeout=timeout, intervalo=0.5, descricao="painel do vendedor")
+        return True
+    except TimeoutError:
+        return False
+
+def abrir_sessao(headless=False, reutilizar=REUTILIZAR_NAVEGADOR):
+    """
+    Deixa o navegador logado na tela de novo produto.
+    Com 'reutilizar', conecta no Chrome quente da porta de depuração (abrindo um se preciso);
+    o modo de um Chrome já aberto prevalece sobre 'headless' (ver sessao.abrir_sessao_persistente).
+    O login é conferido sozinho: só pede ação se a sessão tiver caído.
+    """
+    inicio = time.time()
+    if reutilizar:
+        driver = sessao.abrir_sessao_persistente(CAMINHO_PERFIL, headless=headless, argumentos=ARGUMENTOS_CHROME)
+    else:
+        driver = iniciar_driver(headless=headless)
+    if driver.current_url.startswith(URL_NOVO_PRODUTO):
+        esperar_dom_pronto(driver)   # Chrome quente já no formulário: mantém (pode ser um cadastro a retomar)
+    else:
+        abrir_formulario(driver)
+
+    if not aguardar_sessao_logada(driver):
+        if headless:
+            driver.quit()
+            raise RuntimeError("Sessão não está logada. Rode uma vez no modo visível para fazer o login.")
+        print("\n🔑 FAÇA O LOGIN MANUALMENTE. O bot continua sozinho quando detectar o painel.")
+        esperar_ate(lambda: sessao_logada(driver), timeout=TEMPO_LOGIN_MANUAL, intervalo=1, descricao="login")
+        abrir_formulario(driver)
+
+    print(f"✅ Sessão pronta em {time.time() - inicio:.1f}s.")
+    return driver
+
+def coletar_imagens_produto(produto):
+    """Caminhos das imagens processadas do produto, sem repetição e com a capa (Front) primeiro."""
+    todas_imagens = []
+    
+    for v in produto.get('variations', []):
+        for img in v.get('images', []):
+            caminho_real = encontrar_imagem_no_disco(produto, v, img)
+            
+            if caminho_real:
+                todas_imagens.append(caminho_real)
+            else:
+                print(f"   ⚠️ Imagem não achada: {img.get('filename')}")
+
+    todas_imagens = list(dict.fromkeys(todas_imagens))
+
+    return ordenar_por_prioridade_visual(todas_imagens)
+
+def formulario_em_andamento(driver, titulo):
+    """
+    True se o navegador ainda está no formulário deste produto (nome já digitado), ex: depois
+    de uma etapa que falhou, ou no Chrome quente de uma execução que caiu no meio.
+    """
+    try:
+        if not driver.current_url.startswith(URL_NOVO_PRODUTO):
+            return False
+        campo = localizadores.buscar(driver, "nome_produto")
+        return campo is not None and campo.get_attribute("value") == titulo[:120]
+    except Exception:
+        return False
+
+@metricas.medido(metricas.ACAO)
+def abrir_formulario(driver):
+    """Carrega a tela de novo produto e espera ela assentar."""
+    driver.get(URL_NOVO_PRODUTO)
+    esperar_dom_pronto(driver)
+    esperar_rede_ociosa(driver)
+
+def _conferir_lease(renovar_lease, nome, etapa):
+    """Renova o lease (cadastro paralelo) e interrompe o cadastro se ele já era de outro worker."""
+    if renovar_lease is not None and not renovar_lease():
+        raise LeasePerdido(f"Lease de '{nome}' expirou antes da etapa '{etapa}'. Abandonando o produto.")
+
+def executar_etapa(driver, nome, etapa, funcao, tentativas=TENTATIVAS_POR_ETAPA, renovar_lease=None):
+    """
+    Roda uma etapa do cadastro e grava no diário quando ela termina.
+    Se falhar, repete só ela na mesma página (as etapas anteriores continuam preenchidas).
+    Na etapa das imagens, que é a primeira, a repetição recarrega o formulário do zero.
+    'renovar_lease' (cadastro paralelo) é chamado antes de cada tentativa e antes de gravar
+    no diário: se o lease foi perdido, sai com LeasePerdido (nunca chega ao "Salvar").
+    """
+    if etapa in ETAPAS_SEM_REPETICAO:
+        tentativas = 1
+    for tentativa in range(1, tentativas + 1):
+        _conferir_lease(renovar_lease, nome, etapa)
+        try:
+            funcao()
+            break
+        except Exception as e:
+            if tentativa == tentativas:
+                raise RuntimeError(f"Etapa '{etapa}' falhou: {e}") from e
+            print(f"   🔁 Etapa '{etapa}' falhou ({e}). Repetindo {tentativa + 1}/{tentativas}...")
+            metricas.registrar(metricas.REPETICAO, f"etapa:{etapa}", erro=str(e))
+            if etapa == "imagens":
+                abrir_formulario(driver)
+            else:
+                esperar_rede_ociosa(driver)
+    if etapa not in ETAPAS_SEM_REPETICAO:   # O "Salvar" aconteceu: registra mesmo sem lease
+        _conferir_lease(renovar_lease, nome, etapa)
+    historico.marcar_etapa(nome, etapa)
+
+def cadastrar_produto(driver, produto, renovar_lease=None):
+    """
+    Cadastra um único produto no navegador já logado.
+    Retorna True se salvou, False se foi pulado (sem imagens). Erros sobem como exceção.
+    'renovar_lease': no cadastro paralelo, renova o lease do produto a cada etapa
+    (retorna False se o perdeu, e aí o cadastro para com LeasePerdido).
+    """
+    nome = produto['product_name']
+    inicio = time.perf_counter()
+    with metricas.produto_atual(nome):
+        try:
+            salvo = _cadastrar_produto(driver, produto, renovar_lease)
+        except Exception as e:
+            metricas.registrar(metricas.PRODUTO, "cadastrar_produto", duracao=round(time.perf_counter() - inicio, 4),
+                               ok=False, salvo=False, erro=str(e))
+            raise
+        metricas.registrar(metricas.PRODUTO, "cadastrar_produto", duracao=round(time.perf_counter() - inicio, 4),
+                           ok=True, salvo=bool(salvo))
+        return salvo
+
+def _cadastrar_produto(driver, produto, renovar_lease=None):
+    nome = produto['product_name']
+    colecao = produto.get('collection_name', 'Geral')
+    variacoes = produto.get('variations', [])
+
+    # Caiu entre o "Salvar" e o registro no histórico numa execução anterior: já está lá
+    if "salvo" in historico.etapas_concluidas(nome):
+        print(f"   ♻️ Diário indica que '{nome}' já foi salvo. Só registrando no histórico.")
+        salvar_no_historico(nome)
+        return True
+
+    todas_imagens = coletar_imagens_produto(produto)
+
+    if not todas_imagens:
+        print("⚠️ Produto sem imagens encontradas no disco. Pulando.")
+        return False
+
+    print(f"   📸 {len(todas_imagens)} imagens prontas e ordenadas.")
+    # ==========================================================
+    # FLUXO DE NAVEGAÇÃO (cada etapa vira um checkpoint no diário)
+    # ==========================================================
+    titulo = f"{nome} - {colecao} - Miniatura RPG - Impressão Resina 3D"
+    concluidas = historico.etapas_concluidas(nome)
+    if concluidas and formulario_em_andamento(driver, titulo):
+        # O formulário da tentativa anterior continua aberto: o que o diário marcou já está na tela
+        print(f"   ⏩ Retomando '{nome}' no mesmo formulário (já feito: {', '.join(sorted(concluidas))}).")
+    else:
+        historico.limpar_etapas(nome)   # Formulário novo: nada do rascunho anterior sobrevive
+        concluidas = set()
+        abrir_formulario(driver)
+
+    etapas = [
+        ("imagens", lambda: preencher_dados_basicos(driver, todas_imagens, titulo)),
+        ("categoria", lambda: selecionar_categoria(driver)),
+        ("descricao", lambda: colar_descricao(driver)),
+        ("atributos", lambda: preencher_atributos(driver,
+                                                  marca="Taberna e Goblins",
+                                                  material="Resin",
+                                                  peso="50g",
+                                                  estilo="Fantasy",
+                                                  quantidade=1)),
+        ("variacoes", lambda: preencher_variacoes(driver, produto, variacoes)),
+        ("finalizacoes", lambda: preencher_finalizacoes(driver)),
+        # Garante que o salvamento terminou antes de sair da página
+        ("salvo", lambda: (preencher_envio_e_salvar(driver), esperar_rede_ociosa(driver))),
+    ]
+    for etapa, funcao in etapas:
+        if etapa in concluidas:
+            continue
+        executar_etapa(driver, nome, etapa, funcao, renovar_lease=renovar_lease)
+
+    print(f"✨ Sucesso: {nome}")
+    salvar_no_historico(nome)
+    return True
+
+def tentar_cadastro(driver, produto, refila, tentativa=1):
+    """
+    Uma passada do produto. Em caso de falha, registra no histórico e, se ainda houver
+    tentativas, agenda o produto para o fim da fila com espera exponencial.
+    Retorna True (salvo), False (pulado) ou None (falhou).
+    """
+    nome = produto.get('product_name')
+    try:
+        return cadastrar_produto(driver, produto)
+    except Exception as e:
+        print(f"❌ Falha no produto {nome}: {e}")
+        registrar_falha(nome, e)
+        if tentativa < TENTATIVAS_POR_PRODUTO:
+            espera = ESPERA_BASE_REFILA * 2 ** (tentativa - 1)
+            refila.append((time.time() + espera, tentativa + 1, produto))
+            print(f"   ↩️ '{nome}' volta no fim da fila (tentativa {tentativa + 1}/{TENTATIVAS_POR_PRODUTO}).")
+        else:
+            print(f"   🚫 '{nome}' desistido após {TENTATIVAS_POR_PRODUTO} tentativas.")
+        dormir(2)
+        return None
+
+def processar_refila(driver, refila):
+    """Reprocessa os produtos que falharam, respeitando a espera de cada um. Retorna quantos salvou."""
+    salvos = 0
+    while refila:
+        disponivel_em, tentativa, produto = refila.popleft()
+        restante = disponivel_em - time.time()
+        if restante > 0:
+            print(f"   ⏳ Aguardando {restante:.0f}s antes de tentar de novo '{produto['product_name']}'...")
+            dormir(restante)
+        print(f"\n🔁 NOVA TENTATIVA [{tentativa}/{TENTATIVAS_POR_PRODUTO}]: {produto['product_name']}")
+        metricas.registrar(metricas.REPETICAO, "produto", produto_refeito=produto['product_name'])
+        if tentar_cadastro(driver, produto, refila, tentativa):
+            salvos += 1
+    return salvos
+
+def executar_bot(headless=False, esperar_enter=True):
+    total_produtos, lista_produtos = carregar_produtos()
+    if lista_produtos is None:
+        print("❌ JSON do mapa não encontrado.")
+        return
+
+    driver = abrir_sessao(headless=headless)
+    arquivo_metricas = metricas.iniciar_execucao("cadastro")
     # ==========================================================
     # Loop para cadastramento de produtos baseado no JSON
     # ==========================================================
     produtos_ja_enviados = carregar_historico()
     print(f"📜 Histórico carregado: {len(produtos_ja_enviados)} produtos já processados.")
 
+    refila = deque()   # (disponível_em, tentativa, produto) dos que falharam
     for i, produto in enumerate(lista_produtos):
-        try:
-            nome = produto['product_name']
-            colecao = produto.get('collection_name', 'Geral')
-            variacoes = produto.get('variations', [])
+        nome = produto.get('product_name')
+        if nome in produtos_ja_enviados:
+            print(f"   ⚠️ Produto já processado: {nome}")
+            continue
 
-            if nome in produtos_ja_enviados:
-                print(f"   ⚠️ Produto já processado: {nome}")
-                continue
+        print(f"\n🚀 PROCESSANDO [{i+1}/{total_produtos}]: {nome}")
+        tentar_cadastro(driver, produto, refila)
 
-            print(f"\n🚀 PROCESSANDO [{i+1}/{len(lista_produtos)}]: {nome}")
-            todas_imagens = []
-            
-            for v in variacoes:
-                for img in v.get('images', []):
-                    caminho_real = encontrar_imagem_no_disco(produto, v, img)
-                    
-                    if caminho_real:
-                        todas_imagens.append(caminho_real)
-                    else:
-                        print(f"   ⚠️ Imagem não achada: {img.get('filename')}")
-
-            todas_imagens = list(dict.fromkeys(todas_imagens))
-
-            todas_imagens = ordenar_por_prioridade_visual(todas_imagens)
-
-            if not todas_imagens:
-                print("⚠️ Produto sem imagens encontradas no disco. Pulando.")
-                continue 
-
-            print(f"   📸 {len(todas_imagens)} imagens prontas e ordenadas.")
-            # ==========================================================
-            # FLUXO DE NAVEGAÇÃO
-            # ==========================================================
-            driver.get("https://seller.shopee.com.br/portal/product/new")
-            dormir(3)
-            preencher_dados_basicos(driver, todas_imagens, f"{nome} - {colecao} - Miniatura RPG - Impressão Resina 3D")
-            selecionar_categoria(driver)
-            colar_descricao(driver)
-            preencher_atributos(driver, 
-                                marca="Taberna e Goblins", 
-                                material="Resin", 
-                                peso="50g", 
-                                estilo="Fantasy", 
-                                quantidade=1)
-
-            preencher_variacoes(driver, produto, variacoes)
-            preencher_finalizacoes(driver)
-            preencher_envio_e_salvar(driver)
-            
-            print(f"✨ Sucesso: {nome}")
-            salvar_no_historico(nome)
-            dormir(3)
-        except Exception as e:
-            print(f"❌ Falha no produto {nome}: {e}")
-            dormir(2)
+    if refila:
+        print(f"\n🔁 {len(refila)} produtos com falha voltando para nova tentativa...")
+        processar_refila(driver, refila)
     print("🏁 Fim da fila.")
-    input("Enter para sair.")
+    localizadores.imprimir_resumo()
+    metricas.imprimir_resumo()
+    metricas.encerrar_execucao()
+    print(f"📝 Eventos de tempo gravados em {arquivo_metricas}")
+    if esperar_enter:
+        input("Enter para sair.")
     driver.quit()
 
 if __name__ == "__main__":
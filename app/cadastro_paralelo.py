@@ -0,0 +1,180 @@
+import os
+import time
+import shutil
+import threading
+
+from app import cadastrador
+from app import metricas
+
+# ==============================================================================
+# CADASTRO PARALELO (VÁRIOS NAVEGADORES)
+# N navegadores, cada um com sua cópia do perfil logado, puxando produtos de uma
+# fila compartilhada. Um produto reivindicado fica "emprestado" (lease) para um
+# único worker; se o worker travar, o empréstimo expira e outro pode pegá-lo.
+# O worker renova o lease a cada etapa do cadastro e, se descobrir que o perdeu,
+# abandona o produto antes do "Salvar" (quem está com ele agora é outro worker).
+# ==============================================================================
+
+NUM_NAVEGADORES = 3
+DURACAO_LEASE = 600          # Segundos que um worker pode ficar sem renovar o lease (uma etapa do cadastro)
+TENTATIVAS_POR_PRODUTO = 2
+
+# Arquivos de trava do Chrome que não podem ser copiados junto com o perfil
+_ARQUIVOS_TRAVA = shutil.ignore_patterns("SingletonLock", "SingletonCookie", "SingletonSocket",
+                                         "lockfile", "*.lock", "Crashpad")
+
+class FilaDeProdutos:
+    """
+    Fila de trabalho compartilhada entre os workers (thread-safe).
+    reivindicar() entrega cada produto a um único worker por vez; renovar() estende o
+    lease enquanto o worker trabalha; concluir() tira da fila de vez; liberar() devolve
+    para outra tentativa (até TENTATIVAS_POR_PRODUTO). concluir/liberar de um worker que
+    não é mais o dono do lease não fazem nada (retornam False).
+    """
+
+    def __init__(self, produtos, duracao_lease=DURACAO_LEASE, tentativas=TENTATIVAS_POR_PRODUTO):
+        self._trava = threading.Lock()
+        self._pendentes = list(produtos)
+        self._leases = {}        # nome -> (worker, expira_em, produto)
+        self._tentativas = {}    # nome -> tentativas já feitas
+        self._duracao_lease = duracao_lease
+        self._max_tentativas = tentativas
+        self.concluidos = []
+        self.falhos = []
+
+    def reivindicar(self, worker):
+        """Retorna o próximo produto livre para este worker, ou None se a fila acabou."""
+        with self._trava:
+            agora = time.time()
+            # Leases vencidos (worker travado/morto) voltam para a fila
+            for nome, (dono, expira_em, produto) in list(self._leases.items()):
+                if expira_em < agora:
+                    print(f"   ⏰ Lease de '{nome}' (worker {dono}) expirou. Devolvendo à fila.")
+                    del self._leases[nome]
+                    self._pendentes.append(produto)
+
+            if not self._pendentes:
+                return None
+            produto = self._pendentes.pop(0)
+            self._leases[produto['product_name']] = (worker, agora + self._duracao_lease, produto)
+            return produto
+
+    def _dono(self, nome):
+        return self._leases.get(nome, (None,))[0]
+
+    def renovar(self, worker, produto):
+        """Estende o lease do worker. Retorna False se ele não é mais o dono (expirou e foi devolvido)."""
+        with self._trava:
+            nome = produto['product_name']
+            if self._dono(nome) != worker:
+                return False
+            self._leases[nome] = (worker, time.time() + self._duracao_lease, produto)
+            return True
+
+    def concluir(self, worker, produto):
+        """Tira o produto da fila de vez. Retorna False (sem efeito) se o worker não é mais o dono."""
+        with self._trava:
+            nome = produto['product_name']
+            if self._dono(nome) != worker:
+                return False
+            del self._leases[nome]
+            self.concluidos.append(nome)
+            return True
+
+    def liberar(self, worker, produto, motivo):
+        """
+        Devolve o produto após uma falha (ou marca como falho se esgotou as tentativas).
+        Retorna False (sem efeito) se o worker não é mais o dono.
+        """
+        with self._trava:
+            nome = produto['product_name']
+            if self._dono(nome) != worker:
+                return False
+            del self._leases[nome]
+            self._tentativas[nome] = self._tentativas.get(nome, 0) + 1
+            if self._tentativas[nome] < self._max_tentativas:
+                self._pendentes.append(produto)
+                metricas.registrar(metricas.REPETICAO, "produto", produto_refeito=nome)
+            else:
+                self.falhos.append((nome, motivo))
+            return True
+
+    def vazia(self):
+        with self._trava:
+            return not self._pendentes and not self._leases
+
+def clonar_perfil(indice, perfil_base=cadastrador.CAMINHO_PERFIL):
+    """Copia o perfil logado para uma pasta própria do worker (Chrome não compartilha perfil)."""
+    destino = f"{perfil_base}_worker{indice}"
+    if os.path.exists(perfil_base):
+        shutil.copytree(perfil_base, destino, ignore=_ARQUIVOS_TRAVA, dirs_exist_ok=True)
+    return destino
+
+def _worker(indice, fila, headless, perfil_base):
+    nome_worker = f"W{indice}"
+    try:
+        driver = cadastrador.iniciar_driver(headless=headless, caminho_perfil=clonar_perfil(indice, perfil_base),
+                                            multi_processos=True)
+    except Exception as e:
+        print(f"❌ [{nome_worker}] Não foi possível abrir o navegador: {e}")
+        return
+
+    try:
+        while True:
+            produto = fila.reivindicar(nome_worker)
+            if produto is None:
+                if fila.vazia():
+                    break
+                time.sleep(1)  # Outros workers ainda podem devolver produtos
+                continue
+
+            nome = produto['product_name']
+            print(f"\n🚀 [{nome_worker}] CADASTRANDO: {nome}")
+            try:
+                cadastrador.cadastrar_produto(driver, produto,
+                                              renovar_lease=lambda: fila.renovar(nome_worker, produto))
+                if not fila.concluir(nome_worker, produto):
+                    print(f"⚠️ [{nome_worker}] '{nome}' foi salvo, mas o lease já tinha expirado.")
+            except cadastrador.LeasePerdido as e:
+                # Outro worker está com o produto: sai sem registrar falha nem devolver à fila
+                print(f"⏰ [{nome_worker}] {e}")
+            except Exception as e:
+                print(f"❌ [{nome_worker}] Falha no produto {nome}: {e}")
+                cadastrador.registrar_falha(nome, e)
+                fila.liberar(nome_worker, produto, str(e))
+    finally:
+        driver.quit()
+
+def executar_bot_paralelo(num_navegadores=NUM_NAVEGADORES, headless=True, perfil_base=cadastrador.CAMINHO_PERFIL):
+    """
+    Cadastra os produtos com vários navegadores em paralelo.
+    O perfil base precisa já estar logado (rode o modo visível uma vez antes).
+    Para testar contra um servidor local, troque cadastrador.URL_NOVO_PRODUTO antes de chamar.
+    """
+    total_produtos, lista_produtos = cadastrador.carregar_produtos()
+    if lista_produtos is None:
+        print("❌ JSON do mapa não encontrado.")
+        return None
+
+    produtos_ja_enviados = cadastrador.carregar_historico()
+    pendentes = [p for p in lista_produtos if p['product_name'] not in produtos_ja_enviados]
+    print(f"📜 {total_produtos - len(pendentes)} produtos já processados. {len(pendentes)} na fila "
+          f"para {num_navegadores} navegadores.")
+
+    fila = FilaDeProdutos(pendentes)
+    metricas.iniciar_execucao("cadastro_paralelo")
+    inicio = time.time()
+    workers = [threading.Thread(target=_worker, args=(i, fila, headless, perfil_base), daemon=True)
+               for i in range(1, num_navegadores + 1)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    duracao = time.time() - inicio
+    print(f"🏁 Fim da fila: {len(fila.concluidos)} cadastrados, {len(fila.falhos)} falhas em {duracao:.0f}s.")
+    for nome, motivo in fila.falhos:
+        print(f"   ❌ {nome}: {motivo}")
+    metricas.imprimir_resumo()
+    metricas.encerrar_execucao()
+    return fila
@@ -0,0 +1,164 @@
+import os
+import re
+
+# ==============================================================================
+# CLASSIFICADOR LOCAL (REGRAS)
+# Resolve os nomes de arquivo "bem comportados" sem chamar o Gemini.
+# Ex: "Colossus_Shot1.jpg", "Orc_Axe_Front_Black.png", "Beholder Back.jpg"
+# Tudo que não for reconhecido com segurança volta como ambíguo para o modelo.
+# ==============================================================================
+
+# Palavras de visão -> view_type
+VISOES = {
+    "front": "front", "frente": "front", "main": "front",
+    "back": "back", "costas": "back", "rear": "back",
+    "side": "side", "lateral": "side", "left": "side", "right": "side", "profile": "side",
+    "detail": "detail", "detalhe": "detail",
+    "closeup": "close_up", "close": "close_up",
+    "showcase": "showcase", "full": "showcase", "fullbody": "showcase",
+    "top": "top",
+}
+
+# "Shot1", "Pose2", "Angle3"... -> são só ângulos diferentes do mesmo produto
+PREFIXOS_ANGULO = ("shot", "pose", "angle", "view", "img", "image", "render")
+
+# Cores de fundo (Regra 5 do prompt: não são relevantes)
+CORES_FUNDO = {"black", "red", "white", "green", "blue", "grey", "gray", "bg", "background"}
+
+# Variações de equipamento (Regra 3 do prompt: criam variações separadas)
+VARIACOES = {
+    "axe": "Machado", "bow": "Arco", "crossbow": "Besta", "sword": "Espada",
+    "greatsword": "Espada Grande", "spear": "Lança", "staff": "Cajado", "shield": "Escudo",
+    "dagger": "Adaga", "daggers": "Adagas", "hammer": "Martelo", "mace": "Maça",
+    "wand": "Varinha", "whip": "Chicote", "halberd": "Alabarda", "flail": "Mangual",
+}
+
+# Dicionário de tradução, semeado com os exemplos do prompt. Chave: nome normalizado (minúsculo).
+TRADUCOES = {
+    "dragon": "Dragão",
+    "dwarf": "Anão",
+    "unchained immortals": "Imortais Libertos",
+    "owlbear": "Urso-Coruja",
+    "displacer beast": "Pantera Deslocadora",
+    "dragonborn": "Dracônico",
+    "human mage": "Mago Humano",
+    "colossus": "Colosso",
+    "elf": "Elfo",
+    "skeleton": "Esqueleto",
+    "zombie": "Zumbi",
+    "werewolf": "Lobisomem",
+    "vampire": "Vampiro",
+    "giant": "Gigante",
+    "ghost": "Fantasma",
+}
+
+# Nomes próprios/clássicos que ficam em inglês
+MANTER_EM_INGLES = {"beholder", "lich", "fire hellion", "orc", "goblin", "kobold", "mimic", "troll"}
+
+def _separar_tokens(nome_arquivo):
+    """'DisplacerBeast_Shot1-Black.png' -> ['Displacer', 'Beast', 'Shot1', 'Black']"""
+    base = os.path.splitext(os.path.basename(nome_arquivo))[0]
+    base = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", base)   # camelCase
+    return [t for t in re.split(r"[\s_\-\.]+", base) if t]
+
+def _eh_angulo(token):
+    t = token.lower()
+    return bool(re.fullmatch(r"\d+", t)) or any(
+        re.fullmatch(rf"{p}\d*", t) for p in PREFIXOS_ANGULO)
+
+def analisar_nome(nome_arquivo):
+    """
+    Quebra o nome do arquivo em (nome_base, variacao, visao).
+    Retorna None se algum pedaço não for reconhecido (caso ambíguo).
+    """
+    tokens = _separar_tokens(nome_arquivo)
+
+    # O nome do produto são os tokens iniciais até a primeira palavra-chave
+    nome = []
+    while tokens and not (tokens[0].lower() in VISOES or tokens[0].lower() in VARIACOES
+                          or tokens[0].lower() in CORES_FUNDO or _eh_angulo(tokens[0])):
+        nome.append(tokens.pop(0))
+    if not nome:
+        return None
+
+    variacao, visao = None, None
+    for token in tokens:
+        t = token.lower()
+        if t in CORES_FUNDO:
+            continue
+        if t in VARIACOES and variacao is None:
+            variacao = VARIACOES[t]
+        elif t in VISOES and visao is None:
+            visao = VISOES[t]
+        elif _eh_angulo(t):
+            visao = visao or "showcase"
+        else:
+            return None  # Sobrou uma palavra desconhecida
+
+    return " ".join(nome), variacao, visao or "front"
+
+def traduzir_nome(nome_base):
+    """Nome final do produto, ou None se o nome não for conhecido (deixa o modelo decidir)."""
+    chave = nome_base.lower()
+    if chave in TRADUCOES:
+        return TRADUCOES[chave]
+    if chave in MANTER_EM_INGLES:
+        return nome_base
+    return None
+
+def classificar_localmente(arquivos_por_colecao):
+    """
+    Classifica os casos confiáveis sem IA.
+    Recebe {colecao: ["Colecao/Arquivo.jpg", ...]} e retorna (produtos, restantes), onde
+    'produtos' segue o formato do ProdutoRPG e 'restantes' tem o mesmo formato da entrada,
+    só com os arquivos ambíguos. Um produto só é resolvido localmente se TODAS as suas
+    fotos forem reconhecidas; senão o grupo inteiro vai para o modelo (agrupamento consistente).
+    """
+    produtos, restantes = [], {}
+
+    for colecao, arquivos in arquivos_por_colecao.items():
+        grupos = {}      # nome_base (minúsculo) -> [(arquivo, analise)]
+        ambiguos = []
+
+        for arquivo in arquivos:
+            analise = analisar_nome(arquivo.split("/", 1)[-1])
+            if analise is None:
+                ambiguos.append(arquivo)
+            else:
+                grupos.setdefault(analise[0].lower(), []).append((arquivo, analise))
+
+        # Grupos com nome desconhecido vão para o modelo
+        nomes = {chave: traduzir_nome(itens[0][1][0]) for chave, itens in grupos.items()}
+        for chave, nome_produto in nomes.items():
+            if nome_produto is None:
+                ambiguos.extend(arquivo for arquivo, _ in grupos[chave])
+
+        # Um arquivo ambíguo que começa com a mesma palavra pode ser do mesmo produto:
+        # nesse caso o grupo inteiro também vai, para o modelo agrupar tudo junto
+        primeiras_palavras = {_separar_tokens(a.split("/", 1)[-1])[0].lower()
+                              for a in ambiguos if _separar_tokens(a.split("/", 1)[-1])}
+
+        for chave, itens in grupos.items():
+            nome_produto = nomes[chave]
+            if nome_produto is None:
+                continue
+            if chave.split()[0] in primeiras_palavras:
+                ambiguos.extend(arquivo for arquivo, _ in itens)
+                continue
+
+            variacoes = {}
+            for arquivo, (_, variacao, visao) in itens:
+                variacoes.setdefault(variacao or "Padrão", []).append(
+                    {"filename": arquivo, "view_type": visao})
+
+            produtos.append({
+                "collection_name": colecao,
+                "product_name": nome_produto,
+                "variations": [{"variation_name": nome, "images": imagens}
+                               for nome, imagens in variacoes.items()],
+            })
+
+        if ambiguos:
+            restantes[colecao] = sorted(ambiguos)
+
+    return produtos, restantes
@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+# ==============================================================================
+# CODIFICAÇÃO JPEG ADAPTATIVA
+# No lugar de qualidade fixa para toda foto, procura (busca binária, codificando
+# num buffer em memória) a qualidade certa para cada imagem:
+# - orçamento de bytes: a MAIOR qualidade que cabe no tamanho pedido;
+# - limiar perceptual (PSNR): a MENOR qualidade que ainda fica acima do limiar.
+# Fundo branco liso comprime muito: a maioria das fotos cabe com folga e fica menor.
+# Metadados (EXIF/ICC) nunca são gravados.
+# ==============================================================================
+
+QUALIDADE_MINIMA = 60   # Piso da busca (abaixo disso os artefatos aparecem no anúncio)
+
+def codificar(img, qualidade, progressivo=False, subamostragem=-1):
+    """Bytes do JPEG, sem EXIF/ICC. subamostragem: -1 padrão, 0 = 4:4:4, 1 = 4:2:2, 2 = 4:2:0."""
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=qualidade, optimize=True, progressive=progressivo,
+             subsampling=subamostragem, exif=b"")
+    return buffer.getvalue()
+
+LINHAS_POR_FAIXA = 128   # O erro do PSNR é somado em faixas: nunca uma cópia float da imagem inteira
+
+def psnr(referencia, dados):
+    """PSNR (dB) do JPEG 'dados' contra a matriz RGB 'referencia' (uint8)."""
+    with Image.open(io.BytesIO(dados)) as decodificada:
+        matriz = np.asarray(decodificada if decodificada.mode == "RGB" else decodificada.convert("RGB"))
+    soma = 0
+    for inicio in range(0, matriz.shape[0], LINHAS_POR_FAIXA):
+        diferenca = matriz[inicio:inicio + LINHAS_POR_FAIXA].astype(np.int32) - referencia[inicio:inicio + LINHAS_POR_FAIXA]
+        soma += int(np.einsum("ijk,ijk->", diferenca, diferenca))
+    erro = soma / matriz.size
+    return float("inf") if erro == 0 else 10 * np.log10(255.0 ** 2 / erro)
+
+def _busca_binaria(minimo, maximo, aceita):
+    """Maior q em [minimo, maximo] com aceita(q) True (supondo aceita monótona), ou None."""
+    melhor = None
+    while minimo <= maximo:
+        meio = (minimo + maximo) // 2
+        if aceita(meio):
+            melhor, minimo = meio, meio + 1
+        else:
+            maximo = meio - 1
+    return melhor
+
+def codificar_adaptativo(img, qualidade_maxima, orcamento_bytes=None, psnr_minimo=None,
+                         qualidade_minima=QUALIDADE_MINIMA, progressivo=False, subamostragem=-1):
+    """
+    Codifica 'img' (RGB) na qualidade escolhida entre qualidade_minima e qualidade_maxima.
+    Sem orçamento nem PSNR, usa qualidade_maxima direto (uma codificação só).
+    Retorna (bytes, qualidade, bytes_referencia), onde a referência é o tamanho na
+    qualidade_maxima, para medir a economia.
+    """
+    codificados = {}
+
+    def _em(qualidade):
+        if qualidade not in codificados:
+            codificados[qualidade] = codificar(img, qualidade, progressivo, subamostragem)
+        return codificados[qualidade]
+
+    referencia = len(_em(qualidade_maxima))
+    escolhida = qualidade_maxima
+
+    if orcamento_bytes and referencia > orcamento_bytes:
+        cabe = _busca_binaria(qualidade_minima, qualidade_maxima - 1, lambda q: len(_em(q)) <= orcamento_bytes)
+        escolhida = cabe if cabe is not None else qualidade_minima
+
+    if psnr_minimo:
+        original = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+        # Menor q que passa no limiar = maior q (na escala invertida) que ainda passa
+        invertida = _busca_binaria(-escolhida, -qualidade_minima, lambda q: psnr(original, _em(-q)) >= psnr_minimo)
+        if invertida is not None:
+            escolhida = -invertida
+
+    return _em(escolhida), escolhida, referencia
@@ -0,0 +1,155 @@
+import time
+import queue
+import threading
+from collections import deque
+
+from app import armazem
+from app import organizador
+from app import processador
+from app import cadastrador
+from app import metricas
+
+# ==============================================================================
+# ESTEIRA (PIPELINE CONTÍNUO)
+# Organizar -> Processar -> Cadastrar rodando ao mesmo tempo, ligados por filas
+# limitadas: cada produto segue para a próxima etapa assim que sai da anterior.
+# ==============================================================================
+
+TAMANHO_FILA = 8          # Produtos no máximo esperando entre uma etapa e outra
+LOTE_PROCESSAR = 16       # Produtos já na fila juntados numa única chamada ao Processador
+INTERVALO_MANIFESTO = 30  # Segundos entre gravações do manifesto de build (e uma no fim)
+_FIM = object()           # Sinal de "acabou" passado adiante pelas filas
+
+def _etapa_organizar(pasta_originais, arquivo_mapa, fila_saida, erros):
+    try:
+        entregues = set()
+        for produto in organizador.gerar_produtos_em_fluxo(pasta_originais, arquivo_mapa):
+            entregues.add((produto['collection_name'], produto['product_name']))
+            fila_saida.put(produto)
+
+        # Produtos mapeados em execuções anteriores e ainda não cadastrados também seguem pela esteira
+        enviados = cadastrador.carregar_historico()
+        pendentes = [p for p in organizador.carregar_mapa_existente(arquivo_mapa)
+                     if (p['collection_name'], p['product_name']) not in entregues
+                     and p['product_name'] not in enviados]
+        if pendentes:
+            print(f"📋 {len(pendentes)} produtos já mapeados e ainda não cadastrados entram na esteira.")
+        for produto in pendentes:
+            fila_saida.put(produto)
+    except Exception as e:
+        erros.append(("organizar", e))
+        print(f"❌ Esteira (organizar): {e}")
+    finally:
+        fila_saida.put(_FIM)
+
+def _proximo_lote(fila_entrada):
+    """
+    Espera o próximo produto e junta os que já estão na fila (até LOTE_PROCESSAR), sem
+    esperar por mais. Retorna (lote, acabou): 'acabou' quando o _FIM veio junto.
+    """
+    lote = [fila_entrada.get()]
+    while lote[-1] is not _FIM and len(lote) < LOTE_PROCESSAR:
+        try:
+            lote.append(fila_entrada.get_nowait())
+        except queue.Empty:
+            break
+    if lote[-1] is _FIM:
+        return lote[:-1], True
+    return lote, False
+
+def _etapa_processar(fila_entrada, fila_saida, arquivo_armazem, num_workers, erros):
+    # Um manifesto só, em memória, para a esteira inteira (gravado de tempos em tempos)
+    manifesto = processador.carregar_manifesto()
+    gravado_em = time.time()
+    try:
+        with processador.criar_pool(num_workers) as pool:
+            acabou = False
+            while not acabou:
+                lote, acabou = _proximo_lote(fila_entrada)
+                if not lote:
+                    continue
+                try:
+                    relatorio = processador.executar_pipeline(lote, executor=pool, manifesto=manifesto)
+                    armazem.salvar_produtos(lote, arquivo_armazem)
+                except Exception as e:
+                    # Um lote com problema não trava a esteira
+                    erros.append(("processar", e))
+                    print(f"❌ Esteira (processar) {[p.get('product_name') for p in lote]}: {e}")
+                    continue
+
+                for produto in lote:
+                    nome = produto.get('product_name')
+                    falhas = sum(1 for falha in relatorio["falhas"] if falha["produto"] == nome)
+                    prontas = sum(1 for variacao in produto['variations'] for imagem in variacao['images']
+                                  if imagem.get('processed_path'))
+                    if falhas:
+                        erros.append(("processar", f"{nome}: {falhas} imagem(ns) com falha"))
+                    if prontas:
+                        fila_saida.put(produto)
+                    elif not falhas:
+                        erros.append(("processar", f"{nome}: nenhuma imagem de origem encontrada"))
+
+                if time.time() - gravado_em >= INTERVALO_MANIFESTO:
+                    processador.salvar_manifesto(manifesto)
+                    gravado_em = time.time()
+    finally:
+        processador.salvar_manifesto(manifesto)
+        fila_saida.put(_FIM)
+
+def executar_esteira(pasta_originais, arquivo_mapa, arquivo_armazem=armazem.ARQUIVO_ARMAZEM,
+                     headless=False, num_workers=None):
+    """
+    Roda as três etapas sobrepostas. O navegador é aberto (e o login feito) antes,
+    então o primeiro anúncio sai assim que o primeiro produto fica pronto.
+    Organizar e processar rodam em threads; o cadastro roda na thread principal
+    (o Selenium e a parada de emergência ficam onde sempre estiveram).
+    """
+    driver = cadastrador.abrir_sessao(headless=headless)
+    metricas.iniciar_execucao("esteira")
+    inicio = time.time()
+
+    fila_processar = queue.Queue(maxsize=TAMANHO_FILA)
+    fila_cadastrar = queue.Queue(maxsize=TAMANHO_FILA)
+    erros = []
+
+    threading.Thread(target=_etapa_organizar, daemon=True,
+                     args=(pasta_originais, arquivo_mapa, fila_processar, erros)).start()
+    threading.Thread(target=_etapa_processar, daemon=True,
+                     args=(fila_processar, fila_cadastrar, arquivo_armazem, num_workers, erros)).start()
+
+    produtos_ja_enviados = cadastrador.carregar_historico()
+    cadastrados = 0
+    refila = deque()   # Falhas voltam no fim, depois que a esteira esvaziar
+    while True:
+        produto = fila_cadastrar.get()
+        if produto is _FIM:
+            break
+
+        nome = produto['product_name']
+        if nome in produtos_ja_enviados:
+            print(f"   ⚠️ Produto já processado: {nome}")
+            continue
+
+        print(f"\n🚀 CADASTRANDO (esteira): {nome}")
+        resultado = cadastrador.tentar_cadastro(driver, produto, refila)
+        if resultado:
+            produtos_ja_enviados.add(nome)   # Uma versão maior do mesmo produto pode voltar do organizador
+            cadastrados += 1
+            if cadastrados == 1:
+                print(f"⏱️ Primeiro anúncio salvo em {time.time() - inicio:.1f}s.")
+        elif resultado is None:
+            erros.append(("cadastrar", nome))
+
+    if refila:
+        print(f"\n🔁 {len(refila)} produtos com falha voltando para nova tentativa...")
+        cadastrados += cadastrador.processar_refila(driver, refila)
+
+    print(f"🏁 Esteira concluída: {cadastrados} produtos cadastrados em {time.time() - inicio:.1f}s"
+          f" ({len(erros)} erros).")
+    for etapa, detalhe in erros:
+        print(f"   ❌ {etapa}: {detalhe}")
+    metricas.imprimir_resumo()
+    metricas.encerrar_execucao()
+    input("Enter para sair.")
+    driver.quit()
+    return cadastrados, erros
@@ -0,0 +1,100 @@
+from app import localizadores
+
+# ==============================================================================
+# PREENCHIMENTO EM LOTE (UM execute_script PARA VÁRIOS CAMPOS)
+# No lugar de achar/rolar/clicar/Ctrl+A/Backspace/digitar campo por campo (5+ idas
+# ao navegador cada), manda todos os campos de texto simples de uma vez. O valor é
+# gravado pelo setter nativo do input + eventos input/change, que é o que o React
+# escuta (atribuir .value direto não atualiza o estado do componente).
+# ==============================================================================
+
+OK = "ok"
+NAO_ENCONTRADO = "nao_encontrado"
+DIVERGENTE = "divergente"     # Gravou, mas o componente reformatou/rejeitou o valor
+
+def _numero(texto):
+    try:
+        return float(texto.strip().replace(",", "."))
+    except ValueError:
+        return None
+
+def valor_equivalente(lido, esperado):
+    """
+    True se o que ficou no campo é o valor pedido: igual, ou o mesmo número com outra
+    formatação (vírgula/ponto decimal, ex: "0,1" -> "0.1"). Mesma regra do _JS_PREENCHER.
+    """
+    lido, esperado = (lido or "").strip(), str(esperado).strip()
+    if lido == esperado:
+        return True
+    numero = _numero(esperado)
+    return numero is not None and _numero(lido) == numero
+
+_JS_PREENCHER = """
+const campos = arguments[0];
+const setterInput = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+const setterTexto = Object.getOwnPropertyDescriptor(HTMLTextAreaElement.prototype, 'value').set;
+
+// Mesma regra do valor_equivalente (Python): igual, ou o mesmo número com vírgula/ponto trocados
+function numero(texto) {
+    const t = texto.trim().replace(',', '.');
+    return t !== '' && isFinite(t) ? Number(t) : null;
+}
+function equivalente(lido, esperado) {
+    lido = (lido || '').trim(); esperado = esperado.trim();
+    if (lido === esperado) return true;
+    const n = numero(esperado);
+    return n !== null && numero(lido) === n;
+}
+
+function achar(raiz, estrategias) {
+    for (const [tipo, seletor] of estrategias) {
+        let lista = [];
+        if (tipo === 'css') {
+            lista = Array.from(raiz.querySelectorAll(seletor));
+        } else {
+            const r = document.evaluate(seletor, raiz, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (let i = 0; i < r.snapshotLength; i++) lista.push(r.snapshotItem(i));
+        }
+        if (lista.length) return lista;
+    }
+    return [];
+}
+
+const resultado = {};
+for (const campo of campos) {
+    try {
+        let alvo = document;
+        for (let n = 0; n < campo.niveis.length && alvo; n++) {
+            const indice = n === campo.niveis.length - 1 ? campo.indice : 0;
+            const lista = achar(alvo, campo.niveis[n]);
+            alvo = lista.length > indice ? lista[indice] : null;
+        }
+        if (!alvo) { resultado[campo.chave] = 'nao_encontrado'; continue; }
+
+        alvo.focus();
+        (alvo instanceof HTMLTextAreaElement ? setterTexto : setterInput).call(alvo, campo.valor);
+        alvo.dispatchEvent(new Event('input', {bubbles: true}));
+        alvo.dispatchEvent(new Event('change', {bubbles: true}));
+        alvo.blur();
+        resultado[campo.chave] = equivalente(alvo.value, campo.valor) ? 'ok' : 'divergente';
+    } catch (e) {
+        resultado[campo.chave] = 'erro: ' + e.message;
+    }
+}
+return resultado;
+"""
+
+def preencher_em_lote(driver, campos):
+    """
+    Preenche vários inputs numa única chamada ao navegador.
+    'campos': {chave: (nome_localizador, valor)} ou {chave: (nome_localizador, valor, {parametros})},
+    com 'indice' opcional dentro dos parâmetros (0 = primeiro elemento que casar).
+    Retorna {chave: "ok" | "nao_encontrado" | "divergente" | "erro: ..."}.
+    """
+    carga = []
+    for chave, (nome, valor, *resto) in campos.items():
+        parametros = dict(resto[0]) if resto else {}
+        indice = parametros.pop("indice", 0)
+        carga.append({"chave": chave, "valor": str(valor), "indice": indice,
+                      "niveis": localizadores.cadeia(nome, **parametros)})
+    return driver.execute_script(_JS_PREENCHER, carga)
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+
+# ==============================================================================
+# HISTÓRICO DE CADASTROS (SQLite)
+# Substitui o logs/history.json: cada evento é um INSERT (append-only), a situação
+# atual de cada produto fica numa tabela indexada pelo nome. Seguro com vários
+# navegadores/processos gravando ao mesmo tempo (WAL + busy timeout).
+# ==============================================================================
+
+ARQUIVO_HISTORICO_DB = "logs/history.db"
+ARQUIVO_HISTORICO_JSON = "logs/history.json"   # Formato antigo (migrado automaticamente)
+
+SUCESSO = "sucesso"
+FALHA = "falha"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    nome          TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,
+    tentativas    INTEGER NOT NULL DEFAULT 0,
+    motivo        TEXT,
+    criado_em     REAL NOT NULL,
+    atualizado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS etapas (
+    nome         TEXT NOT NULL,
+    etapa        TEXT NOT NULL,
+    concluida_em REAL NOT NULL,
+    PRIMARY KEY (nome, etapa)
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome   TEXT NOT NULL,
+    status TEXT NOT NULL,
+    motivo TEXT,
+    em     REAL NOT NULL
+);
+"""
+
+def conectar(caminho=ARQUIVO_HISTORICO_DB):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    novo = not os.path.exists(caminho)
+    conexao = sqlite3.connect(caminho, timeout=30)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(_ESQUEMA)
+    if novo and caminho == ARQUIVO_HISTORICO_DB:
+        _migrar_json(conexao)
+    return conexao
+
+def _migrar_json(conexao, arquivo_json=ARQUIVO_HISTORICO_JSON):
+    """Importa a lista de nomes do history.json antigo como cadastros bem-sucedidos."""
+    try:
+        with open(arquivo_json, "r", encoding="utf-8") as f:
+            nomes = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+    agora = time.time()
+    with conexao:
+        conexao.executemany(
+            "INSERT OR IGNORE INTO produtos (nome, status, tentativas, criado_em, atualizado_em) "
+            "VALUES (?, ?, 1, ?, ?)",
+            [(nome, SUCESSO, agora, agora) for nome in nomes]
+        )
+    print(f"📥 {len(nomes)} produtos migrados de {arquivo_json}.")
+
+def registrar(nome, status, motivo=None, caminho=ARQUIVO_HISTORICO_DB):
+    """Registra um resultado (evento + situação atual) numa única transação."""
+    agora = time.time()
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            conexao.execute("INSERT INTO eventos (nome, status, motivo, em) VALUES (?, ?, ?, ?)",
+                            (nome, status, motivo, agora))
+            conexao.execute(
+                """INSERT INTO produtos (nome, status, tentativas, motivo, criado_em, atualizado_em)
+                   VALUES (?, ?, 1, ?, ?, ?)
+                   ON CONFLICT (nome) DO UPDATE SET status = excluded.status,
+                                                   tentativas = tentativas + 1,
+                                                   motivo = excluded.motivo,
+                                                   atualizado_em = excluded.atualizado_em""",
+                (nome, status, motivo, agora, agora)
+            )
+    finally:
+        conexao.close()
+
+def carregar_enviados(caminho=ARQUIVO_HISTORICO_DB):
+    """Conjunto (busca O(1)) com os nomes dos produtos já cadastrados com sucesso."""
+    conexao = conectar(caminho)
+    try:
+        return {nome for (nome,) in conexao.execute("SELECT nome FROM produtos WHERE status = ?", (SUCESSO,))}
+    finally:
+        conexao.close()
+
+def situacao(nome, caminho=ARQUIVO_HISTORICO_DB):
+    """Dict com status, tentativas, motivo e datas do produto (ou None se nunca foi tentado)."""
+    conexao = conectar(caminho)
+    conexao.row_factory = sqlite3.Row
+    try:
+        linha = conexao.execute("SELECT * FROM produtos WHERE nome = ?", (nome,)).fetchone()
+        return dict(linha) if linha else None
+    finally:
+        conexao.close()
+
+# --- DIÁRIO DE ETAPAS (checkpoint dentro de um cadastro) ---
+def marcar_etapa(nome, etapa, caminho=ARQUIVO_HISTORICO_DB):
+    """Registra que uma etapa do cadastro do produto terminou."""
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            conexao.execute("INSERT OR REPLACE INTO etapas (nome, etapa, concluida_em) VALUES (?, ?, ?)",
+                            (nome, etapa, time.time()))
+    finally:
+        conexao.close()
+
+def etapas_concluidas(nome, caminho=ARQUIVO_HISTORICO_DB):
+    """Conjunto com as etapas já concluídas na tentativa atual do produto."""
+    conexao = conectar(caminho)
+    try:
+        return {etapa for (etapa,) in conexao.execute("SELECT etapa FROM etapas WHERE nome = ?", (nome,))}
+    finally:
+        conexao.close()
+
+def limpar_etapas(nome, caminho=ARQUIVO_HISTORICO_DB):
+    """Zera o diário do produto (início de uma nova tentativa, num formulário novo)."""
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            conexao.execute("DELETE FROM etapas WHERE nome = ?", (nome,))
+    finally:
+        conexao.close()
+
+def compactar(caminho=ARQUIVO_HISTORICO_DB, manter_dias=30):
+    """Apaga eventos antigos (a situação atual de cada produto é preservada)."""
+    limite = time.time() - manter_dias * 86400
+    conexao = conectar(caminho)
+    try:
+        with conexao:
+            apagados = conexao.execute("DELETE FROM eventos WHERE em < ?", (limite,)).rowcount
+        conexao.execute("VACUUM")
+        return apagados
+    finally:
+        conexao.close()
@@ -0,0 +1,312 @@
+import time
+import string
+import threading
+
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import StaleElementReferenceException
+
+# ==============================================================================
+# REGISTRO DE LOCALIZADORES
+# Todos os seletores do painel da Shopee num lugar só, com nome. Cada um tem uma
+# cadeia de estratégias (CSS primeiro, XPath de reserva) e pode ser procurado
+# dentro de um "container" já achado antes (guardado em cache até ficar velho).
+# Cada busca conta acertos por estratégia e tempo, para achar seletor lento/quebrado.
+# ==============================================================================
+
+CSS = "css"
+XPATH = "xpath"
+
+PRESENTE = "presente"
+VISIVEL = "visivel"
+CLICAVEL = "clicavel"
+
+INTERVALO_BUSCA = 0.1   # Segundos entre uma varredura e outra enquanto espera
+
+_TIPOS = {CSS: By.CSS_SELECTOR, XPATH: By.XPATH}
+
+def localizador(*estrategias, dentro=None):
+    """
+    Monta uma entrada do registro. 'estrategias' são pares (CSS|XPATH, seletor) em ordem
+    de preferência; os seletores aceitam {parametros}. 'dentro' é o nome de outro
+    localizador usado como container (aí o XPath precisa ser relativo: './/...').
+    """
+    campos = {campo for _, seletor in estrategias
+              for _, campo, _, _ in string.Formatter().parse(seletor) if campo}
+    return {"estrategias": list(estrategias), "dentro": dentro, "campos": campos}
+
+REGISTRO = {
+    # --- Galeria / dados básicos ---
+    "upload_galeria": localizador(
+        (CSS, "input[type='file']"),
+        (XPATH, "//input[@type='file']")),
+    "galeria": localizador(
+        (CSS, "[class*='shopee-image-manager__content']"),
+        (XPATH, "//div[contains(@class, 'shopee-image-manager__content')]")),
+    # Marcas dentro de cada miniatura (lidas via JS pelo Cadastrador, só o CSS é usado).
+    # Presas ao prefixo do componente da galeria: um 'error'/'loading' genérico casaria
+    # com ícones e tooltips que ficam dentro da caixa mesmo com a imagem boa.
+    "progresso_upload": localizador(
+        (CSS, "[class*='image-manager__upload-progress'], [class*='image-manager__item-loading'], "
+              "[class*='image-manager__item-uploading']")),
+    "erro_upload": localizador(
+        (CSS, "[class*='image-manager__item-error'], [class*='image-manager__item-fail'], "
+              "[class*='image-manager__upload-error']")),
+    "nome_produto": localizador(
+        (CSS, "input[placeholder='Nome da Marca + Tipo do Produto + Atributos-chave (Materiais, Cores, Tamanho, Modelo)']"),
+        (XPATH, "//input[@placeholder='Nome da Marca + Tipo do Produto + Atributos-chave (Materiais, Cores, Tamanho, Modelo)']")),
+    "botao_proximo": localizador(
+        (XPATH, "//button[contains(., 'Next Step') or contains(., 'Próximo')]")),
+
+    # --- Categoria ---
+    "sugestao_categoria": localizador(
+        (XPATH, "//div[contains(@class, 'category-select-radio') and contains(., '{termo}')]")),
+    "seletor_categoria": localizador(
+        (CSS, "div[class*='product-category-box'], div[class*='shopee-product-category-input']"),
+        (XPATH, "//div[contains(@class, 'product-category-box') or contains(@class, 'shopee-product-category-input')]")),
+    "busca_categoria": localizador(
+        (CSS, "input[placeholder*='Insira ao menos']"),
+        (XPATH, "//input[contains(@placeholder, 'Insira ao menos')]")),
+    "item_lista": localizador(
+        (XPATH, "//li[contains(., '{texto}')]")),
+    "botao_confirmar": localizador(
+        (XPATH, "//button[contains(., 'Confirmar')]")),
+
+    # --- Descrição ---
+    "editor_descricao": localizador(
+        (CSS, "div[contenteditable='true']"),
+        (XPATH, "//div[@contenteditable='true']")),
+
+    # --- Atributos ---
+    "campo_atributo": localizador(
+        (XPATH, "//div[contains(@class, 'attribute-select-item')][.//div[contains(., '{titulo}')]]")),
+    "dropdown_atributo": localizador(
+        (CSS, "div[class*='edit-row-right-medium']"),
+        (XPATH, ".//div[contains(@class, 'edit-row-right-medium')]"),
+        dentro="campo_atributo"),
+    "input_atributo": localizador(
+        (CSS, "input"),
+        (XPATH, ".//input"),
+        dentro="campo_atributo"),
+    "dropdown_marca": localizador(
+        (XPATH, "//*[contains(text(), '{titulo}')]/following::div[contains(@class, 'attribute-select-item')][1]")),
+    "adicionar_item": localizador(
+        (XPATH, "//div[contains(text(), 'Adicionar um novo item')] | //span[contains(., 'Adicionar um novo item')]")),
+    "novo_item_input": localizador(
+        (CSS, "ul div[class*='eds-option-add__input'] input"),
+        (XPATH, "//ul//div[contains(@class, 'eds-option-add__input')]//input")),
+    "novo_item_confirmar": localizador(
+        (CSS, "ul div[class*='eds-option-add__input'] button[class*='eds-option-add__add-confirm-icon']"),
+        (XPATH, "//ul//div[contains(@class, 'eds-option-add__input')]//button[contains(@class, 'eds-option-add__add-confirm-icon')]")),
+    "busca_lista": localizador(
+        (CSS, "input[placeholder*='Insira ao menos'], input[type='search']"),
+        (XPATH, "//input[contains(@placeholder, 'Insira ao menos') or @type='search']")),
+    "opcao_lista": localizador(
+        (XPATH, "//div[contains(@class, 'eds-option')][contains(., '{valor}')]")),
+
+    # --- Variações ---
+    "ativar_variacoes": localizador(
+        (CSS, "div[class*='variation-add-button'] button"),
+        (XPATH, "//div[contains(@class, 'variation-add-button')]//button")),
+    "ativar_variacoes_2": localizador(
+        (CSS, "div[class*='variation-add-2'] button"),
+        (XPATH, "//div[contains(@class, 'variation-add-2')]//button")),
+    "grupo_variacao": localizador(
+        (CSS, "div[data-product-edit-field-unique-id*='tierVariation_{grupo}']"),
+        (XPATH, "//div[contains(@data-product-edit-field-unique-id, 'tierVariation_{grupo}')]")),
+    "nome_grupo_variacao": localizador(
+        (CSS, "input"),
+        (XPATH, ".//input"),
+        dentro="grupo_variacao"),
+    "opcao_variacao": localizador(
+        (CSS, "[class*='option-container'] input[placeholder='Inserir'], [class*='option-container'] input[placeholder='Enter']"),
+        (XPATH, ".//div[contains(@class,'option-container')]//input[@placeholder='Inserir' or @placeholder='Enter']"),
+        dentro="grupo_variacao"),
+    "edicao_em_lote": localizador(
+        (CSS, "div[class*='batch-edit']"),
+        (XPATH, "//div[contains(@class, 'batch-edit')]")),
+    "lote_preco": localizador(
+        (CSS, "input[placeholder='Preço']"),
+        (XPATH, ".//input[@placeholder='Preço']"),
+        dentro="edicao_em_lote"),
+    "lote_estoque": localizador(
+        (CSS, "input[placeholder='Estoque']"),
+        (XPATH, ".//input[@placeholder='Estoque']"),
+        dentro="edicao_em_lote"),
+    "lote_aplicar": localizador(
+        (XPATH, ".//button[contains(., 'Aplicar')]"),   # Pode ser 'Apply to all'
+        dentro="edicao_em_lote"),
+    "tabela_variacoes": localizador(
+        (CSS, "div[class*='variation-model-table-body']"),
+        (XPATH, "//div[contains(@class, 'variation-model-table-body')]")),
+    "foto_variacao": localizador(
+        (CSS, "input[type='file']"),
+        (XPATH, ".//input[@type='file']"),
+        dentro="tabela_variacoes"),
+
+    # --- Envio / finalização ---
+    "agrupavel_sim": localizador(
+        (XPATH, "//div[contains(@class,'editor-row') and contains(.,'Produto é um item agrupável')]//label[normalize-space()='Sim']")),
+    "peso_envio": localizador(
+        (CSS, "div[data-product-edit-field-unique-id*='weight'] input[placeholder*='Inserir']"),
+        (XPATH, "//div[contains(@data-product-edit-field-unique-id, 'weight')]//input[contains(@placeholder, 'Inserir')]")),
+    "dimensao_envio": localizador(
+        (CSS, "div[data-product-edit-field-unique-id='{campo}'] input[placeholder*='{rotulo}']"),
+        (XPATH, "//div[@data-product-edit-field-unique-id='{campo}']//input[contains(@placeholder, '{rotulo}')]")),
+    "switch_retirada": localizador(
+        (XPATH, "//div[contains(@class,'logistics-item-ui-t1')][.//div[contains(normalize-space(.), 'Retirada')]]//div[contains(@class,'eds-switch')]")),
+    "pre_encomenda_sim": localizador(
+        (XPATH, "//div[@data-product-edit-field-unique-id='preOrder']//label[.//span[normalize-space()='Sim']]")),
+    "dias_pre_encomenda": localizador(
+        (CSS, "div[class*='pre-order-input'] input[placeholder*='0']"),
+        (XPATH, "//div[contains(@class, 'pre-order-input')]//input[contains(@placeholder, '0')]")),
+    "botao_salvar": localizador(
+        (XPATH, "//button[.//span[contains(normalize-space(.), 'Salvar e Não Publicar')]]")),
+    "confirmar_salvar_modal": localizador(
+        (XPATH, "//div[contains(@class,'eds-modal')]//button[contains(., 'Salvar e Não Publicar')]")),
+    # Cabeçalho do painel com a conta do vendedor: só existe logado
+    "painel_vendedor": localizador(
+        (CSS, "[class*='account-info'], [class*='seller-header'] [class*='avatar']"),
+        (XPATH, "//*[contains(@class, 'account-info')] | //*[contains(@class, 'seller-header')]//*[contains(@class, 'avatar')]")),
+    "aviso_salvo": localizador(
+        (XPATH, "//div[contains(@class,'toast')][contains(., 'sucesso') or contains(., 'salvo') or contains(., 'Salvo')]")),
+}
+
+# --- Cache de containers e estatísticas (compartilhados entre navegadores paralelos) ---
+_TRAVA = threading.Lock()
+_CONTAINERS = {}      # (id(driver), nome, parametros do container) -> WebElement
+_ESTATISTICAS = {}    # nome -> contadores
+
+def _parametros_de(entrada, parametros):
+    return tuple(sorted((campo, parametros[campo]) for campo in entrada["campos"]))
+
+def _condicao_ok(elemento, condicao):
+    if condicao == PRESENTE:
+        return True
+    if condicao == VISIVEL:
+        return elemento.is_displayed()
+    return elemento.is_displayed() and elemento.is_enabled()
+
+def _container(driver, nome, parametros):
+    """Elemento container (do cache se ainda estiver vivo), ou None se ainda não existe."""
+    entrada = REGISTRO[nome]
+    chave = (id(driver), nome, _parametros_de(entrada, parametros))
+    with _TRAVA:
+        elemento = _CONTAINERS.get(chave)
+    if elemento is not None:
+        return elemento
+    elementos, _ = _varrer(driver, nome, parametros)
+    if not elementos:
+        return None
+    with _TRAVA:
+        _CONTAINERS[chave] = elementos[0]
+    return elementos[0]
+
+def _esquecer_container(driver, nome, parametros):
+    with _TRAVA:
+        _CONTAINERS.pop((id(driver), nome, _parametros_de(REGISTRO[nome], parametros)), None)
+
+def _varrer(driver, nome, parametros):
+    """Uma passada pela cadeia de estratégias. Retorna (elementos, índice da estratégia que achou)."""
+    entrada = REGISTRO[nome]
+    raiz = driver
+    if entrada["dentro"]:
+        raiz = _container(driver, entrada["dentro"], parametros)
+        if raiz is None:
+            return [], None
+
+    for indice, (tipo, seletor) in enumerate(entrada["estrategias"]):
+        try:
+            elementos = raiz.find_elements(_TIPOS[tipo], seletor.format(**parametros))
+        except StaleElementReferenceException:
+            # O container saiu do DOM (re-render/navegação): acha de novo na próxima passada
+            _esquecer_container(driver, entrada["dentro"], parametros)
+            return [], None
+        if elementos:
+            return elementos, indice
+    return [], None
+
+def buscar_todos(driver, nome, **parametros):
+    """Todos os elementos do localizador agora (sem esperar)."""
+    elementos, _ = _varrer(driver, nome, parametros)
+    return elementos
+
+def buscar(driver, nome, condicao=PRESENTE, indice=0, **parametros):
+    """O elemento de posição 'indice' (0 = primeiro), se existir e atender à condição; senão None."""
+    elementos, _ = _varrer(driver, nome, parametros)
+    if len(elementos) <= indice:
+        return None
+    try:
+        return elementos[indice] if _condicao_ok(elementos[indice], condicao) else None
+    except StaleElementReferenceException:
+        return None
+
+def cadeia(nome, **parametros):
+    """
+    Níveis de busca do localizador, do container mais externo até ele, já com os
+    parâmetros aplicados: [[(tipo, seletor), ...], ...]. Usado pelo preenchimento via JS.
+    """
+    niveis = []
+    while nome:
+        entrada = REGISTRO[nome]
+        niveis.insert(0, [(tipo, seletor.format(**parametros)) for tipo, seletor in entrada["estrategias"]])
+        nome = entrada["dentro"]
+    return niveis
+
+def css(nome, **parametros):
+    """Primeiro seletor CSS do localizador (para scripts que rodam direto na página)."""
+    return next(seletor.format(**parametros) for tipo, seletor in REGISTRO[nome]["estrategias"] if tipo == CSS)
+
+def _registrar_busca(nome, estrategia, duracao):
+    with _TRAVA:
+        estatistica = _ESTATISTICAS.setdefault(
+            nome, {"chamadas": 0, "falhas": 0, "tempo_total": 0.0, "tempo_max": 0.0, "acertos": {}})
+        estatistica["chamadas"] += 1
+        estatistica["tempo_total"] += duracao
+        estatistica["tempo_max"] = max(estatistica["tempo_max"], duracao)
+        if estrategia is None:
+            estatistica["falhas"] += 1
+        else:
+            estatistica["acertos"][estrategia] = estatistica["acertos"].get(estrategia, 0) + 1
+
+def localizar(driver, nome, timeout=10, condicao=PRESENTE, indice=0, **parametros):
+    """
+    Espera o elemento do localizador 'nome' aparecer (atendendo à 'condicao') e o retorna.
+    Todas as estratégias são tentadas a cada passada, então um CSS quebrado não gasta o
+    timeout inteiro antes do XPath de reserva. Lança TimeoutError se nada achar.
+    """
+    inicio = time.time()
+    fim = inicio + timeout
+    while True:
+        elementos, estrategia = _varrer(driver, nome, parametros)
+        if len(elementos) > indice:
+            try:
+                if _condicao_ok(elementos[indice], condicao):
+                    _registrar_busca(nome, estrategia, time.time() - inicio)
+                    return elementos[indice]
+            except StaleElementReferenceException:
+                pass
+        if time.time() >= fim:
+            _registrar_busca(nome, None, time.time() - inicio)
+            detalhe = f" {parametros}" if parametros else ""
+            raise TimeoutError(f"Localizador '{nome}'{detalhe} não encontrado ({condicao}) em {timeout}s.")
+        time.sleep(INTERVALO_BUSCA)
+
+def estatisticas():
+    """Cópia dos contadores: {nome: {chamadas, falhas, tempo_total, tempo_max, acertos{estratégia: n}}}."""
+    with _TRAVA:
+        return {nome: dict(dados, acertos=dict(dados["acertos"])) for nome, dados in _ESTATISTICAS.items()}
+
+def imprimir_resumo():
+    """Tabela dos localizadores, do mais lento para o mais rápido, marcando falhas e uso de reserva."""
+    dados = estatisticas()
+    if not dados:
+        return
+    print("\n📊 Localizadores (tempo médio / máx / taxa de acerto):")
+    ordenados = sorted(dados.items(), key=lambda item: item[1]["tempo_total"] / item[1]["chamadas"], reverse=True)
+    for nome, d in ordenados:
+        medio = d["tempo_total"] / d["chamadas"] * 1000
+        taxa = (d["chamadas"] - d["falhas"]) / d["chamadas"] * 100
+        reserva = sum(n for estrategia, n in d["acertos"].items() if estrategia > 0)
+        alerta = " ❌" if d["falhas"] else (" ⚠️ reserva" if reserva else "")
+        print(f"   {nome:<24} {medio:7.0f}ms {d['tempo_max'] * 1000:7.0f}ms {taxa:5.0f}% "
+              f"({d['chamadas']}x){alerta}")
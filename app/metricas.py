@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# ==============================================================================
+# MÉTRICAS DO CADASTRO
+# Cronometra cada etapa (preencher_dados_basicos, selecionar_categoria...) e cada
+# espera/clique, grava um evento por linha (JSONL) em logs/metricas/ e monta, no fim,
+# o resumo com p50/p95 por etapa, repetições e produtos por hora.
+# ==============================================================================
+
+PASTA_METRICAS = "logs/metricas"
+
+ETAPA = "etapa"          # Funções de passo do formulário
+ACAO = "acao"            # Esperas e cliques
+PRODUTO = "produto"      # Um cadastro inteiro
+REPETICAO = "repeticao"  # Uma nova tentativa (de etapa, upload ou produto)
+
+_TRAVA = threading.Lock()
+_local = threading.local()   # Produto atual de cada navegador (thread)
+_execucao = {"arquivo": None, "inicio": None, "fim": None, "duracoes": {}, "falhas": {}, "repeticoes": {}, "salvos": 0}
+
+def iniciar_execucao(nome="cadastro"):
+    """Zera os contadores e abre um JSONL novo para esta execução. Retorna o caminho do arquivo."""
+    os.makedirs(PASTA_METRICAS, exist_ok=True)
+    caminho = os.path.join(PASTA_METRICAS, f"{nome}_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    with _TRAVA:
+        if _execucao["arquivo"]:
+            _execucao["arquivo"].close()
+        _execucao.update(arquivo=open(caminho, "a", encoding="utf-8"), inicio=time.time(), fim=None,
+                         duracoes={}, falhas={}, repeticoes={}, salvos=0)
+    return caminho
+
+def encerrar_execucao():
+    """Fecha o JSONL e congela a duração (o resumo continua disponível)."""
+    with _TRAVA:
+        _execucao["fim"] = time.time()
+        if _execucao["arquivo"]:
+            _execucao["arquivo"].close()
+            _execucao["arquivo"] = None
+
+def registrar(tipo, nome, **dados):
+    """Grava um evento (e atualiza os contadores do resumo)."""
+    evento = {"em": round(time.time(), 3), "tipo": tipo, "nome": nome,
+              "produto": getattr(_local, "produto", None), **dados}
+    with _TRAVA:
+        if "duracao" in evento:
+            _execucao["duracoes"].setdefault((tipo, nome), []).append(evento["duracao"])
+            if not evento.get("ok", True):
+                _execucao["falhas"][(tipo, nome)] = _execucao["falhas"].get((tipo, nome), 0) + 1
+        if tipo == REPETICAO:
+            _execucao["repeticoes"][nome] = _execucao["repeticoes"].get(nome, 0) + 1
+        if tipo == PRODUTO and evento.get("salvo"):
+            _execucao["salvos"] += 1
+        if _execucao["arquivo"]:
+            _execucao["arquivo"].write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+            _execucao["arquivo"].flush()
+
+@contextmanager
+def produto_atual(nome):
+    """Marca os eventos desta thread como sendo do produto 'nome'."""
+    anterior = getattr(_local, "produto", None)
+    _local.produto = nome
+    try:
+        yield
+    finally:
+        _local.produto = anterior
+
+@contextmanager
+def medir(nome, tipo=ETAPA, **dados):
+    """Cronometra o bloco e registra a duração (ok=False se saiu com exceção)."""
+    inicio = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        registrar(tipo, nome, duracao=round(time.perf_counter() - inicio, 4), ok=ok, **dados)
+
+def medido(tipo=ETAPA, com_alvo=False):
+    """
+    Decorador: cronometra cada chamada da função com medir().
+    'com_alvo' anota o 2º argumento (o localizador, nos helpers de espera/clique).
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            dados = {"alvo": args[1]} if com_alvo and len(args) > 1 else {}
+            with medir(funcao.__name__, tipo, **dados):
+                return funcao(*args, **kwargs)
+        return envolvida
+    return decorador
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def resumo():
+    """
+    {"duracao", "salvos", "produtos_por_hora", "repeticoes": {nome: n},
+     "tempos": {(tipo, nome): {"n", "falhas", "total", "p50", "p95", "max"}}}
+    """
+    with _TRAVA:
+        duracoes = {chave: list(valores) for chave, valores in _execucao["duracoes"].items()}
+        falhas = dict(_execucao["falhas"])
+        repeticoes = dict(_execucao["repeticoes"])
+        salvos = _execucao["salvos"]
+        fim = _execucao["fim"] or time.time()
+        duracao = fim - _execucao["inicio"] if _execucao["inicio"] else 0.0
+
+    tempos = {chave: {"n": len(valores), "falhas": falhas.get(chave, 0), "total": sum(valores),
+                      "p50": percentil(valores, 50), "p95": percentil(valores, 95), "max": max(valores)}
+              for chave, valores in duracoes.items()}
+    return {"duracao": duracao, "salvos": salvos, "repeticoes": repeticoes, "tempos": tempos,
+            "produtos_por_hora": salvos / duracao * 3600 if duracao else 0.0}
+
+def imprimir_resumo():
+    dados = resumo()
+    if not dados["tempos"]:
+        return
+    print(f"\n⏱️ RESUMO DA EXECUÇÃO ({dados['duracao']:.0f}s)")
+    for tipo in (PRODUTO, ETAPA, ACAO):
+        linhas = sorted(((nome, t) for (tipo_t, nome), t in dados["tempos"].items() if tipo_t == tipo),
+                        key=lambda item: item[1]["total"], reverse=True)
+        if not linhas:
+            continue
+        print(f"   {tipo:<30}{'n':>5}{'p50':>9}{'p95':>9}{'total':>9}{'falhas':>8}")
+        for nome, t in linhas:
+            print(f"   {nome:<30}{t['n']:>5}{t['p50']:>8.2f}s{t['p95']:>8.2f}s{t['total']:>8.0f}s{t['falhas']:>8}")
+    if dados["repeticoes"]:
+        print(f"   🔁 Repetições: {dados['repeticoes']}")
+    print(f"   📦 {dados['salvos']} produtos salvos | {dados['produtos_por_hora']:.0f} produtos/hora")
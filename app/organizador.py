@@ -1,12 +1,40 @@
 import os
+import copy
 import json
 import re
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from google import genai
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
+from app import armazem
+from app.classificador_local import classificar_localmente
+
 load_dotenv()
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+client = None  # Criado na primeira chamada (permite importar o módulo sem chave, ex: com um stub)
+
+def obter_cliente():
+    global client
+    if client is None:
+        client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return client
+
+MODELO = 'gemini-3-flash-preview'
+
+# Modo fragmentado
+MAX_ARQUIVOS_POR_FRAGMENTO = 150   # Mantém a resposta bem abaixo do limite de tokens de saída
+MAX_CONCORRENCIA = 4               # Chamadas simultâneas ao Gemini
+TENTATIVAS_MAXIMAS = 4
+ESPERA_BASE_SEGUNDOS = 2.0
+
+# Cache de respostas do modelo (em disco)
+PASTA_CACHE_LLM = "./data/cache/llm"
+VERSAO_PROMPT = 1              # Incrementar sempre que o texto de montar_prompt() mudar
+MAX_ITENS_CACHE_LLM = 500      # Acima disso, as respostas usadas há mais tempo são apagadas
 
 # --- Função auxiliar
 def sanitarizar_nome(nome):
@@ -27,39 +55,29 @@ class ProdutoRPG(BaseModel):
     product_name: str = Field(description="Nome do produto traduzido/processado")
     variations: list[VariacaoProduto]
 
-# --- FUNÇÃO ÚNICA DE PROCESSAMENTO ---
-def gerar_mapa_unificado(pasta_raiz_originais, arquivo_saida="mapa_global.json"):
-    print(f"🚀 Escaneando TODAS as coleções em: {pasta_raiz_originais}")
-    
-    # 1. Agregação de Arquivos (Flattening)
-    lista_arquivos_com_caminho = []
-    
-    pastas_colecoes = [d for d in os.listdir(pasta_raiz_originais) 
-                       if os.path.isdir(os.path.join(pasta_raiz_originais, d))]
-
-    if not pastas_colecoes:
-        print("⚠️ Nenhuma pasta encontrada.")
-        return
+# --- ESCANEAMENTO ---
+def escanear_arquivos(pasta_raiz_originais):
+    """
+    Lista as imagens de cada coleção (subpasta) no formato "Colecao/Arquivo.jpg".
+    Retorna um dict {nome_colecao: [caminhos]} em ordem alfabética.
+    """
+    arquivos_por_colecao = {}
+    pastas_colecoes = sorted(d for d in os.listdir(pasta_raiz_originais)
+                             if os.path.isdir(os.path.join(pasta_raiz_originais, d)))
 
     for nome_colecao in pastas_colecoes:
         caminho_colecao = os.path.join(pasta_raiz_originais, nome_colecao)
-        arquivos = [f for f in os.listdir(caminho_colecao) 
-                    if f.lower().endswith(('.jpg', '.png', '.jpeg', '.webp'))]
+        arquivos = sorted(f for f in os.listdir(caminho_colecao)
+                          if f.lower().endswith(('.jpg', '.png', '.jpeg', '.webp')))
         
         # Aqui criamos o formato "Colecao/Arquivo.jpg"
-        for arq in arquivos:
-            lista_arquivos_com_caminho.append(f"{nome_colecao}/{arq}")
+        arquivos_por_colecao[nome_colecao] = [f"{nome_colecao}/{arq}" for arq in arquivos]
 
-    total_arquivos = len(lista_arquivos_com_caminho)
-    if total_arquivos == 0:
-        print("⚠️ Nenhum arquivo de imagem encontrado.")
-        return
+    return arquivos_por_colecao
 
-    print(f"📦 Payload preparado: {total_arquivos} arquivos de {len(pastas_colecoes)} coleções.")
-    print(f"🤖 Enviando TUDO para o Gemini (Batch Request)...")
-
-    # 2. O Prompt Unificado
-    prompt = f"""
+# --- PROMPT E CHAMADA AO MODELO ---
+def montar_prompt(lista_arquivos_com_caminho):
+    return f"""
     # Role
     Você é um especialista em catalogação de E-commerce para RPG (Shopee/Amazon).
 
@@ -91,44 +109,379 @@ def gerar_mapa_unificado(pasta_raiz_originais, arquivo_saida="mapa_global.json")
     {json.dumps(lista_arquivos_com_caminho, indent=2)}
     """
 
+# --- CACHE DE RESPOSTAS ---
+_TRAVA_CACHE_LLM = threading.Lock()
+
+def _hash_texto(texto):
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+def chave_cache_llm(lista_arquivos_com_caminho):
+    """Chave = modelo + versão do prompt + lista de arquivos (ordenada) + schema de resposta."""
+    hash_lista = _hash_texto(json.dumps(sorted(lista_arquivos_com_caminho)))
+    hash_schema = _hash_texto(json.dumps(ProdutoRPG.model_json_schema(), sort_keys=True))
+    return _hash_texto(json.dumps([MODELO, VERSAO_PROMPT, hash_lista, hash_schema]))
+
+def ler_cache_llm(chave):
+    """Retorna a resposta salva (lista de produtos) ou None. Um acerto renova a posição na fila de descarte."""
+    caminho = os.path.join(PASTA_CACHE_LLM, f"{chave}.json")
     try:
-        # Chamada ÚNICA (Mantida)
-        response = client.models.generate_content(
-            model='gemini-3-flash-preview',
-            contents=prompt,
-            config={
-                'response_mime_type': 'application/json',
-                'response_schema': list[ProdutoRPG]
-            }
-        )
-        dados = json.loads(response.text)
-        
-        # --- NOVIDADE: PÓS-PROCESSAMENTO DETERMINÍSTICO ---
-        print("⚙️ Calculando nomes de arquivos finais...")
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    with _TRAVA_CACHE_LLM:
+        if os.path.exists(caminho):
+            os.utime(caminho)
+    return dados
+
+def gravar_cache_llm(chave, dados):
+    """Grava a resposta (atomicamente) e descarta as mais antigas acima de MAX_ITENS_CACHE_LLM."""
+    os.makedirs(PASTA_CACHE_LLM, exist_ok=True)
+    caminho = os.path.join(PASTA_CACHE_LLM, f"{chave}.json")
+    temporario = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+    # Descarte (uma thread por vez; os fragmentos gravam em paralelo)
+    with _TRAVA_CACHE_LLM:
+        entradas = [e for e in os.scandir(PASTA_CACHE_LLM) if e.name.endswith(".json")]
+        if len(entradas) > MAX_ITENS_CACHE_LLM:
+            entradas.sort(key=lambda e: e.stat().st_mtime)
+            for entrada in entradas[:len(entradas) - MAX_ITENS_CACHE_LLM]:
+                os.remove(entrada.path)
+
+def classificar_lote(lista_arquivos_com_caminho, cliente=None, tentativas=TENTATIVAS_MAXIMAS, usar_cache=True):
+    """
+    Envia um lote de arquivos para o modelo e devolve a lista de produtos (dicts).
+    Repete com backoff exponencial (+ jitter) em caso de erro; se todas as tentativas
+    falharem, a última exceção é propagada.
+    'cliente' pode ser qualquer objeto com a interface client.models.generate_content
+    (ex: um stub local para testes). Padrão: o cliente Gemini global.
+    Com usar_cache=True, um lote idêntico já classificado volta do disco, sem chamar o modelo.
+    """
+    if usar_cache:
+        chave = chave_cache_llm(lista_arquivos_com_caminho)
+        dados = ler_cache_llm(chave)
+        if dados is not None:
+            print(f"   💾 Resposta em cache para {len(lista_arquivos_com_caminho)} arquivos.")
+            return dados
+
+    cliente = cliente or obter_cliente()
+    prompt = montar_prompt(lista_arquivos_com_caminho)
+
+    for tentativa in range(1, tentativas + 1):
+        try:
+            response = cliente.models.generate_content(
+                model=MODELO,
+                contents=prompt,
+                config={
+                    'response_mime_type': 'application/json',
+                    'response_schema': list[ProdutoRPG]
+                }
+            )
+            dados = json.loads(response.text)
+            break
+        except Exception as e:
+            if tentativa == tentativas:
+                raise
+            espera = ESPERA_BASE_SEGUNDOS * (2 ** (tentativa - 1)) + random.uniform(0, 1)
+            print(f"⚠️ Tentativa {tentativa}/{tentativas} falhou ({e}). Nova tentativa em {espera:.1f}s...")
+            time.sleep(espera)
+
+    # Fora das tentativas: um erro de disco no cache não pode virar outra chamada paga ao modelo
+    if usar_cache:
+        try:
+            gravar_cache_llm(chave, dados)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️ Não foi possível gravar a resposta no cache ({e}). Seguindo sem cache.")
+    return dados
+
+# --- FRAGMENTAÇÃO ---
+def dividir_em_fragmentos(arquivos_por_colecao, max_arquivos=MAX_ARQUIVOS_POR_FRAGMENTO):
+    """
+    Divide a lista de arquivos em fragmentos de no máximo 'max_arquivos'.
+    Coleções pequenas são agrupadas no mesmo fragmento; coleções grandes são quebradas
+    em pedaços (em ordem alfabética, para manter as fotos do mesmo produto juntas).
+    """
+    fragmentos = []
+    atual = []
+    for arquivos in arquivos_por_colecao.values():
+        if len(atual) + len(arquivos) > max_arquivos and atual:
+            fragmentos.append(atual)
+            atual = []
+        for inicio in range(0, len(arquivos), max_arquivos):
+            pedaco = arquivos[inicio:inicio + max_arquivos]
+            if len(pedaco) == max_arquivos:
+                fragmentos.append(pedaco)
+            else:
+                atual.extend(pedaco)
+    if atual:
+        fragmentos.append(atual)
+    return fragmentos
+
+def mesclar_produtos(listas_de_produtos):
+    """
+    Junta os resultados de vários fragmentos num único mapa.
+    Produtos com mesma coleção + nome (ex: um produto cortado entre dois fragmentos)
+    viram um só; variações com o mesmo nome têm suas imagens somadas.
+    Os produtos de entrada nunca são alterados (o resultado é feito de cópias): na
+    esteira, a versão anterior de um produto pode estar numa fila ou em outra thread.
+    """
+    produtos = {}
+    for lista in listas_de_produtos:
+        for produto in lista:
+            chave = (produto['collection_name'], produto['product_name'])
+            if chave not in produtos:
+                produtos[chave] = copy.deepcopy(produto)
+                continue
+
+            existentes = {v['variation_name']: v for v in produtos[chave]['variations']}
+            for variacao in produto['variations']:
+                if variacao['variation_name'] in existentes:
+                    existentes[variacao['variation_name']]['images'].extend(copy.deepcopy(variacao['images']))
+                else:
+                    nova = copy.deepcopy(variacao)
+                    produtos[chave]['variations'].append(nova)
+                    existentes[nova['variation_name']] = nova
+    return list(produtos.values())
+
+def classificar_em_fragmentos(arquivos_por_colecao, max_arquivos=MAX_ARQUIVOS_POR_FRAGMENTO,
+                              max_concorrencia=MAX_CONCORRENCIA, cliente=None, usar_cache=True):
+    """
+    Classifica os fragmentos em paralelo (threads, no máximo 'max_concorrencia' chamadas
+    simultâneas). Um fragmento que falha não derruba os outros.
+    Retorna (produtos_mesclados, fragmentos_com_falha).
+    """
+    fragmentos = dividir_em_fragmentos(arquivos_por_colecao, max_arquivos)
+    print(f"🧩 {len(fragmentos)} fragmentos (até {max_arquivos} arquivos, {max_concorrencia} simultâneos).")
+
+    resultados = [None] * len(fragmentos)
+    falhas = []
+    with ThreadPoolExecutor(max_workers=max_concorrencia) as executor:
+        futuros = {executor.submit(classificar_lote, fragmento, cliente, usar_cache=usar_cache): i
+                   for i, fragmento in enumerate(fragmentos)}
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            try:
+                resultados[i] = futuro.result()
+                print(f"   ✅ Fragmento {i+1}/{len(fragmentos)}: {len(resultados[i])} produtos.")
+            except Exception as e:
+                print(f"   ❌ Fragmento {i+1}/{len(fragmentos)} falhou: {e}")
+                falhas.append(fragmentos[i])
+
+    # Mescla na ordem dos fragmentos (resultado determinístico)
+    return mesclar_produtos(r for r in resultados if r is not None), falhas
+
+# --- PÓS-PROCESSAMENTO DETERMINÍSTICO ---
+def calcular_nomes_finais(dados):
+    """
+    Injeta 'target_filename' em cada imagem (Lógica de Negócio centralizada AQUI).
+    Imagens que já têm nome (vindas de um mapa anterior) são mantidas como estão.
+    Nomes repetidos dentro do produto (ex: produto mesclado de dois fragmentos) ganham sufixo numérico.
+    """
+    for produto in dados:
+        nome_prod_safe = sanitarizar_nome(produto['product_name'])
+        nomes_usados = {imagem['target_filename'] for variacao in produto['variations']
+                        for imagem in variacao['images'] if imagem.get('target_filename')}
         
-        for produto in dados:
-            nome_prod_safe = sanitarizar_nome(produto['product_name'])
+        for variacao in produto['variations']:
+            nome_var_safe = sanitarizar_nome(variacao['variation_name'])
             
-            for variacao in produto['variations']:
-                nome_var_safe = sanitarizar_nome(variacao['variation_name'])
+            for imagem in variacao['images']:
+                if imagem.get('target_filename'):
+                    continue
+                tipo_visao = imagem['view_type']
+                
+                if nome_var_safe.lower() in ["padrão", "padrao", "default", "standard"]:
+                    # Ex: Beholder - Front.jpg
+                    novo_nome = f"{nome_prod_safe} - {tipo_visao}.jpg"
+                else:
+                    # Ex: Orc - Machado - Front.jpg
+                    novo_nome = f"{nome_prod_safe} - {nome_var_safe} - {tipo_visao}.jpg"
                 
-                for imagem in variacao['images']:
-                    tipo_visao = imagem['view_type']
-                    
-                    # Lógica de Negócio (Centralizada AQUI)
-                    if nome_var_safe.lower() in ["padrão", "padrao", "default", "standard"]:
-                        # Ex: Beholder - Front.jpg
-                        novo_nome = f"{nome_prod_safe} - {tipo_visao}.jpg"
-                    else:
-                        # Ex: Orc - Machado - Front.jpg
-                        novo_nome = f"{nome_prod_safe} - {nome_var_safe} - {tipo_visao}.jpg"
-                    
-                    # Injetamos o campo novo no JSON
-                    imagem['target_filename'] = novo_nome
-
-        # 3. Salvar (Agora com o target_filename incluso)
-        with open(arquivo_saida, "w", encoding="utf-8") as f:
-            json.dump(dados, f, indent=2, ensure_ascii=False)
+                base, sufixo = novo_nome[:-4], 2
+                while novo_nome in nomes_usados:
+                    novo_nome = f"{base} {sufixo}.jpg"
+                    sufixo += 1
+                nomes_usados.add(novo_nome)
+
+                # Injetamos o campo novo no JSON
+                imagem['target_filename'] = novo_nome
+    return dados
+
+# --- MODO INCREMENTAL ---
+def carregar_mapa_existente(arquivo_saida):
+    """Lê o mapa anterior (ou [] se não existir / estiver corrompido)."""
+    try:
+        with open(arquivo_saida, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+def arquivos_ja_mapeados(dados):
+    """Conjunto de "Colecao/Arquivo" já presentes no mapa."""
+    conhecidos = set()
+    for produto in dados:
+        colecao = produto.get('collection_name', 'Geral')
+        for variacao in produto['variations']:
+            for imagem in variacao['images']:
+                conhecidos.add(f"{colecao}/{os.path.basename(imagem['filename'])}")
+    return conhecidos
+
+def filtrar_novos(arquivos_por_colecao, conhecidos):
+    """Remove do escaneamento o que já está no mapa. Coleções sem novidade somem."""
+    novos = {}
+    for colecao, arquivos in arquivos_por_colecao.items():
+        delta = [a for a in arquivos if a not in conhecidos]
+        if delta:
+            novos[colecao] = delta
+    return novos
+
+def manter_arquivos(dados, arquivos):
+    """
+    Recorte do mapa só com as imagens cujos "Colecao/Arquivo" estão em 'arquivos'
+    (variações e produtos que ficam vazios saem). Não altera 'dados'.
+    """
+    recorte = []
+    for produto in dados:
+        colecao = produto.get('collection_name', 'Geral')
+        variacoes = []
+        for variacao in produto['variations']:
+            imagens = [imagem for imagem in variacao['images']
+                       if f"{colecao}/{os.path.basename(imagem['filename'])}" in arquivos]
+            if imagens:
+                variacoes.append({**variacao, 'images': imagens})
+        if variacoes:
+            recorte.append({**produto, 'variations': variacoes})
+    return recorte
+
+def salvar_mapa(dados, arquivo_saida):
+    """Grava o mapa de forma atômica (um crash no meio não corrompe o arquivo anterior)."""
+    temporario = arquivo_saida + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, arquivo_saida)
+
+# --- FUNÇÃO PRINCIPAL ---
+def _escanear_pendentes(pasta_raiz_originais, arquivo_saida, incremental):
+    """
+    Passo 1 comum aos modos: escaneia as coleções e, no modo incremental, tira o que já está no mapa.
+    Retorna (arquivos_por_colecao, existentes); arquivos_por_colecao é None se não há pastas.
+    """
+    print(f"🚀 Escaneando TODAS as coleções em: {pasta_raiz_originais}")
+    
+    # 1. Agregação de Arquivos (Flattening)
+    arquivos_por_colecao = escanear_arquivos(pasta_raiz_originais)
+
+    if not arquivos_por_colecao:
+        print("⚠️ Nenhuma pasta encontrada.")
+        return None, []
+
+    existentes = []
+    if incremental:
+        existentes = carregar_mapa_existente(arquivo_saida)
+        conhecidos = arquivos_ja_mapeados(existentes)
+        escaneados = {a for arquivos in arquivos_por_colecao.values() for a in arquivos}
+        arquivos_por_colecao = filtrar_novos(arquivos_por_colecao, conhecidos)
+
+        sumidos = len(conhecidos - escaneados)
+        print(f"🔁 Modo incremental: {len(conhecidos)} arquivos já mapeados"
+              + (f" ({sumidos} não existem mais no disco)." if sumidos else "."))
+
+    return arquivos_por_colecao, existentes
+
+def _separar_locais(arquivos_por_colecao, classificacao_local):
+    """Atalho: nomes de arquivo reconhecidos pelas regras locais não vão para o Gemini."""
+    if not classificacao_local:
+        return [], arquivos_por_colecao
+
+    total_arquivos = sum(len(arquivos) for arquivos in arquivos_por_colecao.values())
+    produtos_locais, arquivos_por_colecao = classificar_localmente(arquivos_por_colecao)
+    restantes = sum(len(arquivos) for arquivos in arquivos_por_colecao.values())
+    print(f"🧮 Classificador local: {total_arquivos - restantes} arquivos resolvidos "
+          f"({len(produtos_locais)} produtos). {restantes} ambíguos vão para o Gemini.")
+    return produtos_locais, arquivos_por_colecao
+
+def gerar_mapa_unificado(pasta_raiz_originais, arquivo_saida="mapa_global.json", fragmentado=False,
+                         max_arquivos=MAX_ARQUIVOS_POR_FRAGMENTO, max_concorrencia=MAX_CONCORRENCIA,
+                         cliente=None, incremental=False, usar_cache=True, classificacao_local=True,
+                         arquivo_armazem=None):
+    """
+    Gera o mapa global de produtos.
+    Args:
+        fragmentado: Se False, manda TUDO numa chamada só (comportamento original).
+                     Se True, divide em fragmentos de até 'max_arquivos' e classifica
+                     com até 'max_concorrencia' chamadas simultâneas.
+        cliente: Cliente alternativo (ex: stub local). Padrão: Gemini.
+        incremental: Se True, só classifica os arquivos que ainda não estão em 'arquivo_saida'
+                     e mescla os produtos novos nas coleções existentes.
+        usar_cache: Se False, ignora o cache de respostas e sempre chama o modelo.
+        classificacao_local: Se True, resolve os nomes de arquivo óbvios por regras
+                             (classificador_local) e só manda os ambíguos para o modelo.
+        arquivo_armazem: Se informado, grava também no armazém SQLite (só os produtos alterados).
+    """
+    arquivos_por_colecao, existentes = _escanear_pendentes(pasta_raiz_originais, arquivo_saida, incremental)
+    if arquivos_por_colecao is None:
+        return
+
+    if incremental and not arquivos_por_colecao and existentes:
+        print("✅ Nenhum arquivo novo. Mapa mantido como está.")
+        return existentes
+
+    lista_arquivos_com_caminho = [a for arquivos in arquivos_por_colecao.values() for a in arquivos]
+    total_arquivos = len(lista_arquivos_com_caminho)
+    if total_arquivos == 0:
+        print("⚠️ Nenhum arquivo de imagem encontrado.")
+        return
+
+    print(f"📦 Payload preparado: {total_arquivos} arquivos de {len(arquivos_por_colecao)} coleções.")
+
+    # 2. Atalho local
+    produtos_locais, arquivos_por_colecao = _separar_locais(arquivos_por_colecao, classificacao_local)
+    lista_arquivos_com_caminho = [a for arquivos in arquivos_por_colecao.values() for a in arquivos]
+
+    try:
+        # 3. Classificação
+        dados = []
+        if not lista_arquivos_com_caminho:
+            pass
+        elif fragmentado:
+            print(f"🤖 Enviando para o Gemini em fragmentos...")
+            dados, falhas = classificar_em_fragmentos(arquivos_por_colecao, max_arquivos,
+                                                      max_concorrencia, cliente, usar_cache)
+            if falhas:
+                arquivos_falhos = {a for fragmento in falhas for a in fragmento}
+                print(f"⚠️ {len(falhas)} fragmentos ({len(arquivos_falhos)} arquivos) ficaram de fora. Rode de novo para completar.")
+                if not dados and not produtos_locais:
+                    print("❌ Nenhum fragmento classificado. Mapa mantido como está.")
+                    return existentes
+                if not incremental:
+                    # O mapa anterior continua valendo para os arquivos que falharam agora
+                    existentes = manter_arquivos(carregar_mapa_existente(arquivo_saida), arquivos_falhos)
+        else:
+            print(f"🤖 Enviando TUDO para o Gemini (Batch Request)...")
+            dados = classificar_lote(lista_arquivos_com_caminho, cliente, usar_cache=usar_cache)
+
+        if produtos_locais:
+            dados = mesclar_produtos([produtos_locais, dados])
+
+        alterados = {(p['collection_name'], p['product_name']) for p in dados}
+
+        if existentes:
+            # Produtos novos entram nas coleções existentes; os antigos mantêm seus nomes de arquivo
+            print(f"🧬 Mesclando {len(dados)} produtos classificados no mapa existente...")
+            dados = mesclar_produtos([existentes, dados])
+        
+        print("⚙️ Calculando nomes de arquivos finais...")
+        calcular_nomes_finais(dados)
+
+        # 4. Salvar (Agora com o target_filename incluso)
+        salvar_mapa(dados, arquivo_saida)
+        if arquivo_armazem:
+            armazem.salvar_produtos([p for p in dados if (p['collection_name'], p['product_name']) in alterados],
+                                    arquivo_armazem)
             
         return dados
 
@@ -136,5 +489,72 @@ def gerar_mapa_unificado(pasta_raiz_originais, arquivo_saida="mapa_global.json")
         print(f"❌ Erro: {e}")
         return []
 
+# --- MODO CONTÍNUO (ESTEIRA) ---
+def gerar_produtos_em_fluxo(pasta_raiz_originais, arquivo_saida="mapa_global.json",
+                            max_arquivos=MAX_ARQUIVOS_POR_FRAGMENTO, max_concorrencia=MAX_CONCORRENCIA,
+                            cliente=None, usar_cache=True, classificacao_local=True):
+    """
+    Versão geradora do gerar_mapa_unificado (sempre incremental e fragmentada):
+    entrega cada produto, já com 'target_filename', assim que ele é classificado.
+    Produtos de uma coleção quebrada em vários fragmentos só saem quando todos os
+    fragmentos da coleção terminam (um produto nunca sai pela metade).
+    No final, o mapa completo é gravado em 'arquivo_saida'.
+    """
+    arquivos_por_colecao, existentes = _escanear_pendentes(pasta_raiz_originais, arquivo_saida, True)
+    if not arquivos_por_colecao:
+        print("✅ Nenhum arquivo novo para classificar.")
+        return
+
+    mapa = {(p['collection_name'], p['product_name']): p for p in existentes}
+
+    def _incorporar(produtos):
+        """Mescla no mapa, calcula os nomes e devolve as versões finais dos produtos."""
+        for produto in produtos:
+            chave = (produto['collection_name'], produto['product_name'])
+            anterior = [mapa[chave]] if chave in mapa else []
+            mesclado = mesclar_produtos([anterior, [produto]])[0]
+            calcular_nomes_finais([mesclado])
+            mapa[chave] = mesclado
+            yield mesclado
+
+    produtos_locais, arquivos_por_colecao = _separar_locais(arquivos_por_colecao, classificacao_local)
+    yield from _incorporar(produtos_locais)
+
+    fragmentos = dividir_em_fragmentos(arquivos_por_colecao, max_arquivos)
+    if fragmentos:
+        print(f"🧩 {len(fragmentos)} fragmentos (até {max_arquivos} arquivos, {max_concorrencia} simultâneos).")
+
+    # Quantos fragmentos ainda faltam para cada coleção
+    faltando = {}
+    for fragmento in fragmentos:
+        for colecao in {a.split("/", 1)[0] for a in fragmento}:
+            faltando[colecao] = faltando.get(colecao, 0) + 1
+    retidos = {}
+
+    with ThreadPoolExecutor(max_workers=max_concorrencia) as executor:
+        futuros = {executor.submit(classificar_lote, fragmento, cliente, usar_cache=usar_cache): i
+                   for i, fragmento in enumerate(fragmentos)}
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            try:
+                produtos = futuro.result()
+                print(f"   ✅ Fragmento {i+1}/{len(fragmentos)}: {len(produtos)} produtos.")
+            except Exception as e:
+                print(f"   ❌ Fragmento {i+1}/{len(fragmentos)} falhou: {e}")
+                produtos = []
+
+            for produto in produtos:
+                retidos.setdefault(produto['collection_name'], []).append(produto)
+            for colecao in {a.split("/", 1)[0] for a in fragmentos[i]}:
+                faltando[colecao] -= 1
+                if faltando[colecao] == 0:
+                    yield from _incorporar(mesclar_produtos([retidos.pop(colecao, [])]))
+
+    # Sobras (ex: o modelo devolveu um collection_name diferente da pasta)
+    for produtos in retidos.values():
+        yield from _incorporar(mesclar_produtos([produtos]))
+
+    salvar_mapa(list(mapa.values()), arquivo_saida)
+
 if __name__ == "__main__":
     gerar_mapa_unificado("./data/input")
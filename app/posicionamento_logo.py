@@ -0,0 +1,80 @@
+import numpy as np
+
+# ==============================================================================
+# POSICIONAMENTO DO LOGO
+# Escolhe onde colar a marca d'água: a região mais "vazia" entre vários candidatos
+# (cantos e pontos ao longo das margens). A imagem é analisada uma vez só:
+# mapa de bordas (gradiente) -> imagem integral; depois, a soma de bordas dentro de
+# qualquer retângulo sai em tempo constante (4 leituras), para todos os candidatos
+# de uma vez, sem recortar a imagem de novo a cada tentativa.
+# ==============================================================================
+
+FATOR_ANALISE = 4        # A análise roda na imagem reduzida 4x (1024px -> 256px)
+PASSOS_MARGEM = 6        # Pontos testados ao longo de cada margem, além dos cantos
+TOLERANCIA = 1.0         # Diferença de "ocupação" (tons de cinza por pixel) considerada empate
+
+def imagem_integral(imagem):
+    """
+    Imagem integral da energia de bordas (|dx| + |dy| em tons de cinza), com uma
+    linha e uma coluna de zeros na frente: integral[y, x] = soma do retângulo (0,0)-(x,y).
+    Calculada sobre a imagem reduzida por FATOR_ANALISE.
+    """
+    cinza = imagem.reduce(FATOR_ANALISE).convert("L")   # Reduz antes: a conversão pega 1/16 dos pixels
+    matriz = np.asarray(cinza, dtype=np.int16)
+
+    # Inteiros do começo ao fim: contas exatas e matrizes pequenas (|dx| + |dy| <= 510 cabe em int16,
+    # e a soma da imagem reduzida inteira cabe com folga em int32)
+    bordas = np.abs(np.diff(matriz, axis=1, prepend=matriz[:, :1]))
+    bordas += np.abs(np.diff(matriz, axis=0, prepend=matriz[:1, :]))
+
+    # Somas acumuladas direto dentro da integral
+    integral = np.zeros((bordas.shape[0] + 1, bordas.shape[1] + 1), dtype=np.int32)
+    np.cumsum(bordas, axis=0, dtype=np.int32, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+def gerar_candidatos(largura, altura, largura_logo, altura_logo, margem):
+    """
+    Posições (x, y) do canto superior esquerdo do logo, em ordem de preferência:
+    canto superior direito (a posição de sempre), os outros cantos e depois pontos
+    espaçados ao longo das quatro margens.
+    """
+    x_min, y_min = margem, margem
+    x_max, y_max = largura - largura_logo - margem, altura - altura_logo - margem
+    if x_max < x_min or y_max < y_min:
+        return [(max(0, x_max), max(0, y_min))]
+
+    candidatos = [(x_max, y_min), (x_min, y_min), (x_max, y_max), (x_min, y_max)]
+    for passo in range(1, PASSOS_MARGEM + 1):
+        x = x_min + (x_max - x_min) * passo // (PASSOS_MARGEM + 1)
+        y = y_min + (y_max - y_min) * passo // (PASSOS_MARGEM + 1)
+        candidatos += [(x, y_min), (x_max, y), (x_min, y), (x, y_max)]
+    return list(dict.fromkeys(candidatos))   # Sem repetidos, mantendo a ordem
+
+def pontuar(integral, candidatos, largura_logo, altura_logo):
+    """Ocupação média (bordas por pixel) sob o logo em cada candidato, vetorizada."""
+    posicoes = np.array(candidatos, dtype=np.int64)
+    linhas, colunas = integral.shape[0] - 1, integral.shape[1] - 1
+
+    x0 = np.clip(posicoes[:, 0] // FATOR_ANALISE, 0, colunas)
+    y0 = np.clip(posicoes[:, 1] // FATOR_ANALISE, 0, linhas)
+    x1 = np.clip((posicoes[:, 0] + largura_logo) // FATOR_ANALISE, 0, colunas)
+    y1 = np.clip((posicoes[:, 1] + altura_logo) // FATOR_ANALISE, 0, linhas)
+
+    somas = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+    areas = np.maximum((x1 - x0) * (y1 - y0), 1)
+    return somas / areas
+
+def escolher_posicao(imagem, tamanho_logo, margem=30):
+    """
+    Posição (x, y) mais vazia para colar o logo de 'tamanho_logo' (largura, altura).
+    Em empate (dentro da TOLERANCIA), vence o candidato de maior preferência.
+    """
+    largura_logo, altura_logo = tamanho_logo
+    candidatos = gerar_candidatos(imagem.width, imagem.height, largura_logo, altura_logo, margem)
+    if len(candidatos) == 1:
+        return candidatos[0]
+
+    notas = pontuar(imagem_integral(imagem), candidatos, largura_logo, altura_logo)
+    escolhido = int(np.flatnonzero(notas <= notas.min() + TOLERANCIA)[0])
+    return candidatos[escolhido]
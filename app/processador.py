@@ -1,7 +1,15 @@
-from PIL import Image, ImageEnhance, ImageStat, ImageOps
+from PIL import Image, ImageEnhance, ImageOps, ImageChops
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import os
 import re
 import json
+import shutil
+import hashlib
+
+from app import armazem
+from app import removedor_fundo
+from app import posicionamento_logo
+from app import codificador_jpeg
 
 # CONFIGURAÇÕES GERAIS
 
@@ -9,23 +17,47 @@ PASTA_ENTRADA = "./app/input"
 PASTA_SAIDA = "./app/processed"
 CAMINHO_LOGO = "./assets/logo.png"
 TAMANHO_MAXIMO = 1024
+PROPORCAO_LOGO = 0.25   # Largura do logo em relação à largura da imagem
+OPACIDADE_LOGO = 0.8
+MARGEM_LOGO = 30        # Distância mínima do logo até a borda
+QUALIDADE_JPEG = 85
+
+# Codificação adaptativa da saída principal (ver app/codificador_jpeg.py). Com os dois em None,
+# grava direto em QUALIDADE_JPEG; com algum ligado, QUALIDADE_JPEG vira o teto da busca.
+ORCAMENTO_BYTES = None      # Ex: 200_000 -> maior qualidade que cabe em ~200 KB (upload mais rápido)
+PSNR_MINIMO = None          # Ex: 40.0 -> menor qualidade que mantém o PSNR acima disso (dB)
+JPEG_PROGRESSIVO = False
+SUBAMOSTRAGEM_JPEG = -1     # -1 = padrão do Pillow (4:2:0); 0 = 4:4:4; 1 = 4:2:2; 2 = 4:2:0
+REMOVER_FUNDO = False   # Recorta o produto (rembg) e o centraliza no fundo branco; ver app/removedor_fundo.py
+
+# Rendições: saídas extras (tamanho/formato) geradas da mesma decodificação da origem,
+# em PASTA_RENDICOES/<coleção>/<nome da rendição>/. Lista vazia = só a saída principal.
+PASTA_RENDICOES = "./data/processed"
+FORMATOS_RENDICAO = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+METODO_WEBP = 2   # Esforço do codificador WebP (0-6): 2 sai com metade do tempo do padrão 4, quase o mesmo tamanho
+RENDICOES_LOJA = [
+    {"nome": "galeria", "tamanho": 1024, "formato": "JPEG", "qualidade": 85, "logo": True},
+    {"nome": "variacao", "tamanho": 512, "formato": "WEBP", "qualidade": 80, "logo": True},
+    {"nome": "miniatura", "tamanho": 256, "formato": "JPEG", "qualidade": 75, "logo": False},
+]
+RENDICOES = []
+
+# Cache incremental: manifesto com a "receita" de cada saída já gerada
+ARQUIVO_MANIFESTO = os.path.join(PASTA_SAIDA, ".manifesto.json")
+VERSAO_PIPELINE = 2   # Incrementar quando a lógica visual mudar (invalida todo o cache)
+LOTE_MANIFESTO = 200  # Imagens renderizadas entre um salvamento do manifesto e outro (progresso sobrevive a queda)
+
+# Processamento paralelo (um processo por núcleo, deixando um livre para o sistema)
+NUM_WORKERS = max(1, (os.cpu_count() or 1) - 1)
 
 # FUNÇÕES AUXILIARES
 def sanitarizar_nome(nome):
     """Remove caracteres proibidos pelo Windows/Linux"""
     return re.sub(r'[<>:"/\\|?*]', '', nome).strip()
 
-def verificar_area_ocupada(imagem_base, x, y, largura_logo, altura_logo, limiar_sensibilidade=50):
-    """Verifica se a área onde o logo vai ficar já tem muita informação, se sim, retorna True."""
-    box = (x, y, x + largura_logo, y + (altura_logo * 0.7))
-    recorte = imagem_base.crop(box).convert("L")
-    estatisticas = ImageStat.Stat(recorte)
-    min_val, max_val = estatisticas.extrema[0]
-    return (max_val - min_val) > limiar_sensibilidade
-
-def tornar_quadrada(imagem_original, cor_fundo=(255, 255, 255)):
+def tornar_quadrada(imagem_original, cor_fundo=(255, 255, 255), mascara=None):
     """ Cria um fundo quadrado e centraliza a imagem, mantendo sempre a proporção 1:1, independente
-        da imagem."""
+        da imagem. 'mascara' (modo L) recorta a imagem no lugar do próprio alfa."""
 
     largura, altura = imagem_original.size
     novo_tamanho = max(largura, altura)
@@ -37,85 +69,350 @@ def tornar_quadrada(imagem_original, cor_fundo=(255, 255, 255)):
     pos_y = (novo_tamanho - altura) // 2
     
     # Usa a próprima imagem como máscara se houver transparência
-    if imagem_original.mode == 'RGBA':
-        imagem_final.paste(imagem_original, (pos_x, pos_y), imagem_original)
-    else:
-        imagem_final.paste(imagem_original, (pos_x, pos_y))
+    if mascara is None and imagem_original.mode == 'RGBA':
+        mascara = imagem_original
+    imagem_final.paste(imagem_original, (pos_x, pos_y), mascara)
     
     return imagem_final
 
+# CACHE DA MARCA D'ÁGUA
+
+# Logos já preparados (redimensionados + transparência), por processo.
+# Chave: (mtime do arquivo do logo, largura alvo, opacidade)
+_CACHE_LOGO = {}
+
+def carregar_logo_preparado(largura_base, opacidade=OPACIDADE_LOGO):
+    """
+    Retorna (logo RGB, máscara L) prontos para colar numa imagem RGB de largura 'largura_base':
+    imagem.paste(logo, posicao, mascara), sem converter a imagem para RGBA.
+    O trabalho pesado (abrir, LANCZOS, alpha) é feito uma única vez por chave;
+    trocar o arquivo do logo muda o mtime e invalida o cache automaticamente.
+    """
+    chave = (os.path.getmtime(CAMINHO_LOGO), largura_base, opacidade)
+    preparado = _CACHE_LOGO.get(chave)
+    if preparado is not None:
+        return preparado
+
+    logo = Image.open(CAMINHO_LOGO).convert("RGBA")
+
+    # Redimensiona o Logo proporcionalmente
+    proporcao = (largura_base * PROPORCAO_LOGO) / float(logo.width)
+    altura_nova = int((float(logo.height) * float(proporcao)))
+    logo = logo.resize((int(largura_base * PROPORCAO_LOGO), altura_nova), Image.Resampling.LANCZOS)
+
+    # Transparência do Logo (vira a máscara da colagem)
+    alpha = logo.getchannel("A")
+    mascara = ImageEnhance.Brightness(alpha).enhance(opacidade)
+
+    # Descarta versões de um arquivo de logo antigo
+    for chave_antiga in [c for c in _CACHE_LOGO if c[0] != chave[0]]:
+        del _CACHE_LOGO[chave_antiga]
+    _CACHE_LOGO[chave] = (logo.convert("RGB"), mascara)
+    return _CACHE_LOGO[chave]
+
+def _inicializar_worker(remover_fundo=False, threads_modelo=None):
+    """
+    Roda uma vez em cada processo do pool: deixa o logo pronto antes da primeira imagem
+    e, com remoção de fundo, abre a sessão do modelo (uma por processo, não por imagem).
+    """
+    if os.path.exists(CAMINHO_LOGO):
+        carregar_logo_preparado(TAMANHO_MAXIMO)
+    if remover_fundo:
+        removedor_fundo.preparar_sessao(threads=threads_modelo)
+
+# DECODIFICAÇÃO RÁPIDA
+
+def abrir_reduzida(caminho_entrada, tamanho_alvo=TAMANHO_MAXIMO):
+    """
+    Abre a imagem já pedindo ao decoder uma versão reduzida.
+    JPEG: usa o 'draft' (escala DCT 1/2, 1/4, 1/8) antes de decodificar, então
+    uma foto de 6000px nunca chega a existir em resolução cheia na memória.
+    Demais formatos: o thumbnail() usa reduce() (reducing_gap) antes do LANCZOS.
+    """
+    img = Image.open(caminho_entrada)
+
+    if img.format == "JPEG":
+        # Tamanho que a imagem terá depois do thumbnail (o lado maior vira tamanho_alvo).
+        # O draft só escolhe escalas que fiquem >= ao pedido, então a qualidade é preservada.
+        escala = tamanho_alvo / float(max(img.size))
+        if escala < 1:
+            img.draft("RGB", (int(img.width * escala) + 1, int(img.height * escala) + 1))
+
+    return ImageOps.exif_transpose(img)
+
+# REMOÇÃO DE FUNDO
+
+def obter_mascara(caminho_entrada, hash_origem=None):
+    """Máscara alfa da origem: do cache em disco ou, se faltar, segmentada agora (lote de uma)."""
+    hash_origem = hash_origem or _hash_arquivo(caminho_entrada)
+    mascara = removedor_fundo.carregar_mascara(hash_origem)
+    if mascara is None:
+        img = abrir_reduzida(caminho_entrada, removedor_fundo.RESOLUCAO_SEGMENTACAO)
+        img.thumbnail((removedor_fundo.RESOLUCAO_SEGMENTACAO,) * 2, Image.Resampling.BILINEAR)
+        removedor_fundo.gerar_mascaras([(hash_origem, img)])
+        mascara = removedor_fundo.carregar_mascara(hash_origem)
+    return mascara
+
+def _segmentar_lote(itens):
+    """
+    Gera as máscaras de um lote de origens (roda dentro do worker). Nunca lança exceção:
+    'itens' é [(hash_origem, caminho_origem)]; devolve (quantidade gerada, erro ou None).
+    """
+    try:
+        imagens = []
+        for hash_origem, caminho_origem in itens:
+            img = abrir_reduzida(caminho_origem, removedor_fundo.RESOLUCAO_SEGMENTACAO)
+            img.thumbnail((removedor_fundo.RESOLUCAO_SEGMENTACAO,) * 2, Image.Resampling.BILINEAR)
+            imagens.append((hash_origem, img))
+        return removedor_fundo.gerar_mascaras(imagens), None
+    except Exception as e:
+        return 0, f"{type(e).__name__}: {e}"
+
+def _preparar_mascaras(tarefas, hashes, executor=None):
+    """
+    Segmenta, em lotes de removedor_fundo.TAMANHO_LOTE, as origens ainda sem máscara em cache.
+    Com 'executor', os lotes vão para o pool (cada worker usa a sua sessão do modelo).
+    """
+    faltando = {}
+    for _, caminho_origem, _ in tarefas:
+        hash_origem = hashes[caminho_origem]
+        if not os.path.exists(removedor_fundo.caminho_mascara(hash_origem)):
+            faltando.setdefault(hash_origem, caminho_origem)   # Origens repetidas segmentam uma vez
+    if not faltando:
+        return
+
+    itens = list(faltando.items())
+    lotes = [itens[i:i + removedor_fundo.TAMANHO_LOTE] for i in range(0, len(itens), removedor_fundo.TAMANHO_LOTE)]
+    print(f"✂️ Removendo fundo: {len(itens)} imagens em {len(lotes)} lote(s).")
+    if executor is not None:
+        resultados = [futuro.result() for futuro in [executor.submit(_segmentar_lote, lote) for lote in lotes]]
+    else:
+        resultados = [_segmentar_lote(lote) for lote in lotes]
+    for _, erro in resultados:
+        if erro:
+            print(f"⚠️ Falha ao segmentar um lote ({erro}). As imagens dele tentam de novo uma a uma.")
+
+# RENDIÇÕES
+
+def caminhos_rendicoes(caminho_destino, rendicoes):
+    """{nome: caminho} de cada rendição da saída: PASTA_RENDICOES/<coleção>/<rendição>/<arquivo>.<ext>"""
+    colecao = os.path.basename(os.path.dirname(caminho_destino))
+    base = os.path.splitext(os.path.basename(caminho_destino))[0]
+    return {r["nome"]: os.path.join(PASTA_RENDICOES, colecao, r["nome"], base + FORMATOS_RENDICAO[r["formato"]])
+            for r in rendicoes}
+
+def reduzir_nivel(img, tamanho):
+    """
+    Próximo nível da pirâmide: o quadrado reduzido a partir do nível anterior (maior), e não
+    da imagem cheia, então cada tamanho extra custa só uma redução pequena. Nunca amplia.
+    Sempre devolve uma imagem nova: o logo colado num nível não pode vazar para o seguinte.
+    """
+    if tamanho >= img.width:
+        return img.copy()
+    # reducing_gap=1.0: a parte inteira da redução (ex: 1024 -> 512) sai pelo reduce(), ~10x mais rápido
+    return img.resize((tamanho, tamanho), Image.Resampling.LANCZOS, reducing_gap=1.0)
+
+def codificacao_adaptativa():
+    """Parâmetros da codificação adaptativa em uso, ou None se a qualidade é fixa (entra na chave do build)."""
+    if not (ORCAMENTO_BYTES or PSNR_MINIMO):
+        return None
+    return {"orcamento_bytes": ORCAMENTO_BYTES, "psnr_minimo": PSNR_MINIMO, "minima": codificador_jpeg.QUALIDADE_MINIMA,
+            "progressivo": JPEG_PROGRESSIVO, "subamostragem": SUBAMOSTRAGEM_JPEG}
+
+def _temporario(caminho):
+    """Arquivo temporário ao lado do destino: a saída é gravada nele e só então trocada (os.replace)."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    return f"{caminho}.{os.getpid()}.tmp"
+
+def _salvar_saida(img, caminho, formato="JPEG", qualidade=QUALIDADE_JPEG, adaptativa=None):
+    """
+    Grava a saída de forma atômica: uma saída antiga no mesmo caminho só é substituída
+    quando a nova está completa. 'adaptativa' (ver codificacao_adaptativa) liga a busca
+    da qualidade no JPEG. Retorna os bytes economizados em relação à qualidade fixa (0 sem busca).
+    """
+    temporario = _temporario(caminho)
+    economia = 0
+    try:
+        if formato == "JPEG" and adaptativa:
+            dados, _, referencia = codificador_jpeg.codificar_adaptativo(
+                img if img.mode == "RGB" else img.convert("RGB"), qualidade, adaptativa["orcamento_bytes"], adaptativa["psnr_minimo"],
+                adaptativa["minima"], adaptativa["progressivo"], adaptativa["subamostragem"])
+            with open(temporario, "wb") as f:
+                f.write(dados)
+            economia = referencia - len(dados)
+        elif formato == "JPEG":
+            (img if img.mode == "RGB" else img.convert("RGB")).save(temporario, "JPEG", quality=qualidade, optimize=True)
+        elif formato == "WEBP":
+            img.save(temporario, "WEBP", quality=qualidade, method=METODO_WEBP)
+        else:
+            img.save(temporario, formato, optimize=True)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return economia
+
+def _copiar_saida(origem, caminho):
+    """Cópia atômica de uma saída já gravada (mesma especificação ou gêmea do cache)."""
+    temporario = _temporario(caminho)
+    try:
+        shutil.copy2(origem, temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+# GRAFO DE ETAPAS DO RENDER
+# Cada etapa declara os modos de imagem que aceita na entrada; o executor acompanha o
+# modo atual e só converte quando a etapa realmente precisa (cada convert() é uma cópia
+# inteira da imagem). A transparência (do PNG ou do recorte de fundo) viaja como uma
+# máscara L à parte até o quadrado, em vez de uma cópia RGBA da foto; dali em diante
+# tudo é RGB: o logo entra pela máscara pré-calculada e a gravação não converte nada.
+
+MODOS_COR = ("RGB", "RGBA")
+MODOS_REDUCAO = MODOS_COR + ("L", "LA")   # Cinza reduz como está: vira RGB só depois, já no tamanho final
+
+def _tem_transparencia(img):
+    return img.mode in ("RGBA", "RGBa", "LA", "La", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+def _modo_alvo(img, modos):
+    """Modo para o qual converter: o primeiro aceito, ou o primeiro com alfa se a imagem tiver transparência."""
+    if _tem_transparencia(img):
+        return next((modo for modo in modos if "A" in modo), modos[0])
+    return modos[0]
+
+def _etapa_reduzir(img, contexto):
+    # Redimensiona ANTES de centralizar: o quadrado é montado já no tamanho final,
+    # e não numa tela do tamanho da foto original
+    img.thumbnail((contexto["tamanho"], contexto["tamanho"]), Image.Resampling.LANCZOS)
+    return img
+
+def _etapa_recortar_fundo(img, contexto):
+    """Máscara do recorte (somada ao alfa que a imagem já tinha) para o quadrado usar na colagem."""
+    mascara = obter_mascara(contexto["caminho"], contexto["hash_origem"]).resize(img.size, Image.Resampling.BILINEAR)
+    if img.mode == "RGBA":
+        mascara = ImageChops.multiply(img.getchannel("A"), mascara)
+    contexto["mascara"] = mascara
+    return img
+
+def _etapa_quadrar(img, contexto):
+    mascara = contexto.pop("mascara", None)
+    if img.mode == "RGB" and img.width == img.height and mascara is None:
+        return img   # Já é o quadrado: nada a montar
+    return tornar_quadrada(img, mascara=mascara)
+
+def montar_etapas(remover_fundo=False):
+    """Etapas do render até o quadrado RGB: (nome, modos aceitos na entrada, função)."""
+    etapas = [("reduzir", MODOS_REDUCAO, _etapa_reduzir)]
+    if remover_fundo:
+        etapas.append(("recortar_fundo", MODOS_COR, _etapa_recortar_fundo))
+    etapas.append(("quadrar", MODOS_COR, _etapa_quadrar))
+    return etapas
+
+def executar_etapas(img, etapas, contexto):
+    """Passa a imagem pelas etapas, convertendo só quando o modo atual não é aceito (anotado em contexto['conversoes'])."""
+    contexto.setdefault("conversoes", [])
+    for nome, modos, funcao in etapas:
+        if modos and img.mode not in modos:
+            modo = _modo_alvo(img, modos)
+            contexto["conversoes"].append(f"{nome}: {img.mode}->{modo}")
+            img = img.convert(modo)
+        img = funcao(img, contexto)
+    return img
+
 # O PROCESSADOR 
 
-def processar_imagem_unica(caminho_entrada, caminho_saida_completo, usar_logo=True):
-    if os.path.exists(caminho_saida_completo):
+def _renderizar_imagem(caminho_entrada, caminho_saida_completo, usar_logo=True, remover_fundo=False, hash_origem=None,
+                       rendicoes=None, contexto=None):
+    """
+    Gera a imagem final (quadrada + logo) e, se pedidas, as rendições, tudo de uma única
+    decodificação da origem. Retorna os bytes economizados pela codificação adaptativa
+    da saída principal. Lança exceção em caso de falha.
+    'contexto' (opcional) recebe o que o grafo fez, ex: as conversões de modo.
+    """
+    rendicoes = rendicoes or []
+    tamanho_base = max([TAMANHO_MAXIMO] + [r["tamanho"] for r in rendicoes])
+    contexto = contexto if contexto is not None else {}
+    contexto.update(caminho=caminho_entrada, hash_origem=hash_origem, tamanho=tamanho_base)
+
+    img = executar_etapas(abrir_reduzida(caminho_entrada, tamanho_base), montar_etapas(remover_fundo), contexto)
+
+    # (caminho, tamanho, formato, qualidade, logo, codificação adaptativa): a principal + cada rendição.
+    # Só a principal (a que sobe para a Shopee) usa a busca de qualidade.
+    saidas = [(caminho_saida_completo, TAMANHO_MAXIMO, "JPEG", QUALIDADE_JPEG, usar_logo, codificacao_adaptativa())]
+    caminhos = caminhos_rendicoes(caminho_saida_completo, rendicoes)
+    saidas += [(caminhos[r["nome"]], r["tamanho"], r["formato"], r.get("qualidade", QUALIDADE_JPEG),
+                usar_logo and r.get("logo", True), None) for r in rendicoes]
+
+    # Lógica de Posição: canto/margem mais vazio (superior direito, se estiver livre),
+    # escolhida uma vez no maior nível (ainda limpo) e reaproveitada, em proporção, nos menores
+    posicao_relativa = None
+    if any(saida[4] for saida in saidas) and os.path.exists(CAMINHO_LOGO):
+        logo, _ = carregar_logo_preparado(img.width)
+        x, y = posicionamento_logo.escolher_posicao(img, logo.size, MARGEM_LOGO)
+        posicao_relativa = (x / img.width, y / img.width)
+
+    # Do maior nível para o menor. O próximo nível sai deste ANTES do logo ser colado
+    # nele (e é sempre outra imagem, mesmo quando não reduz), então o logo vai direto no
+    # nível; em cada nível, as saídas sem logo são gravadas primeiro.
+    tamanhos = sorted({saida[1] for saida in saidas}, reverse=True)
+    nivel = reduzir_nivel(img, tamanhos[0])
+    gravadas = {}   # Mesma especificação de uma saída já gravada = cópia do arquivo, sem codificar de novo
+    economia = 0
+    for i, tamanho in enumerate(tamanhos):
+        proximo = reduzir_nivel(nivel, tamanhos[i + 1]) if i + 1 < len(tamanhos) else None
+        com_logo_colado = False
+        for caminho, _, formato, qualidade, com_logo, adaptativa in sorted(
+                (saida for saida in saidas if saida[1] == tamanho), key=lambda saida: bool(saida[4])):
+            com_logo = bool(com_logo and posicao_relativa)
+            especificacao = (tamanho, formato, qualidade, com_logo, bool(adaptativa))
+            if especificacao in gravadas:
+                _copiar_saida(gravadas[especificacao], caminho)
+                continue
+            gravadas[especificacao] = caminho
+
+            # Aplicação de logo: RGB sobre RGB, pela máscara pré-calculada
+            if com_logo and not com_logo_colado:
+                logo, mascara = carregar_logo_preparado(nivel.width)
+                nivel.paste(logo, (round(posicao_relativa[0] * nivel.width), round(posicao_relativa[1] * nivel.width)),
+                            mascara)
+                com_logo_colado = True
+            economia += _salvar_saida(nivel, caminho, formato, qualidade, adaptativa)
+        nivel = proximo
+    return economia
+
+def processar_imagem_unica(caminho_entrada, caminho_saida_completo, usar_logo=True, remover_fundo=REMOVER_FUNDO,
+                           rendicoes=RENDICOES):
+    """Processa uma imagem. Retorna True se a saída existe no final (nova ou já existente)."""
+    if saidas_existem(caminho_saida_completo, rendicoes):
         print(f" -> Já existe: {os.path.basename(caminho_saida_completo)}")
-        return
+        return True
 
     try:
-        img = Image.open(caminho_entrada)
-        img = ImageOps.exif_transpose(img)
-        
-        # Conversão para RGBA para lidar com transparência
-        if img.mode != 'RGBA' and img.mode != 'RGB':
-            img = img.convert('RGBA')
-            
-        img = tornar_quadrada(img)
-        
-        # Redimensiona para o tamanho máximo
-        img.thumbnail((TAMANHO_MAXIMO, TAMANHO_MAXIMO), Image.Resampling.LANCZOS)
-        
-        # Aplicação de logo
-        if usar_logo and os.path.exists(CAMINHO_LOGO):
-            img = img.convert("RGBA")
-            logo = Image.open(CAMINHO_LOGO).convert("RGBA")
-
-            # Redimensiona o Logo proporcionalmente
-            largura_base = img.width
-            proporcao = (largura_base * 0.25) / float(logo.width)
-            altura_nova = int((float(logo.height) * float(proporcao)))
-            logo = logo.resize((int(largura_base * 0.25), altura_nova), Image.Resampling.LANCZOS)
-            
-            # Transparência do Logo
-            alpha = logo.split()[3]
-            alpha = ImageEnhance.Brightness(alpha).enhance(0.8)
-            logo.putalpha(alpha)
-
-            # Lógica de Posição
-            lw, lh = logo.size
-            margem = 30
-            pos1_x = largura_base - lw - margem
-            pos1_y = margem 
-            
-            # Se tiver ocupado na direita, joga para esquerda
-            if verificar_area_ocupada(img, pos1_x, pos1_y, lw, lh):
-                pos2_x = margem
-                pos2_y = 160
-                img.paste(logo, (pos2_x, pos2_y), logo)
-            else:
-                img.paste(logo, (pos1_x, pos1_y), logo)
-
-        # Conversão para RGB
-        if not os.path.exists(caminho_saida_completo):
-            os.makedirs(os.path.dirname(caminho_saida_completo), exist_ok=True)
-
-        img.convert("RGB").save(caminho_saida_completo, "JPEG", quality=85, optimize=True)
+        _renderizar_imagem(caminho_entrada, caminho_saida_completo, usar_logo, remover_fundo, rendicoes=rendicoes)
         print(f"Sucesso: {os.path.basename(caminho_saida_completo)}")
+        return True
 
     except Exception as e:
         print(f"Erro em {os.path.basename(caminho_entrada)}: {e}")
+        return False
 
-def executar_pipeline(json_dados):
-    print(f"🚀 Iniciando processamento obediente...")
-    
-    for produto in json_dados:
+def _montar_tarefas(json_dados):
+    """
+    Achata produtos -> variações -> imagens numa lista ordenada de tarefas.
+    Cada tarefa é (indice, caminho_origem, caminho_destino), onde indice = (produto, variação, imagem)
+    aponta para o dict do JSON que vai receber o 'processed_path'.
+    """
+    tarefas = []
+    for i_prod, produto in enumerate(json_dados):
         # A coleção continua vindo do JSON
         nome_colecao_safe = sanitarizar_nome(produto.get('collection_name', 'Geral'))
         
         # Cria a pasta da coleção no destino
         pasta_destino_colecao = os.path.join(PASTA_SAIDA, nome_colecao_safe)
         
-        for variacao in produto['variations']:
-            for imagem_info in variacao['images']:
+        for i_var, variacao in enumerate(produto['variations']):
+            for i_img, imagem_info in enumerate(variacao['images']):
                 
                 # 1. ONDE ESTÁ? (Origem)
                 nome_arquivo_origem = os.path.basename(imagem_info['filename'])
@@ -129,20 +426,347 @@ def executar_pipeline(json_dados):
                     print(f"⚠️ Erro: JSON sem 'target_filename' para {nome_arquivo_origem}")
                     continue
 
-                caminho_destino = os.path.join(pasta_destino_colecao, novo_nome)
-                
-                # 3. Executa
-                if os.path.exists(caminho_origem):
-                    sucesso = processar_imagem_unica(caminho_origem, caminho_destino) # Sua função visual
-                    
-                    # Se deu certo, atualizamos o path final para o Bot saber
-                    if sucesso: # Assumindo que sua função retorna algo, ou verificamos exists depois
-                        imagem_info['processed_path'] = caminho_destino
-                else:
+                if not os.path.exists(caminho_origem):
                     print(f"⚠️ Origem não encontrada: {caminho_origem}")
+                    continue
+
+                caminho_destino = os.path.join(pasta_destino_colecao, novo_nome)
+                tarefas.append(((i_prod, i_var, i_img), caminho_origem, caminho_destino))
+    return tarefas
+
+def saidas_existem(caminho_destino, rendicoes=None):
+    """True se a saída principal e todas as rendições dela já estão no disco."""
+    return os.path.exists(caminho_destino) and all(
+        os.path.exists(caminho) for caminho in caminhos_rendicoes(caminho_destino, rendicoes or []).values())
+
+def _processar_tarefa(tarefa, remover_fundo=False, hash_origem=None, rendicoes=None, refazer=False):
+    """
+    Executa uma tarefa (roda dentro do worker). Nunca lança exceção: 
+    devolve (indice, status, erro, bytes_economizados) com status em 'ok', 'existente' ou 'erro'.
+    'refazer' renderiza mesmo com a saída no disco (invalidada pelo manifesto; é trocada só no fim).
+    """
+    indice, caminho_origem, caminho_destino = tarefa
+    if not refazer and saidas_existem(caminho_destino, rendicoes):
+        return indice, "existente", None, 0
+    try:
+        economia = _renderizar_imagem(caminho_origem, caminho_destino, remover_fundo=remover_fundo,
+                                      hash_origem=hash_origem, rendicoes=rendicoes)
+        return indice, "ok", None, economia
+    except Exception as e:
+        return indice, "erro", f"{type(e).__name__}: {e}", 0
+
+def criar_pool(num_workers=None, remover_fundo=REMOVER_FUNDO):
+    """
+    Pool de processos já com o logo pré-carregado em cada worker (para reaproveitar entre chamadas).
+    Com 'remover_fundo', cada worker abre a sua sessão do modelo, com os núcleos divididos entre eles.
+    """
+    num_workers = num_workers or NUM_WORKERS
+    threads_modelo = max(1, (os.cpu_count() or 1) // num_workers)
+    return ProcessPoolExecutor(max_workers=num_workers, initializer=_inicializar_worker,
+                               initargs=(remover_fundo, threads_modelo))
+
+def _coletar_resultados(executor, tarefas, remover_fundo=False, hashes=None, rendicoes=None, refazer=False):
+    """Submete as tarefas e junta os resultados. Falhas (até de worker morto) viram resultado 'erro'."""
+    resultados = {}
+    hashes = hashes or {}
+    futuros = {executor.submit(_processar_tarefa, tarefa, remover_fundo, hashes.get(tarefa[1]), rendicoes, refazer): tarefa
+               for tarefa in tarefas}
+    for futuro in as_completed(futuros):
+        indice = futuros[futuro][0]
+        try:
+            resultados[indice] = futuro.result()
+        except Exception as e:
+            resultados[indice] = (indice, "erro", f"{type(e).__name__}: {e}", 0)
+    return resultados
+
+def _renderizar_pendentes(tarefas, executor=None, remover_fundo=False, hashes=None, rendicoes=None, refazer=False):
+    """Máscaras (se pedidas) e render das tarefas: no pool, com 'executor', ou aqui mesmo, em sequência."""
+    if remover_fundo:
+        _preparar_mascaras(tarefas, hashes, executor)
+    if executor is not None:
+        return _coletar_resultados(executor, tarefas, remover_fundo, hashes, rendicoes, refazer)
+    hashes = hashes or {}
+    return {tarefa[0]: _processar_tarefa(tarefa, remover_fundo, hashes.get(tarefa[1]), rendicoes, refazer)
+            for tarefa in tarefas}
+
+# CACHE INCREMENTAL (MANIFESTO)
+
+def carregar_manifesto():
+    """
+    Lê o manifesto de build. Estrutura:
+        "saidas":  caminho_destino -> {"chave": ..., "origem": ...}
+        "origens": caminho_origem  -> {"tamanho": ..., "mtime_ns": ..., "hash": ...}
+    """
+    try:
+        with open(ARQUIVO_MANIFESTO, "r", encoding="utf-8") as f:
+            manifesto = json.load(f)
+        manifesto.setdefault("saidas", {})
+        manifesto.setdefault("origens", {})
+        return manifesto
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"saidas": {}, "origens": {}}
+
+def salvar_manifesto(manifesto):
+    """Grava o manifesto de forma atômica (arquivo temporário + replace)."""
+    os.makedirs(os.path.dirname(ARQUIVO_MANIFESTO), exist_ok=True)
+    temporario = ARQUIVO_MANIFESTO + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, ARQUIVO_MANIFESTO)
+
+def _hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+_CACHE_HASH_LOGO = {}   # (mtime_ns, tamanho) do arquivo do logo -> hash (não relê o logo a cada chamada)
+
+def _hash_logo():
+    if not os.path.exists(CAMINHO_LOGO):
+        return None
+    info = os.stat(CAMINHO_LOGO)
+    chave = (info.st_mtime_ns, info.st_size)
+    if chave not in _CACHE_HASH_LOGO:
+        _CACHE_HASH_LOGO.clear()
+        _CACHE_HASH_LOGO[chave] = _hash_arquivo(CAMINHO_LOGO)
+    return _CACHE_HASH_LOGO[chave]
+
+def _hash_origem(manifesto, caminho_origem):
+    """
+    Hash do arquivo de origem. Se tamanho e mtime não mudaram desde o último run,
+    reaproveita o hash salvo no manifesto (não relê o arquivo).
+    """
+    info = os.stat(caminho_origem)
+    salvo = manifesto["origens"].get(caminho_origem)
+    if salvo and salvo["tamanho"] == info.st_size and salvo["mtime_ns"] == info.st_mtime_ns:
+        return salvo["hash"]
+
+    hash_origem = _hash_arquivo(caminho_origem)
+    manifesto["origens"][caminho_origem] = {
+        "tamanho": info.st_size, "mtime_ns": info.st_mtime_ns, "hash": hash_origem
+    }
+    return hash_origem
+
+def calcular_chave_build(hash_origem, hash_logo, remover_fundo=False, rendicoes=None):
+    """Chave da saída = conteúdo da origem + parâmetros de processamento + logo."""
+    parametros = {
+        "versao": VERSAO_PIPELINE,
+        "tamanho": TAMANHO_MAXIMO,
+        "qualidade": QUALIDADE_JPEG,
+        "proporcao_logo": PROPORCAO_LOGO,
+        "opacidade_logo": OPACIDADE_LOGO,
+    }
+    if remover_fundo:   # Só entra na chave quando ligado: as saídas antigas continuam válidas
+        parametros["remocao_fundo"] = [removedor_fundo.MODELO, removedor_fundo.VERSAO_MASCARA]
+    if rendicoes:
+        parametros["rendicoes"] = rendicoes
+    if codificacao_adaptativa():
+        parametros["codificacao"] = codificacao_adaptativa()
+    bruto = json.dumps([hash_origem, parametros, hash_logo], sort_keys=True)
+    return hashlib.sha256(bruto.encode("utf-8")).hexdigest()
+
+def _anotar_no_manifesto(manifesto, tarefas, resultados, chaves):
+    """Registra no manifesto a chave de cada saída que ficou pronta (nova, do cache ou adotada)."""
+    for indice, caminho_origem, caminho_destino in tarefas:
+        if indice in resultados and resultados[indice][1] != "erro":
+            manifesto["saidas"][caminho_destino] = {"chave": chaves[indice], "origem": caminho_origem}
+
+def _filtrar_pelo_manifesto(tarefas, manifesto, remover_fundo=False, rendicoes=None):
+    """
+    Separa as tarefas em acertos de cache e pendentes.
+    - Acerto: a saída existe e foi gerada com a mesma chave (ou outra saída com a mesma
+      chave existe e é copiada - ex: produto renomeado pelo Organizador).
+    - Adoção: a saída existe, mas é de antes do manifesto (sem registro): entra no
+      manifesto com a chave atual, sem ser refeita.
+    - Invalidação: a saída existe, mas com chave diferente (logo/qualidade/tamanho/origem mudou).
+      Continua no disco até a nova ficar pronta (se o render falhar, a antiga fica).
+    - Falta: a saída não existe.
+    Retorna (chaves, resultados_cache, pendentes, estatisticas).
+    """
+    hash_logo = _hash_logo()
+    por_chave = {info["chave"]: destino for destino, info in manifesto["saidas"].items()}
+
+    chaves, resultados_cache, pendentes = {}, {}, []
+    estatisticas = {"acertos": 0, "adotadas": 0, "faltas": 0, "invalidacoes": 0}
+
+    for tarefa in tarefas:
+        indice, caminho_origem, caminho_destino = tarefa
+        chave = calcular_chave_build(_hash_origem(manifesto, caminho_origem), hash_logo, remover_fundo, rendicoes)
+        chaves[indice] = chave
+
+        registro = manifesto["saidas"].get(caminho_destino)
+        existe = os.path.exists(caminho_destino)
+
+        if existe and registro and registro["chave"] == chave and saidas_existem(caminho_destino, rendicoes):
+            estatisticas["acertos"] += 1
+            resultados_cache[indice] = (indice, "cache", None, 0)
+            continue
+
+        if registro is None and saidas_existem(caminho_destino, rendicoes):
+            estatisticas["adotadas"] += 1
+            resultados_cache[indice] = (indice, "cache", None, 0)
+            continue
+
+        gemea = por_chave.get(chave)   # (a cópia da gêmea só cobre a saída principal)
+        if not existe and not rendicoes and gemea and os.path.exists(gemea):
+            _copiar_saida(gemea, caminho_destino)
+            estatisticas["acertos"] += 1
+            resultados_cache[indice] = (indice, "cache", None, 0)
+            continue
+
+        if existe:
+            estatisticas["invalidacoes"] += 1
+        else:
+            estatisticas["faltas"] += 1
+        pendentes.append(tarefa)
+
+    return chaves, resultados_cache, pendentes, estatisticas
+
+def executar_pipeline(json_dados, paralelo=False, num_workers=None, usar_cache=True, executor=None,
+                      remover_fundo=REMOVER_FUNDO, rendicoes=RENDICOES, manifesto=None):
+    """
+    Processa todas as imagens do mapa e injeta 'processed_path' no JSON.
+    Args:
+        json_dados: Lista de produtos (formato do mapa_global.json).
+        paralelo: Se True, distribui as imagens num pool de processos.
+        num_workers: Quantidade de processos (padrão: NUM_WORKERS).
+        usar_cache: Se True, usa o manifesto de build para refazer só o que mudou.
+                    Se False, volta ao comportamento antigo (pula se o arquivo de saída existe).
+        executor: Pool já aberto (ver criar_pool) para reaproveitar entre várias chamadas.
+        remover_fundo: Se True, recorta o produto (rembg) antes de montar o quadrado branco.
+                       As máscaras são geradas em lotes antes do render e ficam em cache.
+        rendicoes: Saídas extras por imagem (ver RENDICOES_LOJA), geradas da mesma decodificação.
+                   Os caminhos vão para 'rendition_paths' no JSON.
+        manifesto: Manifesto já carregado (ver carregar_manifesto), para várias chamadas seguidas
+                   sem reler/regravar o arquivo a cada uma. Quem passa o manifesto é quem o grava.
+    Retorna um relatório com as contagens e a lista de falhas ('produto' = product_name).
+    """
+    print(f"🚀 Iniciando processamento obediente...")
+    
+    tarefas = _montar_tarefas(json_dados)
+    num_workers = num_workers or NUM_WORKERS
+
+    resultados, pendentes = {}, tarefas
+    gravar_manifesto = manifesto is None
+    if usar_cache:
+        manifesto = carregar_manifesto() if gravar_manifesto else manifesto
+        chaves, resultados, pendentes, estatisticas = _filtrar_pelo_manifesto(tarefas, manifesto, remover_fundo, rendicoes)
+        print(f"🗃️ Cache: {estatisticas['acertos']} acertos | {estatisticas['adotadas']} adotadas | "
+              f"{estatisticas['faltas']} novas | {estatisticas['invalidacoes']} invalidadas")
+        _anotar_no_manifesto(manifesto, tarefas, resultados, chaves)
+
+    # Hash de cada origem (o manifesto já calculou; sem cache, lê o arquivo): chave das máscaras
+    hashes = {}
+    if remover_fundo:
+        hashes = {origem: (_hash_origem(manifesto, origem) if usar_cache else _hash_arquivo(origem))
+                  for _, origem, _ in pendentes}
+
+    # Pool criado só para esta execução (máscaras e render no mesmo pool), se não veio um aberto
+    pool_proprio = None
+    if executor is None and paralelo and num_workers > 1 and len(pendentes) > 1:
+        print(f"⚡ Modo paralelo: {len(pendentes)} imagens em {num_workers} processos.")
+        executor = pool_proprio = criar_pool(num_workers, remover_fundo)
+
+    # Em lotes: o manifesto é gravado a cada lote, então uma queda no meio não perde o que já foi feito.
+    # Com cache, tudo que está pendente é refeito, mesmo com a saída (invalidada) no disco.
+    try:
+        for inicio in range(0, len(pendentes), LOTE_MANIFESTO):
+            lote = pendentes[inicio:inicio + LOTE_MANIFESTO]
+            resultados.update(_renderizar_pendentes(lote, executor, remover_fundo, hashes, rendicoes, refazer=usar_cache))
+            if usar_cache:
+                _anotar_no_manifesto(manifesto, lote, resultados, chaves)
+                if gravar_manifesto:
+                    salvar_manifesto(manifesto)
+    finally:
+        if pool_proprio is not None:
+            pool_proprio.shutdown()
+
+    # Junta os resultados na ordem original do JSON (determinístico, independente da ordem de término)
+    relatorio = {"ok": 0, "existente": 0, "cache": 0, "falhas": [], "bytes_economizados": 0}
+    for indice, caminho_origem, caminho_destino in tarefas:
+        _, status, erro, economia = resultados[indice]
+        relatorio["bytes_economizados"] += economia
+        if status == "erro":
+            print(f"Erro em {os.path.basename(caminho_origem)}: {erro}")
+            relatorio["falhas"].append({"origem": caminho_origem, "erro": erro,
+                                        "produto": json_dados[indice[0]].get('product_name')})
+            continue
+
+        if status == "existente":
+            print(f" -> Já existe: {os.path.basename(caminho_destino)}")
+        elif status == "ok":
+            print(f"Sucesso: {os.path.basename(caminho_destino)}")
+        relatorio[status] += 1
+
+        # Se deu certo, atualizamos o path final para o Bot saber
+        i_prod, i_var, i_img = indice
+        imagem_info = json_dados[i_prod]['variations'][i_var]['images'][i_img]
+        imagem_info['processed_path'] = caminho_destino
+        if rendicoes:
+            imagem_info['rendition_paths'] = caminhos_rendicoes(caminho_destino, rendicoes)
+
+    if usar_cache:
+        if gravar_manifesto:
+            salvar_manifesto(manifesto)
+        relatorio["estatisticas_cache"] = estatisticas
+
+    print(f"📊 Novas: {relatorio['ok']} | Do cache: {relatorio['cache']} | "
+          f"Já existentes: {relatorio['existente']} | Falhas: {len(relatorio['falhas'])}")
+    if relatorio["bytes_economizados"]:
+        print(f"💾 Codificação adaptativa: {relatorio['bytes_economizados'] / 1024:.0f} KB a menos "
+              f"que em qualidade {QUALIDADE_JPEG} fixa")
+    return relatorio
 
  
  
+def executar_pipeline_armazem(caminho_armazem=armazem.ARQUIVO_ARMAZEM, tamanho_lote=200, **opcoes):
+    """
+    Versão em streaming do executar_pipeline: lê o armazém em lotes de produtos,
+    processa e grava o 'processed_path' de volta, produto a produto.
+    'opcoes' são repassadas ao executar_pipeline (paralelo, num_workers, usar_cache, ...).
+    O manifesto é lido uma vez e gravado a cada lote; com 'paralelo', o pool de processos
+    (e a sessão do rembg de cada worker) também é criado uma vez só, para todos os lotes.
+    """
+    total = {"ok": 0, "existente": 0, "cache": 0, "falhas": [], "bytes_economizados": 0}
+    lote = []
+    manifesto = carregar_manifesto() if opcoes.get("usar_cache", True) else None
+    num_workers = opcoes.get("num_workers") or NUM_WORKERS
+    if opcoes.pop("paralelo", False) and num_workers > 1 and opcoes.get("executor") is None:
+        print(f"⚡ Modo paralelo: {num_workers} processos para todos os lotes.")
+        opcoes["executor"] = pool_proprio = criar_pool(num_workers, opcoes.get("remover_fundo", REMOVER_FUNDO))
+    else:
+        pool_proprio = None
+
+    def _processar_lote():
+        produtos = [produto for _, produto in lote]
+        antes = [json.dumps(p, sort_keys=True) for p in produtos]
+        relatorio = executar_pipeline(produtos, manifesto=manifesto, **opcoes)
+        if manifesto is not None:
+            salvar_manifesto(manifesto)
+        for (id_produto, produto), original in zip(lote, antes):
+            if json.dumps(produto, sort_keys=True) != original:
+                armazem.atualizar_produto(id_produto, produto, caminho_armazem)
+        for chave in ("ok", "existente", "cache", "bytes_economizados"):
+            total[chave] += relatorio[chave]
+        total["falhas"].extend(relatorio["falhas"])
+        lote.clear()
+
+    try:
+        for id_produto, produto in armazem.iterar_produtos(caminho_armazem):
+            lote.append((id_produto, produto))
+            if len(lote) >= tamanho_lote:
+                _processar_lote()
+        if lote:
+            _processar_lote()
+    finally:
+        if pool_proprio is not None:
+            pool_proprio.shutdown()
+
+    return total
+
 # Testes
 if __name__ == "__main__":
     if not os.path.exists(PASTA_ENTRADA):
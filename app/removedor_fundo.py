@@ -0,0 +1,120 @@
+import os
+import threading
+
+from PIL import Image
+
+# ==============================================================================
+# REMOÇÃO DE FUNDO (REMBG)
+# Gera a máscara alfa (o que é produto / o que é fundo) de cada foto de origem.
+# - Uma sessão do modelo por processo (criada no initializer do pool, não por imagem).
+# - Inferência em lotes, sobre a foto já reduzida (o modelo só enxerga 320x320).
+# - Máscaras em cache no disco pelo hash da origem: trocar logo, tamanho ou qualidade
+#   não repete a segmentação, só a composição.
+# - Só CPU (CPUExecutionProvider), com as threads do ONNX divididas entre os workers.
+# ==============================================================================
+
+MODELO = "u2net"
+PASTA_MASCARAS = "./data/cache/mascaras"
+VERSAO_MASCARA = 1            # Incrementar se o pós-processamento da máscara mudar
+RESOLUCAO_SEGMENTACAO = 640   # Lado maior da foto enviada ao modelo (decodificada já reduzida)
+TAMANHO_LOTE = 8              # Fotos por chamada ao modelo
+
+# Modelos da família U²-Net: mesma normalização/saída, então aceitam o lote montado aqui.
+# Os demais caem no session.predict() do rembg, uma foto por vez.
+_MODELOS_EM_LOTE = {
+    "u2net": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2netp": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "silueta": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+}
+
+_SESSAO = {"modelo": None, "sessao": None, "lote_ok": True}
+_TRAVA = threading.Lock()
+
+def preparar_sessao(modelo=MODELO, threads=None):
+    """
+    Sessão do rembg deste processo (criada na primeira chamada e reaproveitada).
+    'threads': threads do ONNX Runtime; nos workers do pool, os núcleos divididos entre eles.
+    """
+    with _TRAVA:
+        if _SESSAO["modelo"] == modelo:
+            return _SESSAO["sessao"]
+
+        if threads:
+            os.environ["OMP_NUM_THREADS"] = str(threads)   # Lido pelo new_session do rembg
+        from rembg import new_session   # Importado aqui: sem remoção de fundo, o rembg nem é carregado
+
+        sessao = new_session(modelo, providers=["CPUExecutionProvider"])
+        # Versões do rembg que ignoram 'providers' escolhem CUDA sozinhas se houver GPU
+        if sessao.inner_session.get_providers() != ["CPUExecutionProvider"]:
+            sessao.inner_session.set_providers(["CPUExecutionProvider"])
+
+        _SESSAO.update(modelo=modelo, sessao=sessao, lote_ok=True)
+        return sessao
+
+def caminho_mascara(hash_origem, modelo=MODELO):
+    return os.path.join(PASTA_MASCARAS, f"{hash_origem}_{modelo}_v{VERSAO_MASCARA}.png")
+
+def carregar_mascara(hash_origem, modelo=MODELO):
+    """Máscara 'L' em cache para essa origem, ou None se ainda não foi gerada."""
+    caminho = caminho_mascara(hash_origem, modelo)
+    if not os.path.exists(caminho):
+        return None
+    with Image.open(caminho) as mascara:
+        return mascara.convert("L")
+
+def _inferir_lote(sessao, modelo, imagens):
+    """Uma chamada ao modelo para o lote inteiro (U²-Net). Retorna as máscaras no tamanho de cada imagem."""
+    import numpy as np
+
+    media, desvio, tamanho = _MODELOS_EM_LOTE[modelo]
+    entradas = [sessao.normalize(img, media, desvio, tamanho) for img in imagens]
+    nome_entrada = next(iter(entradas[0]))
+    saidas = sessao.inner_session.run(None, {nome_entrada: np.concatenate([e[nome_entrada] for e in entradas])})
+
+    mascaras = []
+    for predicao, img in zip(saidas[0][:, 0, :, :], imagens):
+        minimo, maximo = predicao.min(), predicao.max()
+        predicao = (predicao - minimo) / ((maximo - minimo) or 1)
+        mascara = Image.fromarray((predicao * 255).astype("uint8"), mode="L")
+        mascaras.append(mascara.resize(img.size, Image.Resampling.LANCZOS))
+    return mascaras
+
+def segmentar(imagens, modelo=MODELO):
+    """
+    Máscaras alfa das imagens (PIL, RGB), na mesma ordem.
+    Tenta o lote numa chamada só; se o modelo tiver o batch fixo em 1, passa a
+    inferir uma por vez neste processo (sem tentar o lote de novo).
+    """
+    sessao = preparar_sessao(modelo)
+    mascaras = []
+    for inicio in range(0, len(imagens), TAMANHO_LOTE):
+        lote = imagens[inicio:inicio + TAMANHO_LOTE]
+        if modelo in _MODELOS_EM_LOTE and _SESSAO["lote_ok"] and len(lote) > 1:
+            try:
+                mascaras.extend(_inferir_lote(sessao, modelo, lote))
+                continue
+            except Exception as e:
+                print(f"⚠️ Modelo não aceitou lote ({type(e).__name__}). Segmentando uma por vez.")
+                _SESSAO["lote_ok"] = False
+        mascaras.extend(sessao.predict(img)[0].convert("L") for img in lote)
+    return mascaras
+
+def gerar_mascaras(itens, modelo=MODELO):
+    """
+    Segmenta e grava no cache as máscaras que faltam.
+    'itens': [(hash_origem, imagem PIL já reduzida)]. Retorna quantas foram geradas.
+    """
+    faltando = [(hash_origem, img) for hash_origem, img in itens
+                if not os.path.exists(caminho_mascara(hash_origem, modelo))]
+    if not faltando:
+        return 0
+
+    os.makedirs(PASTA_MASCARAS, exist_ok=True)
+    mascaras = segmentar([img.convert("RGB") for _, img in faltando], modelo)
+    for (hash_origem, _), mascara in zip(faltando, mascaras):
+        destino = caminho_mascara(hash_origem, modelo)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        mascara.save(temporario, "PNG")
+        os.replace(temporario, destino)   # Atômico: outro worker nunca lê máscara pela metade
+    return len(faltando)
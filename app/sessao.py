@@ -0,0 +1,163 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import threading
+import subprocess
+import urllib.request
+
+import undetected_chromedriver as uc
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+
+# ==============================================================================
+# SESSÃO PERSISTENTE DO NAVEGADOR
+# Um Chrome "quente" fica aberto entre execuções com a porta de depuração ligada;
+# o bot só se conecta a ele (sem cold start e sem refazer login). O chromedriver
+# já corrigido pelo undetected-chromedriver fica guardado por versão do Chrome.
+# ==============================================================================
+
+PORTA_DEPURACAO = 9222
+PASTA_DRIVERS = "./data/cache/chromedriver"
+TEMPO_SUBIDA_NAVEGADOR = 20   # Segundos esperando o Chrome novo abrir a porta
+
+_TRAVA_DRIVER = threading.Lock()   # Vários navegadores paralelos pedem o driver ao mesmo tempo
+
+def navegador_aberto(porta=PORTA_DEPURACAO):
+    """Dict do /json/version do Chrome escutando na porta, ou None se não há nenhum."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{porta}/json/version", timeout=0.5) as resposta:
+            return json.loads(resposta.read().decode("utf-8"))
+    except Exception:
+        return None
+
+def navegador_headless(info):
+    """True se o Chrome descrito pelo /json/version (navegador_aberto) roda sem janela."""
+    return "Headless" in (info or {}).get("User-Agent", "")
+
+def _esperar_porta_fechar(porta):
+    fim = time.time() + TEMPO_SUBIDA_NAVEGADOR
+    while navegador_aberto(porta):
+        if time.time() >= fim:
+            raise TimeoutError(f"O Chrome da porta {porta} não fechou em {TEMPO_SUBIDA_NAVEGADOR}s.")
+        time.sleep(0.2)
+
+def _versao_do_executavel():
+    if sys.platform == "win32":
+        # chrome.exe --version não escreve nada no Windows: o instalador grava a versão no registro
+        import winreg
+        for raiz in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(raiz, r"Software\Google\Chrome\BLBeacon") as chave:
+                    return winreg.QueryValueEx(chave, "version")[0]
+            except OSError:
+                continue
+        return None
+
+    executavel = uc.find_chrome_executable()
+    if not executavel:
+        return None
+    saida = subprocess.run([executavel, "--version"], capture_output=True, text=True, timeout=10)
+    return saida.stdout
+
+def detectar_versao_chrome(porta=PORTA_DEPURACAO):
+    """Versão principal do Chrome instalado (ex: 144), ou None se não der para descobrir."""
+    info = navegador_aberto(porta)
+    try:
+        texto = info["Browser"] if info else _versao_do_executavel()
+    except Exception:
+        texto = None
+    encontrado = re.search(r"(\d+)\.\d+\.\d+", texto or "")
+    return int(encontrado.group(1)) if encontrado else None
+
+def obter_chromedriver(versao):
+    """
+    Caminho de um chromedriver já corrigido para esta versão do Chrome.
+    Só baixa/corrige na primeira vez; depois é uma cópia guardada em PASTA_DRIVERS.
+    """
+    if versao is None:
+        return None
+    sufixo = ".exe" if sys.platform == "win32" else ""
+    destino = os.path.abspath(os.path.join(PASTA_DRIVERS, f"chromedriver_{versao}{sufixo}"))
+    with _TRAVA_DRIVER:
+        if os.path.exists(destino):
+            return destino
+
+        print(f"⬇️ Preparando chromedriver para o Chrome {versao} (só na primeira vez)...")
+        os.makedirs(PASTA_DRIVERS, exist_ok=True)
+        patcher = uc.Patcher(version_main=versao)
+        patcher.auto()
+        temporario = destino + ".tmp"
+        shutil.copy2(patcher.executable_path, temporario)
+        os.replace(temporario, destino)
+        return destino
+
+def iniciar_navegador_persistente(caminho_perfil, porta=PORTA_DEPURACAO, headless=False, argumentos=()):
+    """Abre um Chrome desacoplado deste processo (continua vivo quando o bot termina)."""
+    executavel = uc.find_chrome_executable()
+    if not executavel:
+        raise FileNotFoundError("Chrome não encontrado no sistema.")
+
+    comando = [executavel, f"--remote-debugging-port={porta}", f"--user-data-dir={caminho_perfil}", *argumentos]
+    if headless:
+        comando.append("--headless=new")
+
+    if sys.platform == "win32":
+        subprocess.Popen(comando, creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        subprocess.Popen(comando, start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    fim = time.time() + TEMPO_SUBIDA_NAVEGADOR
+    while not navegador_aberto(porta):
+        if time.time() >= fim:
+            raise TimeoutError(f"O Chrome não abriu a porta {porta} em {TEMPO_SUBIDA_NAVEGADOR}s.")
+        time.sleep(0.2)
+
+def conectar(porta=PORTA_DEPURACAO, versao=None):
+    """
+    Conecta o Selenium ao Chrome que já está na porta. O driver.quit() de uma sessão
+    conectada só solta o navegador, não fecha (ele continua quente para a próxima execução).
+    """
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"127.0.0.1:{porta}"
+    caminho_driver = obter_chromedriver(versao or detectar_versao_chrome(porta))
+    servico = Service(caminho_driver) if caminho_driver else Service()
+    return webdriver.Chrome(service=servico, options=options)
+
+def abrir_sessao_persistente(caminho_perfil, porta=PORTA_DEPURACAO, headless=False, argumentos=()):
+    """
+    Reaproveita o Chrome quente da porta (ou abre um, se não houver) e devolve o driver conectado.
+    Conectar não muda o modo de um Chrome já aberto: 'headless' com um Chrome com janela na porta
+    é ignorado (só avisa, para não fechar o navegador do usuário); sem 'headless' com um Chrome
+    headless na porta, ele é fechado e reaberto com janela (o login fica no perfil).
+    """
+    inicio = time.time()
+    info = navegador_aberto(porta)
+    if info and not headless and navegador_headless(info):
+        print(f"🔄 O navegador da porta {porta} está headless: reabrindo com janela...")
+        fechar_navegador_persistente(conectar(porta))
+        _esperar_porta_fechar(porta)
+        info = None
+
+    if info:
+        if headless and not navegador_headless(info):
+            print(f"⚠️ Headless ignorado: o navegador da porta {porta} já está aberto com janela.")
+        print(f"♻️ Reaproveitando o navegador aberto na porta {porta}.")
+    else:
+        print(f"🌐 Abrindo navegador persistente na porta {porta}...")
+        iniciar_navegador_persistente(caminho_perfil, porta, headless, argumentos)
+
+    driver = conectar(porta)
+    print(f"⚡ Navegador conectado em {time.time() - inicio:.1f}s.")
+    return driver
+
+def fechar_navegador_persistente(driver):
+    """Fecha de vez o Chrome quente (o quit() normal de uma sessão conectada não fecha)."""
+    try:
+        driver.execute_cdp_cmd("Browser.close", {})
+    except Exception:
+        pass
+    driver.quit()
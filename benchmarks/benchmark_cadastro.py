@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from PIL import Image
+
+import portal_simulado
+
+# ==============================================================================
+# BENCHMARK DO CADASTRO (PONTA A PONTA)
+# Roda o executar_bot headless contra o portal simulado, numa pasta temporária
+# (histórico, armazém e perfil do Chrome isolados do projeto), e mede o tempo de
+# cada etapa e de cada produto (via app.metricas).
+# Uso: python benchmarks/benchmark_cadastro.py --produtos 5 --latencia 0.05
+# ==============================================================================
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ETAPAS_MEDIDAS = [
+    "preencher_dados_basicos", "selecionar_categoria", "colar_descricao", "preencher_atributos",
+    "preencher_variacoes", "preencher_finalizacoes", "preencher_envio_e_salvar",
+]
+
+def gerar_catalogo(pasta, num_produtos, num_variacoes, imagens_por_variacao):
+    """Cria imagens JPEG e um mapa_global.json sintéticos. Retorna a lista de produtos."""
+    produtos = []
+    pasta_imagens = os.path.join(pasta, "data", "processed", "Benchmark")
+    os.makedirs(pasta_imagens, exist_ok=True)
+    visoes = ["front", "side", "back", "detail"]
+
+    for p in range(num_produtos):
+        nome_produto = f"Miniatura {p + 1:03d}"
+        variacoes = []
+        for v in range(num_variacoes):
+            nome_variacao = f"Modelo {v + 1}"
+            imagens = []
+            for i in range(imagens_por_variacao):
+                visao = visoes[i % len(visoes)]
+                caminho = os.path.join(pasta_imagens, f"{nome_produto} - {nome_variacao} - {visao}.jpg")
+                Image.new("RGB", (256, 256), (40 * p % 255, 60 * v % 255, 80 * i % 255)).save(caminho, "JPEG")
+                imagens.append({"filename": os.path.basename(caminho), "view_type": visao,
+                                "processed_path": caminho})
+            variacoes.append({"variation_name": nome_variacao, "images": imagens})
+        produtos.append({"collection_name": "Benchmark", "product_name": nome_produto, "variations": variacoes})
+
+    with open(os.path.join(pasta, "mapa_global.json"), "w", encoding="utf-8") as f:
+        json.dump(produtos, f, indent=2, ensure_ascii=False)
+    os.makedirs(os.path.join(pasta, "assets"), exist_ok=True)
+    with open(os.path.join(pasta, "assets", "descricao.txt"), "w", encoding="utf-8") as f:
+        f.write("Miniatura impressa em resina 3D.\nAcompanha base.\n")
+    return produtos
+
+def imprimir_relatorio(resumo, salvos_no_portal, esperados):
+    """Tabela por etapa (média/p50/p95/máx) + produtos por hora, a partir do app.metricas."""
+    print(f"\n{'=' * 72}\n📊 BENCHMARK DO CADASTRO\n{'=' * 72}")
+    print(f"{'etapa':<28}{'n':>4}{'média':>10}{'p50':>10}{'p95':>10}{'máx':>10}")
+    chaves = [("etapa", nome) for nome in ETAPAS_MEDIDAS] + [("produto", "cadastrar_produto")]
+    for tipo, nome in chaves:
+        t = resumo["tempos"].get((tipo, nome))
+        if not t:
+            continue
+        if tipo == "produto":
+            print("-" * 72)
+        print(f"{nome:<28}{t['n']:>4}{t['total'] / t['n']:>9.2f}s{t['p50']:>9.2f}s"
+              f"{t['p95']:>9.2f}s{t['max']:>9.2f}s")
+    print(f"\nProdutos salvos no portal: {salvos_no_portal}/{esperados} | tempo total {resumo['duracao']:.1f}s | "
+          f"{resumo['produtos_por_hora']:.0f} produtos/hora")
+
+def executar_benchmark(num_produtos=5, latencia=portal_simulado.LATENCIA_PADRAO, num_variacoes=2,
+                       imagens_por_variacao=2, headless=True, arquivo_saida=None,
+                       falha_upload=portal_simulado.FALHA_UPLOAD_PADRAO):
+    pasta = tempfile.mkdtemp(prefix="benchmark_cadastro_")
+    gerar_catalogo(pasta, num_produtos, num_variacoes, imagens_por_variacao)
+
+    # O Cadastrador usa caminhos relativos à pasta atual (histórico, armazém, perfil):
+    # importa só depois de entrar na pasta temporária, para nada vazar para o projeto.
+    os.chdir(pasta)
+    sys.path.insert(0, RAIZ_PROJETO)
+    from app import cadastrador
+    from app import metricas
+
+    portal = portal_simulado.iniciar_portal(latencia=latencia, falha_upload=falha_upload)
+    cadastrador.URL_NOVO_PRODUTO = portal.url_formulario
+    cadastrador.REUTILIZAR_NAVEGADOR = False   # Cold start isolado, sem encostar no Chrome quente do usuário
+
+    print(f"🧪 {num_produtos} produtos x {num_variacoes} variações contra {portal.url_formulario} "
+          f"(latência {latencia * 1000:.0f}ms) em {pasta}")
+    cadastrador.executar_bot(headless=headless, esperar_enter=False)
+    portal.shutdown()
+
+    # O executar_bot já encerrou a execução das métricas; os contadores continuam disponíveis
+    resumo = metricas.resumo()
+    imprimir_relatorio(resumo, len(portal.produtos_salvos), num_produtos)
+    if portal.uploads_recusados:
+        print(f"Uploads recusados pelo portal: {portal.uploads_recusados} | "
+              f"reenvios da galeria: {resumo['repeticoes'].get('upload_galeria', 0)}")
+    if arquivo_saida:
+        with open(os.path.join(RAIZ_PROJETO, arquivo_saida), "w", encoding="utf-8") as f:
+            json.dump({"produtos": num_produtos, "latencia": latencia, "salvos": len(portal.produtos_salvos),
+                       "duracao": resumo["duracao"], "produtos_por_hora": resumo["produtos_por_hora"],
+                       "tempos": {f"{tipo}:{nome}": t for (tipo, nome), t in resumo["tempos"].items()}},
+                      f, indent=2)
+    return resumo
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do Cadastrador contra o portal simulado.")
+    parser.add_argument("--produtos", type=int, default=5)
+    parser.add_argument("--latencia", type=float, default=portal_simulado.LATENCIA_PADRAO,
+                        help="segundos por requisição ao portal")
+    parser.add_argument("--variacoes", type=int, default=2)
+    parser.add_argument("--imagens", type=int, default=2, help="imagens por variação")
+    parser.add_argument("--visivel", action="store_true", help="abre o navegador visível")
+    parser.add_argument("--falha-upload", type=float, default=portal_simulado.FALHA_UPLOAD_PADRAO,
+                        help="fração dos uploads de imagem recusados pelo portal")
+    parser.add_argument("--saida", help="grava os tempos brutos neste JSON (relativo à raiz do projeto)")
+    args = parser.parse_args()
+
+    executar_benchmark(args.produtos, args.latencia, args.variacoes, args.imagens,
+                       headless=not args.visivel, arquivo_saida=args.saida, falha_upload=args.falha_upload)
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+from PIL import Image, ImageDraw, ImageFile
+
+# ==============================================================================
+# BENCHMARK DE MEMÓRIA DO PROCESSADOR
+# Compara, imagem a imagem, o render atual (grafo de etapas, app/processador.py) com
+# a receita de referência de antes (RGBA -> quadrado -> RGBA de novo para o logo ->
+# RGB para salvar). Cada variante roda num processo próprio, para o pico de RSS ser só dela.
+# A métrica principal é a memória de pixels, onde o grafo economiza: buffers de imagem
+# que o Pillow alocou por imagem, em quantidade e em MB (cada convert/copy/new é um),
+# contados por um gancho em Image._new/load_prepare.
+# Colunas de contexto (não mostram a diferença, e não é para mostrar):
+#   - pico de RSS do processo (só em Linux/macOS): dominado pela maior decodificação,
+#     que é a mesma nas duas variantes;
+#   - pico do tracemalloc: só vê o heap do Python (matrizes NumPy da análise do logo),
+#     não os pixels, que o Pillow aloca em C. Sai igual nas duas variantes.
+# Uso: python benchmarks/benchmark_memoria.py --imagens 12
+# ==============================================================================
+
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTES = ["referencia", "grafo"]
+
+def gerar_imagens(pasta, quantidade):
+    """Fotos sintéticas variadas: JPEG grande, PNG com transparência e PNG em tons de cinza."""
+    os.makedirs(os.path.join(pasta, "assets"), exist_ok=True)
+    logo = Image.new("RGBA", (400, 150), (0, 0, 0, 0))
+    ImageDraw.Draw(logo).ellipse([0, 0, 399, 149], fill=(200, 30, 30, 255))
+    logo.save(os.path.join(pasta, "assets", "logo.png"))
+
+    caminhos = []
+    for i in range(quantidade):
+        tipo = i % 3
+        if tipo == 0:
+            img, nome = Image.new("RGB", (4000, 3000), (30 * i % 255, 90, 120)), f"foto_{i:03d}.jpg"
+        elif tipo == 1:
+            img, nome = Image.new("RGBA", (1600, 2000), (0, 0, 0, 0)), f"recorte_{i:03d}.png"
+        else:
+            img, nome = Image.new("L", (1500, 1500), 200), f"cinza_{i:03d}.png"
+        desenho = ImageDraw.Draw(img)
+        for k in range(40):
+            caixa = [img.width * k // 50, img.height * k // 60, img.width * (k + 10) // 50, img.height * (k + 8) // 60]
+            desenho.rectangle(caixa, fill=(k * 6 % 255, 60, 200, 255) if img.mode != "L" else k * 6 % 255)
+        caminho = os.path.join(pasta, nome)
+        img.save(caminho, quality=92) if nome.endswith(".jpg") else img.save(caminho)
+        caminhos.append(caminho)
+    return caminhos
+
+def _bytes_do_buffer(img):
+    """Memória do buffer de pixels: o Pillow guarda 1 byte por pixel nos modos L/P/1 e 4 nos demais (RGB inclusive)."""
+    por_pixel = {"1": 1, "L": 1, "P": 1, "I;16": 2}.get(img.mode, 4)
+    return img.width * img.height * por_pixel
+
+def instalar_contador_pillow():
+    """Soma em contador['bytes'] o tamanho de cada buffer de imagem que o Pillow criar (new/convert/copy/resize/decode)."""
+    contador = {"bytes": 0}
+    novo_original = Image.Image._new
+    preparar_original = ImageFile.ImageFile.load_prepare
+
+    def _new(self, im):
+        imagem = novo_original(self, im)
+        contador["bytes"] += _bytes_do_buffer(imagem)
+        return imagem
+
+    def load_prepare(self):
+        sem_buffer = getattr(self, "_im", None) is None
+        preparar_original(self)
+        if sem_buffer:
+            contador["bytes"] += _bytes_do_buffer(self)
+
+    Image.Image._new = _new
+    ImageFile.ImageFile.load_prepare = load_prepare
+    return contador
+
+def renderizar_referencia(processador, caminho_entrada, caminho_saida):
+    """A receita antiga, com as conversões de modo de antes, para comparação."""
+    from app import posicionamento_logo
+
+    img = processador.abrir_reduzida(caminho_entrada)
+    if img.mode != 'RGBA' and img.mode != 'RGB':
+        img = img.convert('RGBA')
+    img.thumbnail((processador.TAMANHO_MAXIMO, processador.TAMANHO_MAXIMO), Image.Resampling.LANCZOS)
+    img = processador.tornar_quadrada(img)
+
+    img = img.convert("RGBA")
+    logo_rgb, mascara = processador.carregar_logo_preparado(img.width)
+    logo = logo_rgb.convert("RGBA")
+    logo.putalpha(mascara)
+    img.paste(logo, posicionamento_logo.escolher_posicao(img, logo.size, processador.MARGEM_LOGO), logo)
+
+    img.convert("RGB").save(caminho_saida, "JPEG", quality=processador.QUALIDADE_JPEG, optimize=True)
+
+def medir_variante(variante, pasta, caminhos):
+    """Roda (no processo atual) a variante em todas as imagens. Retorna as medidas por imagem."""
+    os.chdir(pasta)
+    sys.path.insert(0, RAIZ_PROJETO)
+    from app import processador
+
+    saida = os.path.join(pasta, variante)
+    os.makedirs(saida, exist_ok=True)
+    processador.carregar_logo_preparado(processador.TAMANHO_MAXIMO)   # Fora da medida (é cache por processo)
+
+    medidas = []
+    contador = instalar_contador_pillow()
+    tracemalloc.start()
+    for caminho in caminhos:
+        destino = os.path.join(saida, os.path.splitext(os.path.basename(caminho))[0] + ".jpg")
+        contexto = {}
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        buffers_antes = Image.core.get_stats()["new_count"]
+        bytes_antes = contador["bytes"]
+        inicio = time.perf_counter()
+
+        if variante == "grafo":
+            processador._renderizar_imagem(caminho, destino, contexto=contexto)
+        else:
+            renderizar_referencia(processador, caminho, destino)
+
+        _, pico = tracemalloc.get_traced_memory()
+        medidas.append({"imagem": os.path.basename(caminho), "pico_python": pico - base,
+                        "buffers_pillow": Image.core.get_stats()["new_count"] - buffers_antes,
+                        "bytes_pillow": contador["bytes"] - bytes_antes,
+                        "tempo": time.perf_counter() - inicio, "conversoes": contexto.get("conversoes", [])})
+    tracemalloc.stop()
+
+    try:
+        import resource
+        # ru_maxrss: KB no Linux, bytes no macOS
+        pico_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    except ImportError:
+        pico_rss = None
+    return {"variante": variante, "imagens": medidas, "pico_rss": pico_rss}
+
+def _rodar_em_processo(variante, pasta, caminhos):
+    comando = [sys.executable, os.path.abspath(__file__), "--variante", variante, "--pasta", pasta]
+    resultado = subprocess.run(comando, input=json.dumps(caminhos), capture_output=True, text=True, check=True)
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+def imprimir_relatorio(resultados):
+    print(f"\n{'=' * 86}\n🧠 BENCHMARK DE MEMÓRIA DO PROCESSADOR (médias por imagem)\n{'=' * 86}")
+    print(f"{'variante':<12}{'MB Pillow':>11}{'buffers Pillow':>16}{'pico RSS (MB)':>16}{'tempo':>10}"
+          f"{'heap python (KB)*':>19}")
+    for r in resultados:
+        medidas = r["imagens"]
+        megabytes = sum(m["bytes_pillow"] for m in medidas) / len(medidas) / 1024 / 1024
+        buffers = sum(m["buffers_pillow"] for m in medidas) / len(medidas)
+        rss = f"{r['pico_rss'] / 1024 / 1024:.0f}" if r["pico_rss"] else "-"
+        tempo = sum(m["tempo"] for m in medidas) / len(medidas)
+        pico = sum(m["pico_python"] for m in medidas) / len(medidas) / 1024
+        print(f"{r['variante']:<12}{megabytes:>11.1f}{buffers:>16.1f}{rss:>16}{tempo * 1000:>8.0f}ms{pico:>19.0f}")
+    print("Métrica principal: MB/buffers do Pillow. * pico do tracemalloc, só de controle: não vê os pixels\n"
+          "  do Pillow (alocados em C); o pico de RSS é dominado pela maior decodificação, igual nas duas.")
+
+    print("\nPor tipo de imagem (MB em buffers do Pillow):")
+    for i, medida in enumerate(resultados[0]["imagens"][:3]):
+        colunas = " | ".join(f"{r['variante']}: {r['imagens'][i]['bytes_pillow'] / 1024 / 1024:.1f} MB"
+                             for r in resultados)
+        conversoes = resultados[-1]["imagens"][i]["conversoes"]
+        print(f"   {medida['imagem']:<18} {colunas}  conversões: {conversoes or 'nenhuma'}")
+
+def executar_benchmark(num_imagens=12, arquivo_saida=None):
+    pasta = tempfile.mkdtemp(prefix="benchmark_memoria_")
+    caminhos = gerar_imagens(pasta, num_imagens)
+    print(f"🧪 {num_imagens} imagens em {pasta}")
+
+    resultados = [_rodar_em_processo(variante, pasta, caminhos) for variante in VARIANTES]
+    imprimir_relatorio(resultados)
+    if arquivo_saida:
+        with open(os.path.join(RAIZ_PROJETO, arquivo_saida), "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memória de pixels (buffers do Pillow) por imagem do Processador.")
+    parser.add_argument("--imagens", type=int, default=12)
+    parser.add_argument("--saida", help="grava as medidas brutas neste JSON (relativo à raiz do projeto)")
+    parser.add_argument("--variante", choices=VARIANTES, help=argparse.SUPPRESS)   # Uso interno (subprocesso)
+    parser.add_argument("--pasta", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variante:
+        print(json.dumps(medir_variante(args.variante, args.pasta, json.loads(sys.stdin.read()))))
+    else:
+        executar_benchmark(args.imagens, args.saida)
@@ -0,0 +1,295 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ==============================================================================
+# PORTAL DO VENDEDOR SIMULADO
+# Réplica estática da tela "Novo produto" com as mesmas classes, placeholders e
+# data-product-edit-field-unique-id que o Cadastrador procura. Serve para medir
+# (e não regredir) a velocidade do bot sem depender da Shopee de verdade.
+# A latência artificial vale para cada requisição e para as "renderizações" da página.
+# ==============================================================================
+
+LATENCIA_PADRAO = 0.05   # Segundos por requisição / atraso das animações da página
+FALHA_UPLOAD_PADRAO = 0.0   # Fração dos uploads de imagem que o portal recusa (HTTP 500)
+CAMINHO_FORMULARIO = "/portal/product/new"
+
+_HTML_FORMULARIO = r"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Novo produto (simulado)</title>
+<style>
+  .oculto { display: none; }
+  .shopee-image-manager__itembox { display: inline-block; width: 60px; height: 60px; margin: 2px; }
+  .shopee-image-manager__itembox img { width: 60px; height: 60px; }
+  .attribute-select-item, .editor-row, .logistics-item-ui-t1 { margin: 6px 0; }
+  .edit-row-right-medium { border: 1px solid #ccc; padding: 4px; min-width: 160px; display: inline-block; cursor: pointer; }
+  .eds-switch { width: 30px; height: 16px; background: #ccc; display: inline-block; }
+  .eds-switch--open { background: #ee4d2d; }
+  #popup { border: 1px solid #999; padding: 4px; background: #fff; }
+  .eds-option { padding: 2px; cursor: pointer; }
+</style></head>
+<body>
+<header class="seller-header"><div class="account-info"><span class="avatar">bot_benchmark</span></div></header>
+<h1>Adicionar Novo Produto</h1>
+
+<!-- Galeria -->
+<section>
+  <input type="file" multiple accept="image/*" id="galeria">
+  <div class="shopee-image-manager__content" id="miniaturas"></div>
+  <input placeholder="Nome da Marca + Tipo do Produto + Atributos-chave (Materiais, Cores, Tamanho, Modelo)" maxlength="120">
+  <button type="button" id="proximo">Próximo</button>
+</section>
+
+<!-- Categoria -->
+<section>
+  <div class="category-select-radio" id="sugestao">Hobbies e Coleções > Itens Colecionáveis > Figuras de Ação</div>
+  <div class="product-category-box" id="categoria">Selecione a categoria</div>
+</section>
+
+<!-- Descrição -->
+<section><div contenteditable="true" id="descricao" style="min-height:40px;border:1px solid #ccc"></div></section>
+
+<!-- Atributos -->
+<section id="atributos">
+  <div class="attribute-label">Marca</div>
+  <div class="attribute-select-item" data-titulo="Marca"><div class="edit-row-right-medium">Selecione</div></div>
+  <div class="attribute-select-item" data-titulo="Material"><div>Material</div><div class="edit-row-right-medium">Selecione</div></div>
+  <div class="attribute-select-item" data-titulo="Peso do Produto"><div>Peso do Produto</div><div class="edit-row-right-medium">Selecione</div></div>
+  <div class="attribute-select-item" data-titulo="Estilo"><div>Estilo</div><div class="edit-row-right-medium">Selecione</div></div>
+  <div class="attribute-select-item" data-titulo="Quantidade"><div>Quantidade</div><input placeholder="Inserir"></div>
+</section>
+
+<!-- Variações -->
+<section>
+  <div class="variation-add-button"><button type="button" id="ativar1">Ativar Variações</button></div>
+  <div data-product-edit-field-unique-id="tierVariation_0" class="oculto">
+    <input placeholder="Nome da variação">
+    <div class="option-container"><input placeholder="Inserir"></div>
+  </div>
+  <div class="variation-add-2 oculto"><button type="button" id="ativar2">Adicionar Variação 2</button></div>
+  <div data-product-edit-field-unique-id="tierVariation_1" class="oculto">
+    <input placeholder="Nome da variação">
+    <div class="option-container"><input placeholder="Inserir"></div>
+  </div>
+  <div class="batch-edit oculto">
+    <input placeholder="Preço"><input placeholder="Estoque"><button type="button" id="aplicar">Aplicar a todas</button>
+  </div>
+  <div class="variation-model-table-body"></div>
+</section>
+
+<!-- Envio -->
+<section>
+  <div class="editor-row">Produto é um item agrupável <label>Sim</label> <label>Não</label></div>
+  <div data-product-edit-field-unique-id="weight"><input placeholder="Inserir"></div>
+  <div data-product-edit-field-unique-id="dimension.width"><input placeholder="Largura"></div>
+  <div data-product-edit-field-unique-id="dimension.length"><input placeholder="Comprimento"></div>
+  <div data-product-edit-field-unique-id="dimension.height"><input placeholder="Altura"></div>
+  <div class="logistics-item-ui-t1"><div>Retirada</div><div class="eds-switch eds-switch--open" id="retirada"></div></div>
+  <div data-product-edit-field-unique-id="preOrder">
+    <label id="pre_nao"><span>Não</span></label> <label id="pre_sim"><span>Sim</span></label>
+  </div>
+  <div class="pre-order-input oculto"><input placeholder="0"></div>
+  <button type="button" id="salvar"><span>Salvar e Não Publicar</span></button>
+  <div id="aviso" class="eds-toast oculto"></div>
+</section>
+
+<script>
+const LATENCIA = __LATENCIA_MS__;
+const estado = {imagens: 0, atributos: {}, variacoes: [], salvo: false};
+const depois = (fn) => setTimeout(fn, LATENCIA);
+const mostrar = (el) => el.classList.remove('oculto');
+
+// Galeria: cada arquivo "sobe" para o servidor antes da miniatura aparecer
+document.getElementById('galeria').addEventListener('change', async (ev) => {
+  const arquivos = Array.from(ev.target.files);
+  // Como na Shopee: uma caixa por arquivo, na ordem escolhida, com barra de progresso até o fim
+  const caixas = arquivos.map(() => {
+    const caixa = document.createElement('div');
+    caixa.className = 'shopee-image-manager__itembox';
+    caixa.innerHTML = '<div class="shopee-image-manager__upload-progress">enviando...</div>';
+    document.getElementById('miniaturas').appendChild(caixa);
+    return caixa;
+  });
+  await Promise.all(arquivos.map(async (arquivo, i) => {
+    const resposta = await fetch('/api/upload', {method: 'POST', body: arquivo});
+    if (!resposta.ok) {
+      caixas[i].innerHTML = '<div class="shopee-image-manager__item-error">falha no envio</div>';
+      return;
+    }
+    const img = document.createElement('img');
+    img.src = URL.createObjectURL(arquivo);
+    await img.decode().catch(() => {});
+    caixas[i].replaceChildren(img);
+    estado.imagens += 1;
+  }));
+});
+
+document.getElementById('sugestao').addEventListener('click', (ev) => ev.target.classList.add('selecionada'));
+
+// Atributos: dropdown com busca, opções e "Adicionar um novo item"
+const OPCOES = {'Marca': ['Taberna e Goblins', 'Genérico'], 'Peso do Produto': ['50g', '100g', '200g'],
+                'Material': ['Plástico'], 'Estilo': ['Moderno']};
+function fecharPopup() { const p = document.getElementById('popup'); if (p) p.remove(); }
+function escolher(item, valor) {
+  estado.atributos[item.dataset.titulo] = valor;
+  item.querySelector('.edit-row-right-medium').textContent = valor;
+  fecharPopup();
+}
+// (o clique vale na linha inteira: a Marca é clicada pelo container, não pelo gatilho)
+document.querySelectorAll('.attribute-select-item').forEach((item) => {
+  if (!item.querySelector('.edit-row-right-medium')) return;
+  item.addEventListener('click', () => {
+    fecharPopup();
+    depois(() => {
+      const popup = document.createElement('ul');
+      popup.id = 'popup';
+      popup.innerHTML = '<input type="search" placeholder="Insira ao menos 1 caractere">' +
+        (OPCOES[item.dataset.titulo] || []).map((o) => '<div class="eds-option">' + o + '</div>').join('') +
+        '<div class="eds-option-add">Adicionar um novo item</div>';
+      item.after(popup);
+      popup.querySelector('input[type=search]').addEventListener('input', (ev) => {
+        popup.querySelectorAll('.eds-option').forEach((o) => {
+          o.style.display = o.textContent.toLowerCase().includes(ev.target.value.toLowerCase()) ? '' : 'none';
+        });
+      });
+      popup.querySelectorAll('.eds-option').forEach((o) => o.addEventListener('click', () => escolher(item, o.textContent)));
+      popup.querySelector('.eds-option-add').addEventListener('click', () => {
+        const caixa = document.createElement('div');
+        caixa.className = 'eds-option-add__input';
+        caixa.innerHTML = '<input placeholder="Novo item"><button type="button" class="eds-option-add__add-confirm-icon">OK</button>';
+        popup.appendChild(caixa);
+        caixa.querySelector('button').addEventListener('click', () => escolher(item, caixa.querySelector('input').value));
+      });
+    });
+  });
+});
+
+// Variações: um campo novo aparece sempre que o último é preenchido
+function ligarOpcoes(grupo) {
+  const container = grupo.querySelector('.option-container');
+  container.addEventListener('input', () => {
+    const campos = container.querySelectorAll('input');
+    if (campos[campos.length - 1].value) {
+      const novo = document.createElement('input');
+      novo.placeholder = 'Inserir';
+      container.appendChild(novo);
+    }
+    if (grupo.dataset.productEditFieldUniqueId === 'tierVariation_0') montarTabela(container);
+  });
+}
+function montarTabela(container) {
+  const nomes = Array.from(container.querySelectorAll('input')).map((c) => c.value).filter(Boolean);
+  const tabela = document.querySelector('.variation-model-table-body');
+  while (tabela.children.length < nomes.length) {
+    const linha = document.createElement('div');
+    linha.innerHTML = '<input type="file" accept="image/*">';
+    tabela.appendChild(linha);
+  }
+  estado.variacoes = nomes;
+}
+const grupo1 = document.querySelector('[data-product-edit-field-unique-id="tierVariation_0"]');
+const grupo2 = document.querySelector('[data-product-edit-field-unique-id="tierVariation_1"]');
+ligarOpcoes(grupo1);
+ligarOpcoes(grupo2);
+document.getElementById('ativar1').addEventListener('click', () => depois(() => {
+  mostrar(grupo1); mostrar(document.querySelector('.variation-add-2')); mostrar(document.querySelector('.batch-edit'));
+}));
+document.getElementById('ativar2').addEventListener('click', () => depois(() => mostrar(grupo2)));
+document.getElementById('aplicar').addEventListener('click', () => { estado.lote = true; });
+
+// Envio
+document.getElementById('retirada').addEventListener('click', (ev) => ev.target.classList.toggle('eds-switch--open'));
+document.getElementById('pre_sim').addEventListener('click', () => depois(() => mostrar(document.querySelector('.pre-order-input'))));
+
+document.getElementById('salvar').addEventListener('click', async () => {
+  const nome = document.querySelector('input[placeholder^="Nome da Marca"]').value;
+  await fetch('/api/produtos', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                body: JSON.stringify(Object.assign({nome: nome}, estado))});
+  estado.salvo = true;
+  const aviso = document.getElementById('aviso');
+  aviso.textContent = 'Produto salvo com sucesso';
+  mostrar(aviso);
+});
+</script>
+</body></html>
+"""
+
+class PortalSimulado(ThreadingHTTPServer):
+    """Servidor HTTP do portal simulado. 'produtos_salvos' guarda o que o bot salvou."""
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia=LATENCIA_PADRAO, falha_upload=FALHA_UPLOAD_PADRAO):
+        super().__init__(endereco, _Manipulador)
+        self.latencia = latencia
+        self.falha_upload = falha_upload
+        self.produtos_salvos = []
+        self.uploads = 0
+        self.uploads_recusados = 0
+        self._trava = threading.Lock()
+
+    @property
+    def url_formulario(self):
+        return f"http://127.0.0.1:{self.server_address[1]}{CAMINHO_FORMULARIO}"
+
+class _Manipulador(BaseHTTPRequestHandler):
+    def _responder(self, status, corpo, tipo="application/json"):
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        time.sleep(self.server.latencia)
+        if self.path.split("?")[0] == CAMINHO_FORMULARIO:
+            html = _HTML_FORMULARIO.replace("__LATENCIA_MS__", str(int(self.server.latencia * 1000)))
+            self._responder(200, html, "text/html")
+        elif self.path == "/api/produtos":
+            with self.server._trava:
+                self._responder(200, json.dumps(self.server.produtos_salvos, ensure_ascii=False))
+        else:
+            self._responder(404, '{"erro": "não encontrado"}')
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latencia)
+        with self.server._trava:
+            if self.path == "/api/upload":
+                if random.random() < self.server.falha_upload:
+                    self.server.uploads_recusados += 1
+                    self._responder(500, '{"erro": "falha simulada no upload"}')
+                    return
+                self.server.uploads += 1
+            elif self.path == "/api/produtos":
+                self.server.produtos_salvos.append(json.loads(corpo or b"{}"))
+            else:
+                self._responder(404, '{"erro": "não encontrado"}')
+                return
+        self._responder(200, '{"ok": true}')
+
+    def log_message(self, formato, *args):
+        pass  # Silencioso: o benchmark já mede tudo
+
+def iniciar_portal(porta=0, latencia=LATENCIA_PADRAO, falha_upload=FALHA_UPLOAD_PADRAO):
+    """Sobe o portal numa thread de fundo (porta 0 = qualquer livre). Retorna o servidor."""
+    servidor = PortalSimulado(("127.0.0.1", porta), latencia, falha_upload)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portal do vendedor simulado (tela de novo produto).")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=LATENCIA_PADRAO, help="segundos por requisição")
+    parser.add_argument("--falha-upload", type=float, default=FALHA_UPLOAD_PADRAO,
+                        help="fração dos uploads recusados (testa o reenvio só do que faltou)")
+    args = parser.parse_args()
+
+    servidor = PortalSimulado(("127.0.0.1", args.porta), args.latencia, args.falha_upload)
+    print(f"🛒 Portal simulado em {servidor.url_formulario} (latência {args.latencia * 1000:.0f}ms)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nPortal encerrado.")
@@ -7,10 +7,14 @@ from colorama import init, Fore, Style
 from app import Organizador
 from app import Processador
 from app import Cadastrador
+from app import armazem
+from app import esteira
+from app import cadastro_paralelo
 
 # Configurações
 PASTA_ORIGINAIS = "./data/input"
 ARQUIVO_MAPA = "mapa_global.json"
+ARQUIVO_ARMAZEM = armazem.ARQUIVO_ARMAZEM
 
 # Inicializa cores (funciona no CMD do Windows)
 init(autoreset=True)
@@ -24,7 +28,8 @@ def organizar():
         return None
 
     # Chama a função do Organizador que gera o JSON
-    dados = Organizador.gerar_mapa_unificado(PASTA_ORIGINAIS, ARQUIVO_MAPA)
+    dados = Organizador.gerar_mapa_unificado(PASTA_ORIGINAIS, ARQUIVO_MAPA, fragmentado=True,
+                                              incremental=True, arquivo_armazem=ARQUIVO_ARMAZEM)
     
     if dados:
         print(f"{Fore.GREEN}✅ Mapa gerado com {len(dados)} produtos!{Style.RESET_ALL}")
@@ -36,26 +41,19 @@ def organizar():
 def processar():
     print(f"\n{Fore.CYAN}=== PASSO 2: PROCESSAMENTO DE IMAGENS ==={Style.RESET_ALL}")
     
-    if not os.path.exists(ARQUIVO_MAPA):
+    if not os.path.exists(ARQUIVO_MAPA) and not os.path.exists(ARQUIVO_ARMAZEM):
         print(f"{Fore.YELLOW}⚠️ Arquivo '{ARQUIVO_MAPA}' não encontrado.{Style.RESET_ALL}")
         print("Rodando o Passo 1 automaticamente...")
         dados = organizar()
         if not dados: return
-    else:
-        with open(ARQUIVO_MAPA, "r", encoding="utf-8") as f:
-            dados = json.load(f)
 
-    # Chama o pipeline do Processador
-    Processador.executar_pipeline(dados)
+    # Chama o pipeline do Processador (em streaming, gravando o resultado de cada produto no armazém)
+    armazem.garantir_armazem(ARQUIVO_MAPA, ARQUIVO_ARMAZEM)
+    Processador.executar_pipeline_armazem(ARQUIVO_ARMAZEM, paralelo=True)
     print(f"{Fore.GREEN}✅ Imagens processadas e prontas!{Style.RESET_ALL}")
 
-def cadastrar():
-    print(f"\n{Fore.CYAN}=== PASSO 3: CADASTRO NA SHOPEE ==={Style.RESET_ALL}")
-    
-    if not os.path.exists(ARQUIVO_MAPA):
-        print(f"{Fore.RED}❌ Mapa não encontrado. Rode o passo 1 e 2 primeiro.{Style.RESET_ALL}")
-        return
-
+def escolher_modo_navegador():
+    """Pergunta se o navegador roda visível ou headless. Retorna True para headless."""
     print("\nComo deseja rodar o navegador?")
     print("1.  Modo VISÍVEL (Ideal para acompanhar ou fazer login)")
     print("2.  Modo INVISÍVEL (Headless - Roda em 2º plano)")
@@ -69,14 +67,47 @@ def cadastrar():
         print(f"Certifique-se de já ter rodado o modo Visível uma vez para salvar sua sessão.{Style.RESET_ALL}")
         print("Iniciando em 3 segundos...")
         time.sleep(3)
+    return modo_invisivel
+
+def cadastrar():
+    print(f"\n{Fore.CYAN}=== PASSO 3: CADASTRO NA SHOPEE ==={Style.RESET_ALL}")
+    
+    if not os.path.exists(ARQUIVO_MAPA) and not os.path.exists(ARQUIVO_ARMAZEM):
+        print(f"{Fore.RED}❌ Mapa não encontrado. Rode o passo 1 e 2 primeiro.{Style.RESET_ALL}")
+        return
+
+    modo_invisivel = escolher_modo_navegador()
+
+    num_navegadores = 1
+    if modo_invisivel:
+        resp = input(f"{Fore.WHITE}Quantos navegadores em paralelo? (Enter = 1): {Style.RESET_ALL}").strip()
+        num_navegadores = int(resp) if resp.isdigit() and int(resp) > 0 else 1
 
     print(f"\n{Fore.GREEN}🚀 Iniciando o Robô...{Style.RESET_ALL}")
     
     try:
+        if num_navegadores > 1:
+            cadastro_paralelo.executar_bot_paralelo(num_navegadores, headless=True)
+            return
         Cadastrador.executar_bot(headless=modo_invisivel)
     except Exception as e:
         print(f"{Fore.RED}❌ Ocorreu um erro fatal no bot: {e}{Style.RESET_ALL}")
 
+def rodar_tudo():
+    """
+    Pipeline completo em esteira: cada produto vai para o processamento assim que é
+    classificado, e para o cadastro assim que suas imagens ficam prontas.
+    """
+    if not os.path.exists(PASTA_ORIGINAIS):
+        print(f"{Fore.RED}❌ Pasta 'data/input' não encontrada!{Style.RESET_ALL}")
+        return
+
+    modo_invisivel = escolher_modo_navegador()
+    try:
+        esteira.executar_esteira(PASTA_ORIGINAIS, ARQUIVO_MAPA, ARQUIVO_ARMAZEM, headless=modo_invisivel)
+    except Exception as e:
+        print(f"{Fore.RED}❌ Ocorreu um erro fatal na esteira: {e}{Style.RESET_ALL}")
+
 def menu_principal():
     while True:
         print(f"\n{Fore.YELLOW}{'='*40}")
@@ -104,12 +135,7 @@ def menu_principal():
         
         elif opcao == "4":
             print(f"\n{Fore.MAGENTA}🚀 INICIANDO MODO TURBO...{Style.RESET_ALL}")
-            dados = organizar()
-            if dados:
-                processar()
-                resp = input("\nIniciar o cadastro agora? (S/N): ").lower()
-                if resp == 's':
-                    cadastrar()
+            rodar_tudo()
         
         elif opcao == "0":
             print("Até logo!")
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app import processador
+
+# Logo vermelho opaco sobre fundo branco: com OPACIDADE_LOGO 0.8, uma colagem deixa o
+# verde do logo em ~75; duas colagens no mesmo lugar derrubam para ~40.
+COR_LOGO = (200, 30, 30, 255)
+VERDE_UMA_COLAGEM = 60
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    logo = Image.new("RGBA", (400, 150), (0, 0, 0, 0))
+    ImageDraw.Draw(logo).ellipse([0, 0, 399, 149], fill=COR_LOGO)
+    caminho_logo = tmp_path / "logo.png"
+    logo.save(caminho_logo)
+
+    monkeypatch.setattr(processador, "CAMINHO_LOGO", str(caminho_logo))
+    monkeypatch.setattr(processador, "PASTA_RENDICOES", str(tmp_path / "rendicoes"))
+    monkeypatch.setattr(processador, "_CACHE_LOGO", {})
+    monkeypatch.setattr(processador, "codificacao_adaptativa", lambda: None)
+    return tmp_path
+
+
+def _menor_verde(caminho):
+    """Menor valor do canal verde: ~255 sem logo, ~75 com uma colagem, ~40 com duas."""
+    return Image.open(caminho).convert("RGB").getchannel("G").getextrema()[0]
+
+
+def test_rendicoes_de_origem_menor_que_a_maior_rendicao(ambiente):
+    origem = ambiente / "pequena.png"
+    Image.new("RGB", (400, 400), (255, 255, 255)).save(origem)
+    destino = ambiente / "processed" / "Colecao" / "pequena.jpg"
+    os.makedirs(destino.parent)
+
+    processador._renderizar_imagem(str(origem), str(destino), rendicoes=processador.RENDICOES_LOJA)
+    caminhos = processador.caminhos_rendicoes(str(destino), processador.RENDICOES_LOJA)
+
+    for rendicao in processador.RENDICOES_LOJA:
+        verde = _menor_verde(caminhos[rendicao["nome"]])
+        if rendicao["logo"]:
+            assert VERDE_UMA_COLAGEM < verde < 120, f"{rendicao['nome']}: logo ausente ou colado duas vezes"
+        else:
+            assert verde > 240, f"{rendicao['nome']}: logo vazou para uma rendição sem logo"
+    assert VERDE_UMA_COLAGEM < _menor_verde(destino) < 120